@@ -8,13 +8,80 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 CACHE_DIR = os.getenv('CACHE_DIR', '@cachefolder')
 CACHE_EXPIRY = int(os.getenv('CACHE_EXPIRY', 3600))
 
+EXTRACTION_MEMO_ENABLED = os.getenv('EXTRACTION_MEMO_ENABLED', 'True').lower() in ('true', '1', 't')
+EXTRACTION_MEMO_MAX_SIZE = int(os.getenv('EXTRACTION_MEMO_MAX_SIZE', 256 * 1024 * 1024))
+
+CRAWL_RESULT_CACHE = os.getenv('CRAWL_RESULT_CACHE', 'True').lower() in ('true', '1', 't')
+CRAWL_RESULT_CACHE_TTL = int(os.getenv('CRAWL_RESULT_CACHE_TTL', 600))
+CRAWL_COALESCE_TIMEOUT = int(os.getenv('CRAWL_COALESCE_TIMEOUT', 600))
+
 MAX_CRAWL_DEPTH = int(os.getenv('MAX_CRAWL_DEPTH', 0))
 MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 5))
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 30))
+ADAPTIVE_TIMEOUTS = os.getenv('ADAPTIVE_TIMEOUTS', 'True').lower() in ('true', '1', 't')
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv('ADAPTIVE_TIMEOUT_MIN', 2))
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv('ADAPTIVE_TIMEOUT_MULTIPLIER', 4))
+HEDGED_REQUESTS = os.getenv('HEDGED_REQUESTS', 'False').lower() in ('true', '1', 't')
+HEDGE_MAX_RATIO = float(os.getenv('HEDGE_MAX_RATIO', 0.05))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 0.05))
+CONNECTION_PREWARM = os.getenv('CONNECTION_PREWARM', 'True').lower() in ('true', '1', 't')
+PREWARM_MAX_HOSTS = int(os.getenv('PREWARM_MAX_HOSTS', 16))
+PREWARM_CONNECTIONS_PER_HOST = int(os.getenv('PREWARM_CONNECTIONS_PER_HOST', 2))
+PREWARM_DNS_TTL = int(os.getenv('PREWARM_DNS_TTL', 300))
+REDIRECT_CACHE = os.getenv('REDIRECT_CACHE', 'True').lower() in ('true', '1', 't')
+REDIRECT_CACHE_TTL = int(os.getenv('REDIRECT_CACHE_TTL', 30 * 24 * 3600))
+HOST_PROFILES = os.getenv('HOST_PROFILES', 'True').lower() in ('true', '1', 't')
+HOST_PROFILE_ROBOTS_TTL = int(os.getenv('HOST_PROFILE_ROBOTS_TTL', 24 * 3600))
+HOST_INITIAL_CONCURRENCY = int(os.getenv('HOST_INITIAL_CONCURRENCY', 4))
 RESPECT_ROBOTS_TXT = os.getenv('RESPECT_ROBOTS_TXT', 'True').lower() in ('true', '1', 't')
 USER_AGENT = os.getenv('USER_AGENT', 'MediaCrawler/1.0 (+https://github.com/yourusername/media-crawler)')
+MAX_CRAWL_PAGES = int(os.getenv('MAX_CRAWL_PAGES', 0))
+CRAWL_FRONTIER = os.getenv('CRAWL_FRONTIER', 'priority').lower()
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', 1))
+CRAWL_SCOPE_INCLUDE = os.getenv('CRAWL_SCOPE_INCLUDE', '').split()
+CRAWL_SCOPE_EXCLUDE = os.getenv('CRAWL_SCOPE_EXCLUDE', '').split()
+FRONTIER_MEMORY_LIMIT = int(os.getenv('FRONTIER_MEMORY_LIMIT', 100000))
+FRONTIER_SPILL_DIR = os.getenv('FRONTIER_SPILL_DIR', '')
+CRAWL_GRAPH = os.getenv('CRAWL_GRAPH', 'True').lower() in ('true', '1', 't')
+FOLLOW_JSON_LINKS = os.getenv('FOLLOW_JSON_LINKS', 'False').lower() in ('true', '1', 't')
+
+HTML_PARSER = os.getenv('HTML_PARSER', 'html.parser')
+CHARSET_SNIFF_BYTES = int(os.getenv('CHARSET_SNIFF_BYTES', 4096))
+TWO_TIER_EXTRACTION = os.getenv('TWO_TIER_EXTRACTION', 'True').lower() in ('true', '1', 't')
+
+STYLESHEET_MEDIA = os.getenv('STYLESHEET_MEDIA', 'True').lower() in ('true', '1', 't')
+STYLESHEET_CONCURRENCY = int(os.getenv('STYLESHEET_CONCURRENCY', 2))
+STYLESHEET_MAX_SIZE = int(os.getenv('STYLESHEET_MAX_SIZE', 2 * 1024 * 1024))
+STYLESHEET_CACHE_TTL = int(os.getenv('STYLESHEET_CACHE_TTL', 24 * 3600))
+
+FEED_DISCOVERY = os.getenv('FEED_DISCOVERY', 'True').lower() in ('true', '1', 't')
+FEED_MAX_SIZE = int(os.getenv('FEED_MAX_SIZE', 5 * 1024 * 1024))
+FEED_CONCURRENCY = int(os.getenv('FEED_CONCURRENCY', 2))
+FEED_CONTENT_TYPES = ['application/rss+xml', 'application/atom+xml']
+
+PAGE_CONTENT_TYPES = ['text/html', 'application/xhtml+xml', 'application/json']
+PAGE_LINK_TAGS = ['a', 'area', 'frame', 'iframe']
+NON_PAGE_EXTENSIONS = [
+    '.css', '.js', '.mjs', '.map', '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.apk',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv', '.txt'
+]
+
+WARC_RECORD = os.getenv('WARC_RECORD', 'False').lower() in ('true', '1', 't')
+WARC_REPLAY_PATH = os.getenv('WARC_REPLAY_PATH', '')
+WARC_MAX_FILE_SIZE = int(os.getenv('WARC_MAX_FILE_SIZE', 1024 * 1024 * 1024))
 
 MAX_CONCURRENT_DOWNLOADS = int(os.getenv('MAX_CONCURRENT_DOWNLOADS', 10))
+MEDIA_STORE = os.getenv('MEDIA_STORE', 'True').lower() in ('true', '1', 't')
+MEDIA_HTTP_CACHE = os.getenv('MEDIA_HTTP_CACHE', 'True').lower() in ('true', '1', 't')
+MEDIA_HTTP_CACHE_MAX_AGE = int(os.getenv('MEDIA_HTTP_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+MEMORY_GOVERNOR = os.getenv('MEMORY_GOVERNOR', 'True').lower() in ('true', '1', 't')
+MEMORY_SOFT_LIMIT = int(os.getenv('MEMORY_SOFT_LIMIT', 0))
+MEMORY_HARD_LIMIT = int(os.getenv('MEMORY_HARD_LIMIT', 0))
+MEMORY_LOW_WATER = int(os.getenv('MEMORY_LOW_WATER', 0))
+MEMORY_SAMPLE_INTERVAL = float(os.getenv('MEMORY_SAMPLE_INTERVAL', 0.5))
+MEMORY_PAUSE_TIMEOUT = float(os.getenv('MEMORY_PAUSE_TIMEOUT', 30))
 
 ALLOWED_MEDIA_TYPES = os.getenv('ALLOWED_MEDIA_TYPES', 'image,video,audio').split(',')
 
@@ -22,6 +89,10 @@ MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', 10 * 1024 * 1024))
 MAX_VIDEO_SIZE = int(os.getenv('MAX_VIDEO_SIZE', 100 * 1024 * 1024))
 MAX_AUDIO_SIZE = int(os.getenv('MAX_AUDIO_SIZE', 50 * 1024 * 1024))
 
+STREAM_MANIFEST_EXTENSIONS = ['.m3u8', '.mpd']
+STREAM_SEGMENT_CONCURRENCY = int(os.getenv('STREAM_SEGMENT_CONCURRENCY', 6))
+STREAM_REMUX = os.getenv('STREAM_REMUX', 'True').lower() in ('true', '1', 't')
+
 THUMBNAIL_SIZE = (int(os.getenv('THUMBNAIL_WIDTH', 300)), int(os.getenv('THUMBNAIL_HEIGHT', 300)))
 
 MEDIA_TYPES = {
@@ -31,11 +102,11 @@ MEDIA_TYPES = {
     ],
     'video': [
         'video/mp4', 'video/webm', 'video/ogg', 'video/x-matroska',
-        'video/quicktime', 'video/x-msvideo', 'video/x-flv', 'application/vnd.rn-realmedia'
+        'video/quicktime', 'video/x-msvideo', 'video/x-flv', 'application/vnd.rn-realmedia', 'video/mp2t'
     ],
     'audio': [
         'audio/mpeg', 'audio/ogg', 'audio/wav', 'audio/webm',
-        'audio/aac', 'audio/flac', 'audio/x-ms-wma', 'audio/x-m4a'
+        'audio/aac', 'audio/flac', 'audio/x-ms-wma', 'audio/x-m4a', 'audio/mp4'
     ],
 }
 
@@ -45,6 +116,18 @@ MEDIA_EXTENSIONS = {
     'audio': ['.mp3', '.wav', '.flac', '.aac', '.m4a', '.ogg', '.wma']
 }
 
+MEDIA_PATH_TOKENS = [
+    'gallery', 'galleries', 'photo', 'photos', 'image', 'images', 'img', 'media',
+    'video', 'videos', 'album', 'albums', 'portfolio', 'pictures', 'pics',
+    'wallpaper', 'wallpapers', 'art', 'artwork', 'slideshow', 'shots', 'audio', 'music'
+]
+LOW_VALUE_PATH_TOKENS = [
+    'login', 'signin', 'sign-in', 'signup', 'sign-up', 'register', 'logout', 'account',
+    'privacy', 'terms', 'legal', 'cookie', 'cookies', 'policy', 'tos', 'imprint',
+    'contact', 'about', 'help', 'faq', 'support', 'cart', 'checkout', 'search', 'feedback'
+]
+PAGINATION_HINTS = ['next', 'older', 'more', '»', '›', '>>']
+
 URL_MEDIA_ATTRIBUTES = ['src', 'href', 'data-src', 'data-original', 'srcset', 'poster']
 
 URL_KEYS = ['src', 'url', 'href', 'link', 'image', 'thumbnail', 'poster', 'source']
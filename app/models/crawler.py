@@ -43,6 +43,27 @@ class CrawlStats(BaseModel):
     total_images: int = 0
     total_videos: int = 0
     total_audio: int = 0
+    extraction_memo_hits: int = 0
+    extraction_memo_misses: int = 0
+    fast_extractions: int = 0
+    dom_extractions: int = 0
+    hedged_requests: int = 0
+    hedge_wins: int = 0
+    request_timeouts: int = 0
+    stylesheets_fetched: int = 0
+    stylesheet_cache_hits: int = 0
+    stylesheet_media: int = 0
+    feeds_parsed: int = 0
+    feed_items: int = 0
+    feed_media: int = 0
+    prewarmed_connections: int = 0
+    prewarm_time_saved: float = 0.0
+    redirect_hops: int = 0
+    redirects_rewritten: int = 0
+    scope_kept: int = 0
+    scope_dropped: Dict[str, int] = Field(default_factory=dict)
+    memory_pauses: int = 0
+    memory_paused_seconds: float = 0.0
     start_time: datetime = Field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
 
@@ -55,6 +76,10 @@ class CrawlStats(BaseModel):
     def model_dump(self) -> Dict[str, Any]:
         result = super().model_dump()
         result["duration"] = self.duration
+        if self.start_time:
+            result["start_time"] = self.start_time.isoformat()
+        if self.end_time:
+            result["end_time"] = self.end_time.isoformat()
         return result
 
     def to_dict(self) -> Dict[str, Any]:
@@ -66,8 +91,12 @@ class CrawlPage(BaseModel):
     parent_url: Optional[str] = None
     discovered_urls: Set[str] = Field(default_factory=set)
     media_urls: Set[str] = Field(default_factory=set)
+    stylesheet_urls: Set[str] = Field(default_factory=set)
+    feed_urls: Set[str] = Field(default_factory=set)
+    link_context: Dict[str, str] = Field(default_factory=dict)
     status_code: Optional[int] = None
     error_message: Optional[str] = None
+    body_size: int = 0
     start_time: datetime = Field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
 
@@ -9,12 +9,19 @@ from flask import Blueprint, request, jsonify, session
 from app.services.crawler import Crawler
 from app.services.media import MediaDownloader
 from app.services.cache import CacheManager
+from app.services.cache.crawl_result_cache import CrawlResultCache
+from app.services.crawler.crawl_graph import CrawlGraphReader
+from app.services.crawler.scope import ScopeRules, ScopeError
 from app.utils.url import is_valid_url, normalize_url
-from app.config import MAX_CRAWL_DEPTH
+from app.utils.memory import MemoryBudgetExceeded, get_memory_governor
+from app.config import MAX_CRAWL_DEPTH, CRAWL_RESULT_CACHE, WARC_RECORD
 
 api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
+GRAPH_DEFAULT_LIMIT = 20
+GRAPH_MAX_LIMIT = 1000
+
 @api_bp.route('/crawl', methods=['POST'])
 def crawl():
     params = _extract_crawl_params()
@@ -23,12 +30,21 @@ def crawl():
 
     url = params['url']
     depth = params['depth']
+    scope = params['scope']
 
     cache_manager = CacheManager()
     session_id = _setup_cache_session(cache_manager)
 
     try:
-        return _perform_crawl(url, depth, session_id, cache_manager)
+        return _perform_crawl(url, depth, scope, session_id, cache_manager)
+    except MemoryBudgetExceeded as e:
+        logger.error(f"Stopped crawl of {url}: {e}")
+        return jsonify({
+            'error': str(e),
+            'success': False,
+            'session_id': session_id,
+            'url': url
+        }), 503
     except Exception as e:
         error_message = str(e)
         stack_trace = traceback.format_exc()
@@ -47,9 +63,16 @@ def _extract_crawl_params() -> Dict[str, Any]:
     if not is_valid_url(url):
         return {'error': 'Invalid URL'}
 
+    try:
+        scope = ScopeRules.from_dict(request.json.get('scope'))
+        scope.compile(url)
+    except ScopeError as e:
+        return {'error': str(e)}
+
     return {
         'url': normalize_url(url),
-        'depth': depth
+        'depth': depth,
+        'scope': scope
     }
 
 def _setup_cache_session(cache_manager: CacheManager) -> str:
@@ -63,14 +86,73 @@ def _setup_cache_session(cache_manager: CacheManager) -> str:
 
     return session_id
 
-def _perform_crawl(url: str, depth: int, session_id: str, cache_manager: CacheManager) -> Tuple[Dict[str, Any], int]:
+def _perform_crawl(
+    url: str,
+    depth: int,
+    scope: ScopeRules,
+    session_id: str,
+    cache_manager: CacheManager
+) -> Tuple[Dict[str, Any], int]:
+    if not CRAWL_RESULT_CACHE or WARC_RECORD:
+        return _run_crawl(url, depth, scope, session_id, cache_manager)
+
+    result_cache = CrawlResultCache(cache_manager)
+
+    try:
+        key = result_cache.make_key(url, depth, scope.to_dict())
+
+        cached = result_cache.materialize(key, session_id)
+        if cached:
+            return _build_cached_crawl_response(cached, session_id, cache_manager, 'hit')
+
+        with result_cache.coalesce(key) as waited:
+            if waited:
+                cached = result_cache.materialize(key, session_id)
+                if cached:
+                    return _build_cached_crawl_response(cached, session_id, cache_manager, 'coalesced')
+
+            return _run_crawl(url, depth, scope, session_id, cache_manager, result_cache, key)
+    finally:
+        result_cache.close()
+
+def _build_cached_crawl_response(
+    cached: Tuple[Dict[str, Any], List[Any]],
+    session_id: str,
+    cache_manager: CacheManager,
+    result_cache_status: str
+) -> Tuple[Dict[str, Any], int]:
+
+    stats, media_list = cached
+
+    cache_manager.update_session_access_time(session_id)
+    session_stats = cache_manager.get_session_stats(session_id)
+
+    return jsonify({
+        'success': True,
+        'media_count': len(media_list),
+        'stats': stats,
+        'session_id': session_id,
+        'result_cache': result_cache_status,
+        **_build_download_info(),
+        'cache_info': _build_cache_info(cache_manager, session_id, media_list, session_stats)
+    }), 200
+
+def _run_crawl(
+    url: str,
+    depth: int,
+    scope: ScopeRules,
+    session_id: str,
+    cache_manager: CacheManager,
+    result_cache: Optional[CrawlResultCache] = None,
+    result_key: Optional[str] = None
+) -> Tuple[Dict[str, Any], int]:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
     try:
 
         crawler = Crawler(session_id=session_id)
-        stats, media_urls = loop.run_until_complete(crawler.crawl(url, depth))
+        stats, media_urls = loop.run_until_complete(crawler.crawl(url, depth, scope))
 
         if media_urls:
             logger.info(f"Found {len(media_urls)} media URLs: {', '.join(media_urls[:5])}")
@@ -86,6 +168,8 @@ def _perform_crawl(url: str, depth: int, session_id: str, cache_manager: CacheMa
         try:
             downloader = MediaDownloader(session_id=session_id)
             media_list = loop.run_until_complete(downloader.download_media(media_urls, url))
+        except MemoryBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error downloading media: {e}")
 
@@ -96,6 +180,9 @@ def _perform_crawl(url: str, depth: int, session_id: str, cache_manager: CacheMa
                 'session_id': session_id
             }), 200
 
+        if result_cache is not None and media_list:
+            result_cache.put(result_key, url, depth, session_id, stats.to_dict(), media_list)
+
         cache_manager.update_session_access_time(session_id)
 
         session_stats = cache_manager.get_session_stats(session_id)
@@ -105,6 +192,8 @@ def _perform_crawl(url: str, depth: int, session_id: str, cache_manager: CacheMa
             'media_count': len(media_list),
             'stats': stats.to_dict(),
             'session_id': session_id,
+            'result_cache': 'miss' if result_cache is not None else 'disabled',
+            **_build_download_info(downloader),
             'cache_info': _build_cache_info(cache_manager, session_id, media_list, session_stats)
         }), 200
     finally:
@@ -114,6 +203,29 @@ def _perform_crawl(url: str, depth: int, session_id: str, cache_manager: CacheMa
         except Exception as e:
             logger.warning(f"Error closing event loop: {e}")
 
+def _build_download_info(downloader: Optional[MediaDownloader] = None) -> Dict[str, Any]:
+
+    if downloader is None:
+        return {
+            'prewarm': {},
+            'redirects': {},
+            'hosts': {},
+            'media_store': {},
+            'media_cache': {},
+            'downloads_reused': 0,
+            'memory': dict(get_memory_governor().get_stats(), download={}),
+        }
+
+    return {
+        'prewarm': downloader.prewarm_stats,
+        'redirects': downloader.redirect_stats,
+        'hosts': downloader.host_stats,
+        'media_store': downloader.store_stats,
+        'media_cache': downloader.http_cache_stats,
+        'downloads_reused': downloader.index_stats.get('reused', 0),
+        'memory': dict(get_memory_governor().get_stats(), download=downloader.memory_stats),
+    }
+
 def _build_cache_info(
     cache_manager: CacheManager,
     session_id: str,
@@ -302,4 +414,115 @@ def _get_current_session_info(cache_manager: CacheManager) -> Optional[Dict[str,
         'media_count': session_stats.get('media_count', 0),
         'disk_usage': session_stats.get('disk_usage', 0),
         'media_types': session_stats.get('media_types', {})
-    }
\ No newline at end of file
+    }
+
+@api_bp.route('/graph', methods=['GET'])
+def get_graph_summary():
+
+    graph_info = _open_crawl_graph()
+    if 'error' in graph_info:
+        return jsonify({'error': graph_info['error']}), graph_info['status_code']
+
+    reader = graph_info['reader']
+    try:
+        return jsonify({'session_id': graph_info['session_id'], **reader.get_summary()})
+    finally:
+        reader.close()
+
+@api_bp.route('/graph/slowest', methods=['GET'])
+def get_slowest_pages():
+
+    graph_info = _open_crawl_graph()
+    if 'error' in graph_info:
+        return jsonify({'error': graph_info['error']}), graph_info['status_code']
+
+    reader = graph_info['reader']
+    try:
+        return jsonify({'pages': reader.slowest_pages(_get_graph_limit())})
+    finally:
+        reader.close()
+
+@api_bp.route('/graph/subtrees', methods=['GET'])
+def get_media_subtrees():
+
+    graph_info = _open_crawl_graph()
+    if 'error' in graph_info:
+        return jsonify({'error': graph_info['error']}), graph_info['status_code']
+
+    reader = graph_info['reader']
+    try:
+        return jsonify({'subtrees': reader.top_media_subtrees(_get_graph_limit())})
+    finally:
+        reader.close()
+
+@api_bp.route('/graph/path', methods=['GET'])
+def get_media_path():
+
+    media_url = request.args.get('url', '')
+    if not media_url:
+        return jsonify({'error': 'Missing url parameter'}), 400
+
+    graph_info = _open_crawl_graph()
+    if 'error' in graph_info:
+        return jsonify({'error': graph_info['error']}), graph_info['status_code']
+
+    reader = graph_info['reader']
+    try:
+        media_path = reader.media_path(media_url)
+    finally:
+        reader.close()
+
+    if media_path is None:
+        return jsonify({'error': 'Media not found in crawl graph'}), 404
+
+    return jsonify(media_path)
+
+@api_bp.route('/graph/links', methods=['GET'])
+def get_page_links():
+
+    page_url = request.args.get('url', '')
+    if not page_url:
+        return jsonify({'error': 'Missing url parameter'}), 400
+
+    graph_info = _open_crawl_graph()
+    if 'error' in graph_info:
+        return jsonify({'error': graph_info['error']}), graph_info['status_code']
+
+    reader = graph_info['reader']
+    try:
+        links = reader.get_links(page_url)
+    finally:
+        reader.close()
+
+    if links is None:
+        return jsonify({'error': 'Page not found in crawl graph'}), 404
+
+    return jsonify({'url': page_url, 'links': links, 'count': len(links)})
+
+def _get_graph_limit() -> int:
+
+    limit = request.args.get('limit', GRAPH_DEFAULT_LIMIT, type=int)
+    return max(1, min(limit, GRAPH_MAX_LIMIT))
+
+def _open_crawl_graph() -> Dict[str, Any]:
+
+    session_info = _check_active_session()
+    if 'error' in session_info:
+        return session_info
+
+    session_id = session_info['session_id']
+    cache_manager = session_info['cache_manager']
+
+    graph_path = cache_manager.get_crawl_graph_path(session_id)
+    if not os.path.exists(graph_path):
+        return {
+            'error': 'No crawl graph for this session',
+            'status_code': 404
+        }
+
+    cache_manager.update_session_access_time(session_id)
+
+    return {
+        'session_id': session_id,
+        'reader': CrawlGraphReader(graph_path)
+    }
@@ -15,6 +15,18 @@ class CacheManager:
     def get_session_path(self, session_id):
         return self.path_manager.get_session_path(session_id)
 
+    def get_warc_dir(self, session_id):
+        return self.path_manager.get_warc_dir(session_id)
+
+    def get_download_index_path(self, session_id):
+        return self.path_manager.get_download_index_path(session_id)
+
+    def get_crawl_graph_path(self, session_id):
+        return self.path_manager.get_crawl_graph_path(session_id)
+
+    def get_shared_dir(self, name):
+        return self.path_manager.get_shared_dir(name)
+
     def create_session(self):
         return self.session_manager.create_session()
 
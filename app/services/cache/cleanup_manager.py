@@ -4,6 +4,9 @@ import json
 import time
 import logging
 
+from app.services.cache.path_manager import SHARED_DIR_NAME
+from app.services.cache.media_store import MediaStore
+
 logger = logging.getLogger(__name__)
 
 class CleanupManager:
@@ -28,6 +31,8 @@ class CleanupManager:
 
             shutil.rmtree(session_path)
             logger.info(f"Cleared cache session: {session_id}")
+
+            self._release_stored_media(session_id)
             return True
         except Exception as e:
             logger.warning(f"Error clearing session {session_id}: {e}")
@@ -39,6 +44,18 @@ class CleanupManager:
                 pass
             return False
 
+    def _get_media_store(self) -> MediaStore:
+
+        return MediaStore(self.path_manager.get_shared_dir('media'))
+
+    def _release_stored_media(self, session_id: str) -> None:
+
+        media_store = self._get_media_store()
+        try:
+            media_store.release_session(session_id)
+        finally:
+            media_store.close()
+
     def clean_expired_sessions(self, expiry_time: int = 3600) -> int:
 
         now = time.time()
@@ -49,7 +66,7 @@ class CleanupManager:
             for item in os.listdir(self.path_manager.base_cache_dir):
                 session_dir = os.path.join(self.path_manager.base_cache_dir, item)
 
-                if not os.path.isdir(session_dir):
+                if not os.path.isdir(session_dir) or item == SHARED_DIR_NAME:
                     continue
 
                 metadata_path = os.path.join(session_dir, 'metadata.json')
@@ -80,12 +97,19 @@ class CleanupManager:
         except Exception as e:
             logger.error(f"Error cleaning expired sessions: {e}")
 
+        media_store = self._get_media_store()
+        try:
+            media_store.collect_garbage()
+        finally:
+            media_store.close()
+
         logger.info(f"Cleaned {sessions_cleared} expired sessions")
         return sessions_cleared
 
     def get_cache_size(self) -> int:
 
         total_size = 0
+        seen_inodes = set()
 
         try:
 
@@ -94,8 +118,16 @@ class CleanupManager:
             for dirpath, dirnames, filenames in os.walk(base_cache_dir):
                 for filename in filenames:
                     filepath = os.path.join(dirpath, filename)
-                    if os.path.exists(filepath):
-                        total_size += os.path.getsize(filepath)
+                    if not os.path.exists(filepath):
+                        continue
+
+                    stat = os.stat(filepath)
+                    if stat.st_nlink > 1:
+                        if (stat.st_dev, stat.st_ino) in seen_inodes:
+                            continue
+                        seen_inodes.add((stat.st_dev, stat.st_ino))
+
+                    total_size += stat.st_size
         except Exception as e:
             logger.error(f"Error calculating cache size: {e}")
 
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models.media import Media
+from app.utils.file_utils.storage import link_file
+from app.config import (
+    CRAWL_RESULT_CACHE_TTL, CRAWL_COALESCE_TIMEOUT, MAX_CRAWL_PAGES, CRAWL_FRONTIER, RESPECT_ROBOTS_TXT,
+    USER_AGENT, FOLLOW_JSON_LINKS, STYLESHEET_MEDIA, FEED_DISCOVERY, ALLOWED_MEDIA_TYPES, MAX_IMAGE_SIZE,
+    MAX_VIDEO_SIZE, MAX_AUDIO_SIZE, WARC_REPLAY_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+CRAWL_RESULT_VERSION = 2
+
+class CrawlResultCache:
+
+    LOCK_POLL_INTERVAL = 0.25
+
+    def __init__(self, cache_manager: Any, ttl: int = CRAWL_RESULT_CACHE_TTL, wait_timeout: int = CRAWL_COALESCE_TIMEOUT):
+
+        self.cache_manager = cache_manager
+        self.cache_dir = cache_manager.get_shared_dir('crawl_results')
+        self.db_path = os.path.join(self.cache_dir, 'results.sqlite3')
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, '
+                'url TEXT NOT NULL, '
+                'depth INTEGER NOT NULL, '
+                'entry_dir TEXT NOT NULL, '
+                'stats TEXT NOT NULL, '
+                'media TEXT NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            self.connection.commit()
+
+        return self.connection
+
+    @staticmethod
+    def make_key(url: str, depth: int, scope: Optional[Dict[str, List[str]]] = None) -> str:
+
+        fingerprint = json.dumps({
+            'version': CRAWL_RESULT_VERSION,
+            'url': url,
+            'depth': depth,
+            'scope': scope,
+            'max_pages': MAX_CRAWL_PAGES,
+            'frontier': CRAWL_FRONTIER,
+            'robots': RESPECT_ROBOTS_TXT,
+            'user_agent': USER_AGENT,
+            'json_links': FOLLOW_JSON_LINKS,
+            'stylesheets': STYLESHEET_MEDIA,
+            'feeds': FEED_DISCOVERY,
+            'media_types': sorted(ALLOWED_MEDIA_TYPES),
+            'size_limits': [MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, MAX_AUDIO_SIZE],
+            'replay': WARC_REPLAY_PATH,
+        }, sort_keys=True)
+
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+    @contextmanager
+    def coalesce(self, key: str) -> Iterator[bool]:
+
+        lock_path = os.path.join(self.cache_dir, f"{key}.lock")
+        lock_file = open(lock_path, 'w')
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        locked = False
+
+        try:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+                    if self._is_current_lock(lock_file, lock_path):
+                        locked = True
+                        break
+
+                    # The previous holder removed this lock file after its crawl, lock the new one
+                    lock_file.close()
+                    lock_file = open(lock_path, 'w')
+                    continue
+                except BlockingIOError:
+                    if not waited:
+                        logger.info(f"Identical crawl {key[:12]} already running, waiting for its result")
+                    waited = True
+
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for running crawl {key[:12]}, crawling independently")
+                    break
+
+                time.sleep(self.LOCK_POLL_INTERVAL)
+
+            yield waited
+        finally:
+            if locked:
+                # Unlinked while still held, so no waiter can lock a file that is about to disappear
+                try:
+                    os.remove(lock_path)
+                except OSError as e:
+                    logger.debug(f"Error removing crawl lock {lock_path}: {e}")
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @staticmethod
+    def _is_current_lock(lock_file: Any, lock_path: str) -> bool:
+
+        try:
+            opened, current = os.fstat(lock_file.fileno()), os.stat(lock_path)
+        except OSError:
+            return False
+
+        return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+    def _get_entry(self, key: str) -> Optional[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]]:
+
+        try:
+            with self.lock:
+                row = self._connect().execute(
+                    'SELECT entry_dir, stats, media, created_at FROM results WHERE key = ?', (key,)
+                ).fetchone()
+        except Exception as e:
+            logger.warning(f"Error reading crawl result cache: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        entry_dir, stats, media, created_at = row
+        if self.ttl > 0 and time.time() - created_at > self.ttl:
+            self._remove_entry(key, entry_dir)
+            return None
+
+        return entry_dir, json.loads(stats), json.loads(media)
+
+    def materialize(self, key: str, session_id: str) -> Optional[Tuple[Dict[str, Any], List[Media]]]:
+
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+
+        entry_dir, stats, media_data = entry
+        session_path = self.cache_manager.get_session_path(session_id)
+        thumbnails_dir = self.cache_manager.path_manager.get_thumbnails_dir(session_id)
+        media_list = []
+
+        for media_dict in media_data:
+            file_name = media_dict.get('file_path')
+            if not file_name or not link_file(os.path.join(entry_dir, 'files', file_name),
+                                              os.path.join(session_path, file_name), overwrite=True):
+                logger.warning(f"Cached crawl result {key[:12]} is missing {file_name}, discarding it")
+                self._remove_entry(key, entry_dir)
+                return None
+
+            media_dict = dict(media_dict, session_id=session_id, file_path=os.path.join(session_path, file_name))
+
+            thumbnail_name = media_dict.get('thumbnail_path')
+            if thumbnail_name and link_file(os.path.join(entry_dir, 'thumbnails', thumbnail_name),
+                                            os.path.join(thumbnails_dir, thumbnail_name), overwrite=True):
+                media_dict['thumbnail_path'] = os.path.join(thumbnails_dir, thumbnail_name)
+            else:
+                media_dict['thumbnail_path'] = None
+
+            media_dict.pop('cached_filename', None)
+            media_list.append(Media.from_dict(media_dict))
+
+        link_file(os.path.join(entry_dir, 'crawl_graph.sqlite3'),
+                  self.cache_manager.get_crawl_graph_path(session_id), overwrite=True)
+
+        self.cache_manager.save_media_metadata(session_id, media_list)
+        self.cache_manager.update_session_metadata(session_id, len(media_list))
+
+        logger.info(f"Materialized cached crawl result {key[:12]} with {len(media_list)} media into session {session_id}")
+        return stats, media_list
+
+    def put(self, key: str, url: str, depth: int, session_id: str, stats: Dict[str, Any], media_list: List[Media]) -> None:
+
+        entry_dir = os.path.join(self.cache_dir, f"{key}-{time.time_ns()}")
+        media_data = []
+
+        try:
+            for media in media_list:
+                if not media.file_path or not link_file(media.file_path, os.path.join(entry_dir, 'files', os.path.basename(media.file_path))):
+                    logger.debug(f"Not caching crawl result for {url}: {media.url} has no file")
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    return
+
+                media_dict = media.to_dict()
+                media_dict['file_path'] = os.path.basename(media.file_path)
+
+                if media.thumbnail_path and link_file(media.thumbnail_path,
+                                                      os.path.join(entry_dir, 'thumbnails', os.path.basename(media.thumbnail_path))):
+                    media_dict['thumbnail_path'] = os.path.basename(media.thumbnail_path)
+                else:
+                    media_dict['thumbnail_path'] = None
+
+                media_data.append(media_dict)
+
+            link_file(self.cache_manager.get_crawl_graph_path(session_id), os.path.join(entry_dir, 'crawl_graph.sqlite3'))
+
+            with self.lock:
+                connection = self._connect()
+                previous = connection.execute('SELECT entry_dir FROM results WHERE key = ?', (key,)).fetchone()
+                connection.execute(
+                    'INSERT OR REPLACE INTO results (key, url, depth, entry_dir, stats, media, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, url, depth, entry_dir, json.dumps(stats), json.dumps(media_data), time.time())
+                )
+                connection.commit()
+
+            if previous is not None and previous[0] != entry_dir:
+                shutil.rmtree(previous[0], ignore_errors=True)
+
+            logger.info(f"Cached crawl result for {url} (depth {depth}) with {len(media_data)} media")
+        except Exception as e:
+            logger.warning(f"Error caching crawl result for {url}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+        self.purge_expired()
+
+    def _remove_entry(self, key: str, entry_dir: str) -> None:
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute('DELETE FROM results WHERE key = ? AND entry_dir = ?', (key, entry_dir))
+                connection.commit()
+        except Exception as e:
+            logger.warning(f"Error removing cached crawl result {key[:12]}: {e}")
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def _purge_stale_locks(self) -> int:
+
+        # Lock files left behind by crawls that died while holding them
+        cutoff = time.time() - self.wait_timeout
+        removed = 0
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.lock'):
+                continue
+
+            lock_path = os.path.join(self.cache_dir, name)
+            try:
+                if os.path.getmtime(lock_path) >= cutoff:
+                    continue
+
+                with open(lock_path, 'a') as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+
+                    if self._is_current_lock(lock_file, lock_path):
+                        os.remove(lock_path)
+                        removed += 1
+            except OSError as e:
+                logger.debug(f"Error removing stale crawl lock {lock_path}: {e}")
+
+        return removed
+
+    def purge_expired(self) -> int:
+
+        self._purge_stale_locks()
+
+        if self.ttl <= 0:
+            return 0
+
+        try:
+            with self.lock:
+                expired = self._connect().execute(
+                    'SELECT key, entry_dir FROM results WHERE created_at < ?', (time.time() - self.ttl,)
+                ).fetchall()
+        except Exception as e:
+            logger.warning(f"Error purging crawl result cache: {e}")
+            return 0
+
+        for key, entry_dir in expired:
+            self._remove_entry(key, entry_dir)
+
+        if expired:
+            logger.info(f"Purged {len(expired)} expired crawl results")
+        return len(expired)
+
+    def close(self) -> None:
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
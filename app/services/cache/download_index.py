@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class DownloadIndex:
+
+    FLUSH_INTERVAL = 32
+    COMPACT_MIN_LINES = 256
+
+    def __init__(self, index_path: str):
+
+        self.index_path = index_path
+        self.session_dir = os.path.dirname(index_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+        self.pending_lock = threading.Lock()
+        self.pending_lines: List[str] = []
+
+        self.reused = 0
+        self.stale = 0
+
+        self._load()
+
+    def _load(self) -> None:
+
+        if not os.path.exists(self.index_path):
+            return
+
+        lines = 0
+
+        try:
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+
+                    if entry.get('removed'):
+                        self.entries.pop(entry.get('url'), None)
+                    elif entry.get('url') and entry.get('file'):
+                        self.entries[entry['url']] = entry
+        except OSError as e:
+            logger.warning(f"Error reading download index {self.index_path}: {e}")
+            return
+
+        if self.entries:
+            logger.info(f"Loaded {len(self.entries)} completed downloads from {self.index_path}")
+
+        if lines >= self.COMPACT_MIN_LINES and lines > 2 * len(self.entries):
+            self._compact(lines)
+
+    def _compact(self, lines: int) -> None:
+
+        temp_path = f"{self.index_path}.tmp"
+
+        try:
+            with open(temp_path, 'w') as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Error compacting download index {self.index_path}: {e}")
+            return
+
+        logger.debug(f"Compacted download index {self.index_path} from {lines} to {len(self.entries)} lines")
+
+    def get_file_path(self, entry: Dict[str, Any]) -> str:
+
+        return os.path.join(self.session_dir, entry['file'])
+
+    def find_complete(self, url: str, blob_path: Optional[str] = None) -> Optional[str]:
+
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+
+        file_path = self.get_file_path(entry)
+
+        try:
+            stat = os.stat(file_path)
+            complete = stat.st_size == entry['size']
+
+            if complete and blob_path and entry.get('digest'):
+                complete = os.path.exists(blob_path) and os.path.samefile(file_path, blob_path)
+            elif complete and entry.get('mtime'):
+                complete = int(stat.st_mtime) == entry['mtime']
+        except OSError:
+            complete = False
+
+        if not complete:
+            self.stale += 1
+            self.remove(url)
+            logger.debug(f"Ignoring incomplete or changed download for {url}: {file_path}")
+            return None
+
+        self.reused += 1
+        return file_path
+
+    def record(self, url: str, file_path: str, mime_type: str, details: Optional[Dict[str, Any]] = None) -> None:
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+
+        entry = {
+            'url': url,
+            'file': os.path.relpath(file_path, self.session_dir),
+            'size': stat.st_size,
+            'mtime': int(stat.st_mtime),
+            'mime_type': mime_type,
+            'downloaded_at': time.time(),
+        }
+        entry.update(details or {})
+
+        self.entries[url] = entry
+        self._append(entry)
+
+    def remove(self, url: str) -> None:
+
+        if self.entries.pop(url, None) is not None:
+            self._append({'url': url, 'removed': True})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+
+        with self.pending_lock:
+            self.pending_lines.append(json.dumps(entry) + '\n')
+
+    def needs_flush(self) -> bool:
+
+        return len(self.pending_lines) >= self.FLUSH_INTERVAL
+
+    def flush(self) -> None:
+
+        with self.pending_lock:
+            lines, self.pending_lines = self.pending_lines, []
+
+        if not lines:
+            return
+
+        try:
+            with self.lock:
+                with open(self.index_path, 'a') as f:
+                    f.writelines(lines)
+        except OSError as e:
+            logger.warning(f"Error writing download index {self.index_path}: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+
+        return {'indexed': len(self.entries), 'reused': self.reused, 'stale': self.stale}
+
+    def close(self) -> None:
+
+        self.flush()
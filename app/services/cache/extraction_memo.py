@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import importlib.util
+
+from typing import Dict, Any, Optional, Set, Tuple
+
+from app.config import CACHE_DIR, EXTRACTION_MEMO_MAX_SIZE
+from app.services.cache.path_manager import CachePathManager
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_VERSION = 3
+EXTRACTOR_MODULES = (
+    'app.services.crawler.page_parser',
+    'app.services.crawler.fast_extractor',
+    'app.services.crawler.link_classifier',
+    'app.services.crawler.url_utils',
+    'app.utils.http.response',
+)
+
+def _get_extractor_fingerprint() -> str:
+
+    # Memoized results are only valid for the parser code that produced them
+    hasher = hashlib.sha256(str(EXTRACTOR_VERSION).encode())
+
+    for module in EXTRACTOR_MODULES:
+        spec = importlib.util.find_spec(module)
+        try:
+            with open(spec.origin, 'rb') as f:
+                hasher.update(f.read())
+        except (AttributeError, TypeError, OSError) as e:
+            logger.debug(f"Cannot fingerprint extractor module {module}: {e}")
+            hasher.update(module.encode())
+
+    return hasher.hexdigest()[:16]
+
+EXTRACTOR_FINGERPRINT = _get_extractor_fingerprint()
+
+class ExtractionMemo:
+
+    EVICTION_CHECK_INTERVAL = 64
+    FLUSH_INTERVAL = 32
+    LOW_WATER_RATIO = 0.9
+
+    def __init__(self, memo_dir: Optional[str] = None, max_size: int = EXTRACTION_MEMO_MAX_SIZE):
+
+        if memo_dir is None:
+            memo_dir = CachePathManager(CACHE_DIR).get_shared_dir('extraction_memo')
+
+        self.db_path = os.path.join(memo_dir, 'memo.sqlite3')
+        self.max_size = max_size
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.pending_lock = threading.Lock()
+        self.pending_rows: Dict[str, Tuple[Any, ...]] = {}
+        self.pending_uses: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._puts_since_check = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS memo ('
+                'key TEXT PRIMARY KEY, '
+                'links TEXT NOT NULL, '
+                'media TEXT NOT NULL, '
+                'context TEXT NOT NULL, '
+                'stylesheets TEXT NOT NULL DEFAULT \'[]\', '
+                'feeds TEXT NOT NULL DEFAULT \'[]\', '
+                'size INTEGER NOT NULL, '
+                'body_size INTEGER NOT NULL, '
+                'last_used REAL NOT NULL, '
+                'hits INTEGER NOT NULL DEFAULT 0)'
+            )
+            columns = {row[1] for row in self.connection.execute('PRAGMA table_info(memo)')}
+            for column in ('stylesheets', 'feeds'):
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE memo ADD COLUMN {column} TEXT NOT NULL DEFAULT '[]'")
+            self.connection.execute('CREATE INDEX IF NOT EXISTS memo_last_used ON memo (last_used)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS memo_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            self.connection.commit()
+
+        return self.connection
+
+    @staticmethod
+    def make_key(content_hash: str, url: str) -> str:
+
+        return f"{EXTRACTOR_FINGERPRINT}:{content_hash}:{url}"
+
+    def get(self, content_hash: str, url: str) -> Optional[Tuple[Set[str], Set[str], Dict[str, str], Set[str], Set[str]]]:
+
+        key = self.make_key(content_hash, url)
+
+        try:
+            with self.pending_lock:
+                pending = self.pending_rows.get(key)
+
+            if pending is not None:
+                row = (pending[1], pending[2], pending[3], pending[7], pending[4], pending[5])
+            else:
+                with self.lock:
+                    row = self._connect().execute(
+                        'SELECT links, media, context, body_size, stylesheets, feeds FROM memo WHERE key = ?', (key,)
+                    ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            with self.pending_lock:
+                self.pending_uses[key] = self.pending_uses.get(key, 0) + 1
+
+            self.hits += 1
+            self.bytes_saved += row[3]
+
+            return set(json.loads(row[0])), set(json.loads(row[1])), json.loads(row[2]), set(json.loads(row[4])), set(json.loads(row[5]))
+        except Exception as e:
+            logger.warning(f"Error reading extraction memo for {url}: {e}")
+            self.misses += 1
+            return None
+
+    def put(self,
+            content_hash: str,
+            url: str,
+            links: Set[str],
+            media: Set[str],
+            link_context: Optional[Dict[str, str]] = None,
+            body_size: int = 0,
+            stylesheets: Optional[Set[str]] = None,
+            feeds: Optional[Set[str]] = None) -> None:
+
+        key = self.make_key(content_hash, url)
+
+        links_json = json.dumps(sorted(links))
+        media_json = json.dumps(sorted(media))
+        context_json = json.dumps(link_context or {})
+        stylesheets_json = json.dumps(sorted(stylesheets or ()))
+        feeds_json = json.dumps(sorted(feeds or ()))
+        size = len(key) + len(links_json) + len(media_json) + len(context_json) + len(stylesheets_json) + len(feeds_json)
+
+        with self.pending_lock:
+            self.pending_rows[key] = (
+                key, links_json, media_json, context_json, stylesheets_json, feeds_json, size, body_size, time.time()
+            )
+            self.pending_uses.pop(key, None)
+
+        self.stores += 1
+
+    def needs_flush(self) -> bool:
+
+        return len(self.pending_rows) + len(self.pending_uses) >= self.FLUSH_INTERVAL
+
+    def flush(self) -> None:
+
+        with self.pending_lock:
+            rows = list(self.pending_rows.values())
+            uses = list(self.pending_uses.items())
+            self.pending_rows = {}
+            self.pending_uses = {}
+
+        if not rows and not uses:
+            return
+
+        now = time.time()
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.executemany(
+                    'INSERT OR REPLACE INTO memo (key, links, media, context, stylesheets, feeds, size, body_size, last_used, hits) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                    rows
+                )
+                connection.executemany(
+                    'UPDATE memo SET last_used = ?, hits = hits + ? WHERE key = ?',
+                    [(now, count, key) for key, count in uses]
+                )
+                connection.commit()
+
+                self._puts_since_check += len(rows)
+
+                if self._puts_since_check >= self.EVICTION_CHECK_INTERVAL:
+                    self._puts_since_check = 0
+                    self._evict_if_needed(connection)
+        except Exception as e:
+            logger.warning(f"Error writing extraction memo: {e}")
+
+    def _evict_if_needed(self, connection: sqlite3.Connection) -> None:
+
+        total_size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM memo').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        target = int(self.max_size * self.LOW_WATER_RATIO)
+        evicted = 0
+
+        cursor = connection.execute('SELECT key, size FROM memo ORDER BY last_used ASC')
+        keys = []
+        for key, size in cursor:
+            if total_size <= target:
+                break
+            keys.append((key,))
+            total_size -= size
+            evicted += 1
+
+        connection.executemany('DELETE FROM memo WHERE key = ?', keys)
+        connection.commit()
+
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} extraction memo entries to stay under {self.max_size} bytes")
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        lookups = self.hits + self.misses
+
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(100 * self.hits / lookups, 1) if lookups > 0 else 0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'bytes_saved': self.bytes_saved,
+        }
+
+        self.flush()
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM memo').fetchone()
+                totals = dict(connection.execute('SELECT name, value FROM memo_stats').fetchall())
+
+            stats.update({
+                'entries': entries,
+                'size': size,
+                'max_size': self.max_size,
+                'lifetime_hits': totals.get('hits', 0) + self.hits,
+                'lifetime_misses': totals.get('misses', 0) + self.misses,
+                'lifetime_evictions': totals.get('evictions', 0) + self.evictions,
+            })
+        except Exception as e:
+            logger.warning(f"Error reading extraction memo stats: {e}")
+
+        return stats
+
+    def close(self) -> None:
+
+        self.flush()
+
+        with self.lock:
+            if self.connection is None:
+                return
+
+            try:
+                for name, value in (('hits', self.hits), ('misses', self.misses), ('evictions', self.evictions)):
+                    if value:
+                        self.connection.execute(
+                            'INSERT INTO memo_stats (name, value) VALUES (?, ?) '
+                            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                            (name, value)
+                        )
+                self.connection.commit()
+            except Exception as e:
+                logger.warning(f"Error saving extraction memo stats: {e}")
+            finally:
+                self.connection.close()
+                self.connection = None
+                self.hits = self.misses = self.evictions = 0
\ No newline at end of file
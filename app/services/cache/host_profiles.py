@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from urllib.parse import urlsplit
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import CACHE_DIR, HOST_PROFILE_ROBOTS_TTL
+from app.services.cache.path_manager import CachePathManager
+
+logger = logging.getLogger(__name__)
+
+PROFILE_LATENCY_SAMPLES = 50
+LOAD_BATCH_SIZE = 500
+THROTTLE_STATUSES = (429, 503)
+
+class HostProfile:
+
+    __slots__ = (
+        'host', 'known', 'robots', 'robots_status', 'robots_fetched_at', 'robots_updated',
+        'latencies', 'requests', 'timeouts', 'throttled', 'concurrency',
+        'new_latencies', 'new_requests', 'new_timeouts', 'new_throttled', 'concurrency_updated'
+    )
+
+    def __init__(self, host: str):
+
+        self.host = host
+        self.known = False
+
+        self.robots: Optional[str] = None
+        self.robots_status = 0
+        self.robots_fetched_at = 0.0
+        self.robots_updated = False
+
+        self.latencies: List[float] = []
+        self.requests = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.concurrency = 0
+
+        self.new_latencies: List[float] = []
+        self.new_requests = 0
+        self.new_timeouts = 0
+        self.new_throttled = 0
+        self.concurrency_updated = False
+
+    @property
+    def is_dirty(self) -> bool:
+
+        return bool(self.robots_updated or self.new_latencies or self.new_requests
+                    or self.new_timeouts or self.new_throttled or self.concurrency_updated)
+
+    def reset_pending(self) -> None:
+
+        self.robots_updated = False
+        self.new_latencies = []
+        self.new_requests = 0
+        self.new_timeouts = 0
+        self.new_throttled = 0
+        self.concurrency_updated = False
+
+class HostProfileStore:
+
+    def __init__(self, cache_dir: Optional[str] = None):
+
+        if cache_dir is None:
+            cache_dir = CachePathManager(CACHE_DIR).get_shared_dir('hosts')
+
+        self.db_path = os.path.join(cache_dir, 'hosts.sqlite3')
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS hosts ('
+                'host TEXT PRIMARY KEY, '
+                'robots TEXT, '
+                'robots_status INTEGER NOT NULL DEFAULT 0, '
+                'robots_fetched_at REAL NOT NULL DEFAULT 0, '
+                'latencies TEXT NOT NULL, '
+                'requests INTEGER NOT NULL DEFAULT 0, '
+                'timeouts INTEGER NOT NULL DEFAULT 0, '
+                'throttled INTEGER NOT NULL DEFAULT 0, '
+                'concurrency INTEGER NOT NULL DEFAULT 0, '
+                'updated_at REAL NOT NULL)'
+            )
+
+        return self.connection
+
+    def load(self, host: str) -> HostProfile:
+
+        return self.load_many([host])[host]
+
+    def load_many(self, hosts: Iterable[str]) -> Dict[str, HostProfile]:
+
+        profiles = {host: HostProfile(host) for host in hosts}
+        host_list = sorted(profiles)
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                rows = []
+
+                for start in range(0, len(host_list), LOAD_BATCH_SIZE):
+                    batch = host_list[start:start + LOAD_BATCH_SIZE]
+                    rows.extend(connection.execute(
+                        'SELECT host, robots, robots_status, robots_fetched_at, latencies, requests, timeouts, throttled, '
+                        f"concurrency FROM hosts WHERE host IN ({', '.join('?' * len(batch))})", batch
+                    ).fetchall())
+        except Exception as e:
+            logger.warning(f"Error reading host profiles for {', '.join(host_list)}: {e}")
+            return profiles
+
+        for row in rows:
+            profile = profiles[row[0]]
+            self._apply_row(profile, row[1:])
+            profile.known = True
+
+        return profiles
+
+    @staticmethod
+    def _apply_row(profile: HostProfile, row: Tuple[Any, ...]) -> None:
+
+        (profile.robots, profile.robots_status, profile.robots_fetched_at, latencies,
+         profile.requests, profile.timeouts, profile.throttled, profile.concurrency) = row
+        profile.latencies = json.loads(latencies)
+
+    def save(self, profiles: Iterable[HostProfile]) -> int:
+
+        saved = 0
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute('BEGIN IMMEDIATE')
+
+                try:
+                    for profile in profiles:
+                        self._merge(connection, profile)
+                        saved += 1
+                    connection.execute('COMMIT')
+                except Exception:
+                    connection.execute('ROLLBACK')
+                    raise
+        except Exception as e:
+            logger.warning(f"Error saving host profiles: {e}")
+            return 0
+
+        return saved
+
+    def _merge(self, connection: sqlite3.Connection, profile: HostProfile) -> None:
+
+        row = connection.execute(
+            'SELECT robots, robots_status, robots_fetched_at, latencies, requests, timeouts, throttled, concurrency '
+            'FROM hosts WHERE host = ?', (profile.host,)
+        ).fetchone()
+
+        stored = HostProfile(profile.host)
+        if row is not None:
+            self._apply_row(stored, row)
+
+        if profile.robots_updated:
+            stored.robots, stored.robots_status, stored.robots_fetched_at = (
+                profile.robots, profile.robots_status, profile.robots_fetched_at
+            )
+
+        if profile.concurrency_updated:
+            stored.concurrency = profile.concurrency
+
+        latencies = (stored.latencies + profile.new_latencies)[-PROFILE_LATENCY_SAMPLES:]
+
+        connection.execute(
+            'INSERT OR REPLACE INTO hosts (host, robots, robots_status, robots_fetched_at, latencies, requests, '
+            'timeouts, throttled, concurrency, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                profile.host, stored.robots, stored.robots_status, stored.robots_fetched_at,
+                json.dumps([round(latency, 4) for latency in latencies]),
+                stored.requests + profile.new_requests,
+                stored.timeouts + profile.new_timeouts,
+                stored.throttled + profile.new_throttled,
+                stored.concurrency, time.time()
+            )
+        )
+
+    def close(self) -> None:
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+class HostProfiles:
+
+    def __init__(self,
+                 store: Optional[HostProfileStore] = None,
+                 robots_ttl: int = HOST_PROFILE_ROBOTS_TTL,
+                 persist: bool = True):
+
+        self.store = store if store is not None else HostProfileStore()
+        self.robots_ttl = robots_ttl
+        self.persist = persist
+        self.profiles: Dict[str, HostProfile] = {}
+        self.lock = threading.Lock()
+
+        self.robots_reused = 0
+
+    @staticmethod
+    def get_host(url: str) -> str:
+
+        return urlsplit(url).netloc.lower()
+
+    def get_unloaded_hosts(self, urls: Iterable[str]) -> Set[str]:
+
+        hosts = {self.get_host(url) for url in urls}
+
+        with self.lock:
+            return {host for host in hosts if host not in self.profiles}
+
+    def load_hosts(self, hosts: Iterable[str]) -> None:
+
+        with self.lock:
+            hosts = [host for host in set(hosts) if host not in self.profiles]
+
+        if not hosts:
+            return
+
+        loaded = self.store.load_many(hosts)
+
+        with self.lock:
+            for host, profile in loaded.items():
+                if host not in self.profiles:
+                    self.profiles[host] = profile
+                    self._log_loaded(profile)
+
+    def get(self, host: str) -> HostProfile:
+
+        # Callers on the event loop load new hosts through load_hosts() in an executor first
+        with self.lock:
+            profile = self.profiles.get(host)
+            if profile is None:
+                profile = self.profiles[host] = self.store.load(host)
+                self._log_loaded(profile)
+
+        return profile
+
+    @staticmethod
+    def _log_loaded(profile: HostProfile) -> None:
+
+        if profile.known:
+            logger.debug(f"Loaded profile for {profile.host}: {len(profile.latencies)} latency samples, "
+                         f"concurrency {profile.concurrency or 'unknown'}")
+
+    def get_robots(self, host: str) -> Optional[Tuple[Optional[str], int]]:
+
+        profile = self.get(host)
+
+        if not profile.robots_status or (self.robots_ttl > 0 and time.time() - profile.robots_fetched_at > self.robots_ttl):
+            return None
+
+        self.robots_reused += 1
+        return profile.robots, profile.robots_status
+
+    def record_robots(self, host: str, content: Optional[str], status: int) -> None:
+
+        profile = self.get(host)
+        profile.robots = content
+        profile.robots_status = status
+        profile.robots_fetched_at = time.time()
+        profile.robots_updated = True
+
+    def record_latency(self, host: str, latency: float) -> None:
+
+        profile = self.get(host)
+        profile.latencies.append(latency)
+        profile.new_latencies.append(latency)
+
+        if len(profile.latencies) > PROFILE_LATENCY_SAMPLES:
+            del profile.latencies[:-PROFILE_LATENCY_SAMPLES]
+        if len(profile.new_latencies) > PROFILE_LATENCY_SAMPLES:
+            del profile.new_latencies[:-PROFILE_LATENCY_SAMPLES]
+
+    def record_timeout(self, host: str) -> None:
+
+        profile = self.get(host)
+        profile.timeouts += 1
+        profile.new_timeouts += 1
+
+    def record_response(self, url: str, status: int) -> None:
+
+        profile = self.get(self.get_host(url))
+        profile.requests += 1
+        profile.new_requests += 1
+
+        if status in THROTTLE_STATUSES:
+            profile.throttled += 1
+            profile.new_throttled += 1
+
+    def record_concurrency(self, host: str, concurrency: int) -> None:
+
+        profile = self.get(host)
+        profile.concurrency = concurrency
+        profile.concurrency_updated = True
+
+    def get_dirty(self) -> List[HostProfile]:
+
+        with self.lock:
+            return [profile for profile in self.profiles.values() if profile.is_dirty]
+
+    def save(self) -> int:
+
+        # Profiles that are not persisted here are handed to their owner through get_dirty()
+        if not self.persist:
+            return 0
+
+        dirty = self.get_dirty()
+        if not dirty:
+            return 0
+
+        saved = self.store.save(dirty)
+
+        if saved:
+            for profile in dirty:
+                profile.reset_pending()
+            logger.info(f"Saved {saved} host profiles")
+
+        return saved
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self.lock:
+            known = sum(1 for profile in self.profiles.values() if profile.known)
+            total = len(self.profiles)
+
+        return {'known': known, 'new': total - known, 'robots_reused': self.robots_reused}
+
+    def close(self) -> None:
+
+        self.save()
+        self.store.close()
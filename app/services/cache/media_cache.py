@@ -0,0 +1,230 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+from app.config import CACHE_DIR, MEDIA_HTTP_CACHE_MAX_AGE
+from app.services.cache.path_manager import CachePathManager
+
+logger = logging.getLogger(__name__)
+
+HEURISTIC_RATIO = 0.1
+HEURISTIC_MAX_AGE = 24 * 3600
+
+COLUMNS = ('url', 'digest', 'size', 'mime_type', 'etag', 'last_modified', 'cache_control', 'expires',
+           'fetched_at', 'fresh_until')
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+
+    directives: Dict[str, Optional[str]] = {}
+
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip().strip('"') or None
+
+    return directives
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+
+    if not value:
+        return None
+
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+def get_freshness_lifetime(headers: Mapping[str, Optional[str]], now: float) -> Optional[float]:
+
+    directives = parse_cache_control(headers.get('Cache-Control'))
+
+    if 'no-store' in directives:
+        return None
+
+    if 'no-cache' in directives:
+        return 0
+
+    if 'max-age' in directives:
+        try:
+            return max(0, int(directives['max-age'] or ''))
+        except ValueError:
+            return 0
+
+    date = parse_http_date(headers.get('Date')) or now
+
+    if headers.get('Expires'):
+        expires = parse_http_date(headers.get('Expires'))
+        return max(0, expires - date) if expires is not None else 0
+
+    last_modified = parse_http_date(headers.get('Last-Modified'))
+    if last_modified is not None and last_modified < date:
+        return min(HEURISTIC_MAX_AGE, (date - last_modified) * HEURISTIC_RATIO)
+
+    return 0
+
+def get_current_age(headers: Mapping[str, Optional[str]], now: float) -> float:
+
+    try:
+        age = max(0, int(headers.get('Age') or 0))
+    except ValueError:
+        age = 0
+
+    date = parse_http_date(headers.get('Date'))
+    apparent_age = max(0, now - date) if date is not None else 0
+
+    return max(apparent_age, age)
+
+class MediaHttpCache:
+
+    def __init__(self, cache_dir: Optional[str] = None, max_age: int = MEDIA_HTTP_CACHE_MAX_AGE):
+
+        if cache_dir is None:
+            cache_dir = CachePathManager(CACHE_DIR).get_shared_dir('media')
+
+        self.db_path = os.path.join(cache_dir, 'responses.sqlite3')
+        self.max_age = max_age
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_not_fetched = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'url TEXT PRIMARY KEY, '
+                'digest TEXT NOT NULL, '
+                'size INTEGER NOT NULL, '
+                'mime_type TEXT, '
+                'etag TEXT, '
+                'last_modified TEXT, '
+                'cache_control TEXT, '
+                'expires TEXT, '
+                'fetched_at REAL NOT NULL, '
+                'fresh_until REAL NOT NULL)'
+            )
+            self.connection.commit()
+
+        return self.connection
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+
+        try:
+            with self.lock:
+                row = self._connect().execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM responses WHERE url = ?", (url,)
+                ).fetchone()
+        except Exception as e:
+            logger.warning(f"Error reading media cache for {url}: {e}")
+            return None
+
+        return dict(zip(COLUMNS, row)) if row else None
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+
+        return entry['fresh_until'] > time.time()
+
+    @staticmethod
+    def get_conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record_hit(self, entry: Dict[str, Any]) -> None:
+
+        self.hits += 1
+        self.bytes_not_fetched += entry['size']
+
+    def store(self, url: str, headers: Mapping[str, str], digest: str, size: int, mime_type: Optional[str]) -> None:
+
+        self.misses += 1
+        self._save(url, headers, digest, size, mime_type)
+
+    def refresh(self, url: str, entry: Dict[str, Any], headers: Mapping[str, str]) -> None:
+
+        self.revalidated += 1
+        self.bytes_not_fetched += entry['size']
+
+        merged = {
+            'ETag': headers.get('ETag') or entry['etag'],
+            'Last-Modified': headers.get('Last-Modified') or entry['last_modified'],
+            'Cache-Control': headers.get('Cache-Control') or entry.get('cache_control'),
+            'Expires': headers.get('Expires') or entry.get('expires'),
+            'Date': headers.get('Date'),
+            'Age': headers.get('Age'),
+        }
+        self._save(url, merged, entry['digest'], entry['size'], entry['mime_type'])
+
+    def _save(self, url: str, headers: Mapping[str, Optional[str]], digest: str, size: int, mime_type: Optional[str]) -> None:
+
+        now = time.time()
+        lifetime = get_freshness_lifetime(headers, now)
+
+        if lifetime is None or not (lifetime or headers.get('ETag') or headers.get('Last-Modified')):
+            self.forget(url)
+            return
+
+        if self.max_age > 0:
+            lifetime = min(lifetime, self.max_age)
+
+        fresh_until = now + max(0, lifetime - get_current_age(headers, now))
+
+        row = (
+            url, digest, size, mime_type, headers.get('ETag'), headers.get('Last-Modified'),
+            headers.get('Cache-Control'), headers.get('Expires'), now, fresh_until
+        )
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute(
+                    f"INSERT OR REPLACE INTO responses ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    row
+                )
+                connection.commit()
+        except Exception as e:
+            logger.warning(f"Error writing media cache for {url}: {e}")
+
+    def forget(self, url: str) -> None:
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute('DELETE FROM responses WHERE url = ?', (url,))
+                connection.commit()
+        except Exception as e:
+            logger.warning(f"Error removing media cache entry for {url}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes_not_fetched': self.bytes_not_fetched,
+        }
+
+    def close(self) -> None:
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
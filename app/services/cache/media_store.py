@@ -0,0 +1,253 @@
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+
+from typing import Any, Dict, List, Optional
+
+from app.config import CACHE_DIR
+from app.services.cache.path_manager import CachePathManager
+from app.utils.file_utils.storage import link_file
+
+logger = logging.getLogger(__name__)
+
+BLOB_MODE = 0o444
+ORPHAN_GRACE_PERIOD = 300
+
+class MediaStore:
+
+    def __init__(self, cache_dir: Optional[str] = None):
+
+        if cache_dir is None:
+            cache_dir = CachePathManager(CACHE_DIR).get_shared_dir('media')
+
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.temp_dir = os.path.join(cache_dir, 'tmp')
+        self.db_path = os.path.join(cache_dir, 'media.sqlite3')
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS blobs ('
+                'digest TEXT PRIMARY KEY, '
+                'size INTEGER NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS refs ('
+                'session_id TEXT NOT NULL, '
+                'digest TEXT NOT NULL, '
+                'PRIMARY KEY (session_id, digest))'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest)')
+
+        return self.connection
+
+    def get_blob_path(self, digest: str) -> str:
+
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def create_temp_file(self) -> str:
+
+        fd, temp_path = tempfile.mkstemp(prefix='download-', dir=self.temp_dir)
+        os.close(fd)
+        return temp_path
+
+    def add(self,
+            digest: str,
+            size: int,
+            destination: str,
+            session_id: str,
+            data: Optional[bytes] = None,
+            temp_path: Optional[str] = None) -> bool:
+
+        blob_path = self.get_blob_path(digest)
+
+        try:
+            deduplicated = os.path.exists(blob_path)
+
+            if not deduplicated:
+                self._write_blob(blob_path, data, temp_path)
+
+            if not link_file(blob_path, destination, overwrite=True):
+                if not deduplicated:
+                    raise OSError(f"could not link {blob_path} to {destination}")
+
+                # The blob was collected between the check and the link, store it again
+                deduplicated = False
+                self._write_blob(blob_path, data, temp_path)
+                if not link_file(blob_path, destination, overwrite=True):
+                    raise OSError(f"could not link {blob_path} to {destination}")
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self._add_rows(digest, size, session_id, deduplicated)
+
+        if deduplicated:
+            logger.debug(f"Reused stored blob {digest[:12]} for {destination}")
+
+        return deduplicated
+
+    def link(self, digest: str, size: int, destination: str, session_id: str) -> bool:
+
+        if not link_file(self.get_blob_path(digest), destination, overwrite=True):
+            return False
+
+        self._add_rows(digest, size, session_id, True)
+        return True
+
+    def _add_rows(self, digest: str, size: int, session_id: str, deduplicated: bool) -> None:
+
+        with self.lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+
+            try:
+                connection.execute(
+                    'INSERT OR IGNORE INTO blobs (digest, size, created_at) VALUES (?, ?, ?)',
+                    (digest, size, time.time())
+                )
+                connection.execute('INSERT OR IGNORE INTO refs (session_id, digest) VALUES (?, ?)', (session_id, digest))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+            if deduplicated:
+                self.deduplicated += 1
+                self.bytes_saved += size
+            else:
+                self.stored += 1
+
+    def _write_blob(self, blob_path: str, data: Optional[bytes], temp_path: Optional[str]) -> None:
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+        if temp_path is None:
+            temp_path = self.create_temp_file()
+            with open(temp_path, 'wb') as f:
+                f.write(data or b'')
+
+        os.chmod(temp_path, BLOB_MODE)
+        os.replace(temp_path, blob_path)
+
+    def release_session(self, session_id: str) -> int:
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute('BEGIN IMMEDIATE')
+
+                try:
+                    digests = [row[0] for row in connection.execute(
+                        'SELECT digest FROM refs WHERE session_id = ?', (session_id,)
+                    )]
+                    connection.execute('DELETE FROM refs WHERE session_id = ?', (session_id,))
+                    removed = self._collect(connection, digests)
+                    connection.execute('COMMIT')
+                except Exception:
+                    connection.execute('ROLLBACK')
+                    raise
+        except Exception as e:
+            logger.warning(f"Error releasing stored media for session {session_id}: {e}")
+            return 0
+
+        if removed:
+            logger.info(f"Removed {removed} stored media blobs no longer used after clearing session {session_id}")
+
+        return removed
+
+    def collect_garbage(self) -> int:
+
+        oldest = time.time() - ORPHAN_GRACE_PERIOD
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute('BEGIN IMMEDIATE')
+
+                try:
+                    digests = [row[0] for row in connection.execute(
+                        'SELECT digest FROM blobs WHERE created_at < ?', (oldest,)
+                    )]
+                    connection.execute(
+                        'DELETE FROM refs WHERE digest NOT IN (SELECT digest FROM blobs)'
+                    )
+                    removed = self._collect(connection, digests, ignore_refs=True)
+                    connection.execute('COMMIT')
+                except Exception:
+                    connection.execute('ROLLBACK')
+                    raise
+        except Exception as e:
+            logger.warning(f"Error collecting unused media blobs: {e}")
+            return 0
+
+        self._remove_stale_temp_files(oldest)
+
+        if removed:
+            logger.info(f"Removed {removed} unused media blobs")
+
+        return removed
+
+    def _collect(self, connection: sqlite3.Connection, digests: List[str], ignore_refs: bool = False) -> int:
+
+        removed = 0
+
+        for digest in digests:
+            if not ignore_refs and connection.execute(
+                'SELECT 1 FROM refs WHERE digest = ? LIMIT 1', (digest,)
+            ).fetchone():
+                continue
+
+            blob_path = self.get_blob_path(digest)
+
+            try:
+                if os.stat(blob_path).st_nlink > 1:
+                    continue
+                os.remove(blob_path)
+            except FileNotFoundError:
+                pass
+
+            connection.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+            connection.execute('DELETE FROM refs WHERE digest = ?', (digest,))
+            removed += 1
+
+        return removed
+
+    def _remove_stale_temp_files(self, oldest: float) -> None:
+
+        for name in os.listdir(self.temp_dir):
+            path = os.path.join(self.temp_dir, name)
+            try:
+                if os.path.getmtime(path) < oldest:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {'stored': self.stored, 'deduplicated': self.deduplicated, 'bytes_saved': self.bytes_saved}
+
+    def close(self) -> None:
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -4,6 +4,8 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+SHARED_DIR_NAME = '_shared'
+
 class CachePathManager:
 
     def __init__(self, base_cache_dir):
@@ -46,4 +48,25 @@ class CachePathManager:
     def get_crawl_session_path(self, session_id):
 
         session_path = self.get_session_path(session_id)
-        return f"{session_path}/crawl_session.json"
\ No newline at end of file
+        return f"{session_path}/crawl_session.json"
+
+    def get_warc_dir(self, session_id):
+
+        session_path = self.get_session_path(session_id)
+        return f"{session_path}/warc"
+
+    def get_download_index_path(self, session_id):
+
+        session_path = self.get_session_path(session_id)
+        return f"{session_path}/downloads.jsonl"
+
+    def get_crawl_graph_path(self, session_id):
+
+        session_path = self.get_session_path(session_id)
+        return f"{session_path}/crawl_graph.sqlite3"
+
+    def get_shared_dir(self, name):
+
+        shared_dir = self.base_cache_dir / SHARED_DIR_NAME / name
+        shared_dir.mkdir(exist_ok=True, parents=True)
+        return str(shared_dir)
\ No newline at end of file
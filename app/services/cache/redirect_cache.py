@@ -0,0 +1,195 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from urllib.parse import urlsplit
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import CACHE_DIR, REDIRECT_CACHE_TTL
+from app.services.cache.path_manager import CachePathManager
+
+logger = logging.getLogger(__name__)
+
+PERMANENT_REDIRECT_STATUSES = (301, 308)
+
+class RedirectCache:
+
+    MAX_HOPS = 10
+    FLUSH_INTERVAL = 32
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: int = REDIRECT_CACHE_TTL):
+
+        if cache_dir is None:
+            cache_dir = CachePathManager(CACHE_DIR).get_shared_dir('redirects')
+
+        self.db_path = os.path.join(cache_dir, 'redirects.sqlite3')
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.targets: Dict[str, str] = {}
+        self.loaded_hosts: Set[str] = set()
+        self.pending: List[Tuple[str, str, str, int, float]] = []
+        self.pending_lock = threading.Lock()
+
+        self.hops = 0
+        self.rewritten = 0
+        self.recorded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS redirects ('
+                'url TEXT PRIMARY KEY, '
+                'host TEXT NOT NULL, '
+                'target TEXT NOT NULL, '
+                'status INTEGER NOT NULL, '
+                'updated_at REAL NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS redirects_host ON redirects (host)')
+            self.connection.commit()
+
+        return self.connection
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+
+        try:
+            return urlsplit(url).netloc.lower()
+        except ValueError:
+            return ''
+
+    def get_unloaded_hosts(self, urls: Iterable[str]) -> Set[str]:
+
+        return {self._get_host(url) for url in urls} - self.loaded_hosts
+
+    def load_hosts(self, hosts: Iterable[str]) -> None:
+
+        hosts = set(hosts) - self.loaded_hosts
+        oldest = time.time() - self.ttl if self.ttl > 0 else 0
+
+        for _ in range(self.MAX_HOPS):
+            if not hosts:
+                return
+
+            self.loaded_hosts.update(hosts)
+            host_list = sorted(hosts)
+
+            try:
+                with self.lock:
+                    rows = self._connect().execute(
+                        f"SELECT url, target FROM redirects WHERE host IN ({', '.join('?' * len(host_list))}) "
+                        f"AND updated_at >= ?",
+                        (*host_list, oldest)
+                    ).fetchall()
+            except Exception as e:
+                logger.warning(f"Error reading redirect cache for {', '.join(host_list)}: {e}")
+                return
+
+            for url, target in rows:
+                self.targets.setdefault(url, target)
+
+            # Chains can continue on hosts that have not been loaded yet
+            hosts = {self._get_host(target) for _, target in rows} - self.loaded_hosts
+
+    def resolve(self, url: str) -> str:
+
+        current = url
+        seen = {url}
+
+        for _ in range(self.MAX_HOPS):
+            target = self.targets.get(current)
+            if target is None or target in seen:
+                break
+
+            seen.add(target)
+            current = target
+
+        if current != url:
+            self.rewritten += 1
+
+        return current
+
+    def record(self, url: str, response: Any) -> int:
+
+        history = getattr(response, 'history', None) or ()
+        if not history:
+            return 0
+
+        self.hops += len(history)
+
+        next_urls = [str(hop.url) for hop in history[1:]] + [str(response.url)]
+        rows: List[Tuple[str, str, str, int, float]] = []
+        now = time.time()
+
+        for index, (hop, target) in enumerate(zip(history, next_urls)):
+            if hop.status not in PERMANENT_REDIRECT_STATUSES:
+                continue
+
+            sources = {str(hop.url)}
+            if index == 0:
+                sources.add(url)
+
+            for source in sources:
+                if source == target or self.targets.get(source) == target:
+                    continue
+
+                self.targets[source] = target
+                rows.append((source, self._get_host(source), target, hop.status, now))
+
+        if rows:
+            with self.pending_lock:
+                self.pending.extend(rows)
+            self.recorded += len(rows)
+
+        return len(history)
+
+    def needs_flush(self) -> bool:
+
+        return len(self.pending) >= self.FLUSH_INTERVAL
+
+    def flush(self) -> None:
+
+        with self.pending_lock:
+            rows, self.pending = self.pending, []
+
+        if not rows:
+            return
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.executemany(
+                    'INSERT OR REPLACE INTO redirects (url, host, target, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+                connection.commit()
+        except Exception as e:
+            logger.warning(f"Error writing redirect cache: {e}")
+
+    def shrink(self) -> int:
+
+        dropped = len(self.targets)
+        self.targets = {}
+        self.loaded_hosts = set()
+        return dropped
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {'hops': self.hops, 'rewritten': self.rewritten, 'recorded': self.recorded}
+
+    def close(self) -> None:
+
+        self.flush()
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.config import CACHE_DIR, STYLESHEET_CACHE_TTL
+from app.services.cache.path_manager import CachePathManager
+
+logger = logging.getLogger(__name__)
+
+class StylesheetCache:
+
+    FLUSH_INTERVAL = 32
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: int = STYLESHEET_CACHE_TTL):
+
+        if cache_dir is None:
+            cache_dir = CachePathManager(CACHE_DIR).get_shared_dir('stylesheets')
+
+        self.db_path = os.path.join(cache_dir, 'stylesheets.sqlite3')
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.pending_lock = threading.Lock()
+        self.pending_rows: Dict[str, Tuple[Any, ...]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS stylesheets ('
+                'url TEXT PRIMARY KEY, '
+                'media TEXT NOT NULL, '
+                'imports TEXT NOT NULL, '
+                'status INTEGER NOT NULL, '
+                'fetched_at REAL NOT NULL)'
+            )
+            self.connection.commit()
+
+        return self.connection
+
+    def get(self, url: str) -> Optional[Tuple[Set[str], Set[str]]]:
+
+        with self.pending_lock:
+            row = self.pending_rows.get(url)
+
+        if row is not None:
+            row = (row[1], row[2], row[4])
+        else:
+            try:
+                with self.lock:
+                    row = self._connect().execute(
+                        'SELECT media, imports, fetched_at FROM stylesheets WHERE url = ?', (url,)
+                    ).fetchone()
+            except Exception as e:
+                logger.warning(f"Error reading stylesheet cache for {url}: {e}")
+                row = None
+
+        if row is None or (self.ttl > 0 and time.time() - row[2] > self.ttl):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return set(json.loads(row[0])), set(json.loads(row[1]))
+
+    def put(self, url: str, media: Set[str], imports: Set[str], status: int = 200) -> None:
+
+        with self.pending_lock:
+            self.pending_rows[url] = (url, json.dumps(sorted(media)), json.dumps(sorted(imports)), status, time.time())
+
+    def needs_flush(self) -> bool:
+
+        return len(self.pending_rows) >= self.FLUSH_INTERVAL
+
+    def flush(self) -> None:
+
+        with self.pending_lock:
+            rows = list(self.pending_rows.values())
+            self.pending_rows = {}
+
+        if not rows:
+            return
+
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.executemany(
+                    'INSERT OR REPLACE INTO stylesheets (url, media, imports, status, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+                connection.commit()
+        except Exception as e:
+            logger.warning(f"Error writing stylesheet cache: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self) -> None:
+
+        self.flush()
+
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
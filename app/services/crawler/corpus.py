@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from app.services.crawler.page_parser import PageParser
+from app.services.crawler.link_classifier import LinkClassifier
+from app.utils.http.warc import list_warc_files, iter_warc_records
+from app.utils.http.response import get_charset
+
+logger = logging.getLogger(__name__)
+
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml', '.shtml')
+JSON_EXTENSIONS = ('.json',)
+
+_worker_parser: Optional[PageParser] = None
+
+def _init_worker() -> None:
+
+    global _worker_parser
+    _worker_parser = PageParser()
+
+def extract_document(task: Tuple[str, str, str, Optional[bytes], Optional[str]]) -> Dict[str, Any]:
+
+    source, url, content_type, body, path = task
+    parser = _worker_parser or PageParser()
+
+    result = {'url': url, 'source': source, 'links': [], 'media': []}
+
+    try:
+        if body is None and path:
+            with open(path, 'rb') as f:
+                body = f.read()
+
+        if 'json' in content_type:
+            result['type'] = 'json'
+            data = json.loads(body.decode(get_charset(content_type) or 'utf-8', errors='replace'))
+            result['media'] = sorted(parser.extract_media_from_json(data, url))
+        else:
+            result['type'] = 'html'
+            extracted = parser.extract_from_html(body, url, content_type)
+            if extracted is None:
+                raise ValueError("empty or unparseable document")
+            result['links'] = sorted(extracted[0])
+            result['media'] = sorted(extracted[1])
+    except Exception as e:
+        result['error'] = str(e)
+
+    return result
+
+class CorpusExtractor:
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 base_url: Optional[str] = None,
+                 max_in_flight: Optional[int] = None):
+
+        self.workers = workers or os.cpu_count() or 1
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.link_classifier = LinkClassifier()
+
+        self.documents = 0
+        self.skipped = 0
+
+    def iter_tasks(self, inputs: List[str]) -> Iterator[Tuple[str, str, str, Optional[bytes], Optional[str]]]:
+
+        for input_path in inputs:
+            if os.path.isdir(input_path) and not list_warc_files(input_path):
+                yield from self._iter_html_tree(input_path)
+            elif os.path.isfile(input_path) and input_path.lower().endswith(HTML_EXTENSIONS + JSON_EXTENSIONS):
+                yield from self._iter_html_file(input_path, os.path.dirname(input_path))
+            else:
+                for warc_path in list_warc_files(input_path):
+                    yield from self._iter_warc(warc_path)
+
+    def _iter_warc(self, warc_path: str) -> Iterator[Tuple[str, str, str, Optional[bytes], Optional[str]]]:
+
+        for offset, record in iter_warc_records(warc_path):
+            if record.record_type != 'response' or not record.target_uri:
+                continue
+
+            status, _, headers, body = record.parse_http_response()
+            content_type = next((value for name, value in headers if name.lower() == 'content-type'), '').lower()
+
+            if status != 200 or not self.link_classifier.is_page_content_type(content_type):
+                self.skipped += 1
+                continue
+
+            yield f"{warc_path}#{offset}", record.target_uri, content_type, body, None
+
+    def _iter_html_tree(self, root: str) -> Iterator[Tuple[str, str, str, Optional[bytes], Optional[str]]]:
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(HTML_EXTENSIONS + JSON_EXTENSIONS):
+                    yield from self._iter_html_file(os.path.join(dirpath, filename), root)
+
+    def _iter_html_file(self, path: str, root: str) -> Iterator[Tuple[str, str, str, Optional[bytes], Optional[str]]]:
+
+        relative = Path(os.path.relpath(path, root)).as_posix()
+
+        if self.base_url:
+            url = f"{self.base_url}/{quote(relative)}"
+        else:
+            url = f"http://{quote(relative)}"
+
+        content_type = 'application/json' if path.lower().endswith(JSON_EXTENSIONS) else 'text/html'
+        yield path, url, content_type, None, path
+
+    def run(self, inputs: List[str]) -> Iterator[Dict[str, Any]]:
+
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        def throttled_tasks():
+            for task in self.iter_tasks(inputs):
+                in_flight.acquire()
+                yield task
+
+        if self.workers <= 1:
+            _init_worker()
+            for task in self.iter_tasks(inputs):
+                self.documents += 1
+                yield extract_document(task)
+            return
+
+        with multiprocessing.Pool(self.workers, initializer=_init_worker) as pool:
+            for result in pool.imap_unordered(extract_document, throttled_tasks()):
+                in_flight.release()
+                self.documents += 1
+                yield result
+
+    def write_ndjson(self, inputs: List[str], output) -> int:
+
+        for result in self.run(inputs):
+            output.write(json.dumps(result, ensure_ascii=False))
+            output.write('\n')
+
+        output.flush()
+        return self.documents
+
+def main(argv: List[str] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Extract links and media from WARC archives or mirrored HTML trees")
+    parser.add_argument('inputs', nargs='+', help="WARC files, directories of WARC files, or mirrored HTML directories")
+    parser.add_argument('--base-url', help="Base URL for HTML trees (defaults to treating the first path segment as the host)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (defaults to all cores)")
+    parser.add_argument('--output', '-o', help="NDJSON output file (defaults to stdout)")
+    args = parser.parse_args(argv)
+
+    extractor = CorpusExtractor(workers=args.workers, base_url=args.base_url)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            count = extractor.write_ndjson(args.inputs, output)
+    else:
+        count = extractor.write_ndjson(args.inputs, sys.stdout)
+
+    logger.info(f"Extracted {count} documents ({extractor.skipped} non-page records skipped)")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
\ No newline at end of file
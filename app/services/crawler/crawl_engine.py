@@ -1,30 +1,82 @@
+import json
 import asyncio
 import aiohttp
+import hashlib
 import logging
 
-from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import Set, Tuple, List
+from typing import Set, Tuple, Dict, Any, Optional
 
 from app.models.crawler import CrawlPage
 from app.services.crawler.url_utils import UrlUtils
 from app.services.crawler.page_parser import PageParser
 from app.services.crawler.robots_parser import RobotsParser
-from app.config import REQUEST_TIMEOUT, MAX_CONCURRENT_REQUESTS
+from app.services.crawler.link_classifier import LinkClassifier
+from app.services.crawler.url_scorer import UrlScorer
+from app.services.crawler.frontier import create_frontier
+from app.services.crawler.stylesheet_fetcher import StylesheetFetcher
+from app.services.crawler.feed_reader import FeedReader
+from app.services.crawler.feed_parser import FeedParser
+from app.services.crawler.crawl_graph import CrawlGraph
+from app.services.crawler.url_table import UrlTable, UrlIdSet, VISITED, MEDIA
+from app.services.crawler.scope import ScopeRules, ScopeMatcher
+from app.services.cache.extraction_memo import ExtractionMemo
+from app.services.cache.stylesheet_cache import StylesheetCache
+from app.services.cache.redirect_cache import RedirectCache
+from app.services.cache.host_profiles import HostProfiles
+from app.utils.http.response import get_charset
+from app.utils.http.latency import HostLatencyTracker, HedgedRequester
+from app.utils.http.prewarm import ConnectionPrewarmer
+from app.utils.memory import MemoryJob, MemoryBudgetExceeded, get_memory_governor
+from app.config import (
+    MAX_CONCURRENT_REQUESTS, MAX_CRAWL_PAGES, EXTRACTION_MEMO_ENABLED, HEDGED_REQUESTS, STYLESHEET_MEDIA,
+    FEED_DISCOVERY, CRAWL_GRAPH, REDIRECT_CACHE, HOST_PROFILES
+)
 
 logger = logging.getLogger(__name__)
 
+PAGE_ACCEPT_HEADER = 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.1'
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+BODY_CHUNK_SIZE = 64 * 1024
+FRONTIER_ENTRY_BYTES = 400
+
 class CrawlEngine:
 
-    def __init__(self, session: aiohttp.ClientSession):
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 hedge: bool = HEDGED_REQUESTS,
+                 prewarmer: Optional[ConnectionPrewarmer] = None,
+                 redirects: bool = REDIRECT_CACHE,
+                 profiles: bool = HOST_PROFILES,
+                 memo: bool = EXTRACTION_MEMO_ENABLED):
 
         self.session = session
+        self.prewarmer = prewarmer
+        self.host_profiles = HostProfiles() if profiles else None
         self.url_utils = UrlUtils()
-        self.robots_parser = RobotsParser(session)
+        self.robots_parser = RobotsParser(session, self.host_profiles)
         self.page_parser = PageParser()
+        self.link_classifier = LinkClassifier()
         self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-        self.visited_urls: Set[str] = set()
-        self.media_urls: Set[str] = set()
+        self.url_scorer = UrlScorer()
+        self.url_table = UrlTable()
+        self.frontier = create_frontier(scorer=self.url_scorer)
+        self.max_pages = MAX_CRAWL_PAGES
+        self.extraction_memo = ExtractionMemo() if memo else None
+        self.latency_tracker = HostLatencyTracker(profiles=self.host_profiles)
+        self.hedged_requester = HedgedRequester(self.latency_tracker, hedge)
+        self.stylesheet_fetcher = StylesheetFetcher(
+            session, self.robots_parser, self.page_parser, StylesheetCache()
+        ) if STYLESHEET_MEDIA else None
+        self.feed_reader = FeedReader(session, self.robots_parser, self._handle_feed) if FEED_DISCOVERY else None
+        self.crawl_graph = CrawlGraph(self.url_table) if CRAWL_GRAPH else None
+        self.redirect_cache = RedirectCache() if redirects else None
+        self.redirect_hops = 0
+        self.scope: Optional[ScopeMatcher] = None
+        self.memory_job: Optional[MemoryJob] = None
+        self.pages_fetched = 0
+        self.visited_urls = UrlIdSet(self.url_table, VISITED)
+        self.media_urls = UrlIdSet(self.url_table, MEDIA)
 
     async def crawl_page(self, url: str, depth: int, max_depth: int) -> CrawlPage:
 
@@ -41,6 +93,7 @@ class CrawlEngine:
         crawl_page = CrawlPage(
             url=url,
             depth=depth,
+            parent_url=self._get_parent_url(url),
             start_time=datetime.now()
         )
 
@@ -67,6 +120,12 @@ class CrawlEngine:
             crawl_page.end_time = datetime.now()
             return crawl_page
 
+    def _get_parent_url(self, url: str) -> Optional[str]:
+
+        if self.crawl_graph is None:
+            return None
+        return self.crawl_graph.get_parent_url(url)
+
     def _should_skip_url(self, url: str, depth: int, max_depth: int) -> bool:
 
         if url in self.visited_urls:
@@ -95,27 +154,112 @@ class CrawlEngine:
 
         async with self.semaphore:
 
-            try:
-                async with self.session.get(url, timeout=REQUEST_TIMEOUT) as response:
-                    crawl_page.status_code = response.status
-
-                    if response.status != 200:
-                        logger.debug(f"Skipping {url}: HTTP {response.status}")
-                        crawl_page.error_message = f"HTTP {response.status}"
-                        crawl_page.end_time = datetime.now()
-                        return crawl_page
+            timeout = self.latency_tracker.get_timeout(url)
 
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    await self._process_by_content_type(response, content_type, url, crawl_page)
-
-                    crawl_page.end_time = datetime.now()
-                    return crawl_page
+            try:
+                context, response = await self.hedged_requester.open(
+                    url,
+                    lambda: self.session.get(
+                        url,
+                        timeout=timeout,
+                        headers={'Accept': PAGE_ACCEPT_HEADER}
+                    )
+                )
+
+                try:
+                    return await self._handle_page_response(response, url, crawl_page)
+                finally:
+                    await context.__aexit__(None, None, None)
+            except asyncio.TimeoutError:
+                self.latency_tracker.record_timeout(url)
+                raise
             except aiohttp.ClientError as e:
                 logger.warning(f"HTTP client error for {url}: {e}")
                 crawl_page.error_message = f"HTTP client error: {str(e)}"
                 crawl_page.end_time = datetime.now()
                 return crawl_page
 
+    async def _handle_page_response(self,
+                                    response: aiohttp.ClientResponse,
+                                    url: str,
+                                    crawl_page: CrawlPage) -> CrawlPage:
+
+        crawl_page.status_code = response.status
+
+        if self.host_profiles is not None:
+            self.host_profiles.record_response(url, response.status)
+
+        if response.history:
+            url = self._record_redirects(url, response)
+
+        if response.status != 200:
+            logger.debug(f"Skipping {url}: HTTP {response.status}")
+            crawl_page.error_message = f"HTTP {response.status}"
+            crawl_page.end_time = datetime.now()
+            return crawl_page
+
+        content_type = response.headers.get('Content-Type', '').lower()
+
+        if not self.link_classifier.is_page_content_type(content_type):
+            logger.debug(f"Skipping {url}: non-page content type {content_type or 'unknown'}")
+            crawl_page.error_message = f"Non-page content type: {content_type or 'unknown'}"
+            crawl_page.end_time = datetime.now()
+
+            response.close()
+            return crawl_page
+
+        await self._process_by_content_type(response, content_type, url, crawl_page)
+
+        crawl_page.end_time = datetime.now()
+        return crawl_page
+
+    def _record_redirects(self, url: str, response: aiohttp.ClientResponse) -> str:
+
+        self.redirect_hops += len(response.history)
+
+        if self.redirect_cache is not None:
+            self.redirect_cache.record(url, response)
+
+        final_url = str(response.url)
+        self.visited_urls.add(final_url)
+
+        logger.debug(f"{url} redirected to {final_url} in {len(response.history)} hops")
+        return final_url
+
+    async def _resolve_redirects(self, urls: Set[str]) -> Dict[str, str]:
+
+        if self.redirect_cache is None:
+            return {url: url for url in urls}
+
+        loop = asyncio.get_running_loop()
+
+        hosts = self.redirect_cache.get_unloaded_hosts(urls)
+        if hosts:
+            await loop.run_in_executor(None, self.redirect_cache.load_hosts, hosts)
+
+        if self.redirect_cache.needs_flush():
+            await loop.run_in_executor(None, self.redirect_cache.flush)
+
+        targets = {}
+        for url in urls:
+            target = self.redirect_cache.resolve(url)
+
+            if target == url or self.scope.allows(target):
+                targets[url] = target
+            else:
+                logger.debug(f"Dropping {url}: its cached redirect target {target} is out of scope")
+
+        return targets
+
+    async def _load_host_profiles(self, urls: Set[str]) -> None:
+
+        if self.host_profiles is None:
+            return
+
+        hosts = self.host_profiles.get_unloaded_hosts(urls)
+        if hosts:
+            await asyncio.get_running_loop().run_in_executor(None, self.host_profiles.load_hosts, hosts)
+
     async def _process_by_content_type(self,
                                       response: aiohttp.ClientResponse,
                                       content_type: str,
@@ -123,7 +267,7 @@ class CrawlEngine:
                                       crawl_page: CrawlPage) -> None:
 
         try:
-            if 'text/html' in content_type:
+            if any(html_type in content_type for html_type in HTML_CONTENT_TYPES):
                 await self._process_html_page(response, url, crawl_page)
             elif 'application/json' in content_type:
                 await self._process_json_response(response, url, crawl_page)
@@ -138,16 +282,31 @@ class CrawlEngine:
                                crawl_page: CrawlPage) -> None:
 
         try:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
+            body, content_hash = await self._read_body(response)
+            crawl_page.body_size = len(body)
+
+            if await self._apply_memoized_extraction(content_hash, url, crawl_page):
+                return
+
+            extracted = self.page_parser.extract_from_html(
+                body,
+                url,
+                response.headers.get('Content-Type', ''),
+                crawl_page.link_context,
+                crawl_page.stylesheet_urls,
+                crawl_page.feed_urls
+            )
+            if extracted is None:
+                crawl_page.error_message = "Error processing HTML: empty or unparseable document"
+                return
 
-            links = self.page_parser.extract_links(soup, url)
-            media = self.page_parser.extract_media_urls(soup, url)
+            links, media = extracted
 
             crawl_page.discovered_urls = links
             crawl_page.media_urls = media
 
             self.media_urls.update(media)
+            await self._memoize_extraction(content_hash, url, crawl_page, len(body))
         except Exception as e:
             logger.warning(f"Error processing HTML for {url}: {e}")
             crawl_page.error_message = f"Error processing HTML: {str(e)}"
@@ -158,82 +317,414 @@ class CrawlEngine:
                                    crawl_page: CrawlPage) -> None:
 
         try:
-            json_data = await response.json()
+            body, content_hash = await self._read_body(response)
+            crawl_page.body_size = len(body)
+
+            if await self._apply_memoized_extraction(content_hash, url, crawl_page):
+                return
+
+            charset = get_charset(response.headers.get('Content-Type', ''))
+            json_data = json.loads(body.decode(charset or 'utf-8', errors='replace'))
             media = self.page_parser.extract_media_from_json(json_data, url)
 
             crawl_page.media_urls = media
 
             self.media_urls.update(media)
+            await self._memoize_extraction(content_hash, url, crawl_page, len(body))
         except Exception as e:
             logger.warning(f"Error processing JSON for {url}: {e}")
             crawl_page.error_message = f"Error processing JSON: {str(e)}"
 
-    async def crawl(self, url: str, max_depth: int) -> Set[str]:
+    async def _read_body(self, response: aiohttp.ClientResponse) -> Tuple[bytes, str]:
+
+        hasher = hashlib.sha256()
+        chunks = []
+
+        async for chunk in response.content.iter_chunked(BODY_CHUNK_SIZE):
+            hasher.update(chunk)
+            chunks.append(chunk)
+
+        return b''.join(chunks), hasher.hexdigest()
+
+    async def _apply_memoized_extraction(self, content_hash: str, url: str, crawl_page: CrawlPage) -> bool:
+
+        if self.extraction_memo is None:
+            return False
+
+        loop = asyncio.get_running_loop()
+        memoized = await loop.run_in_executor(None, self.extraction_memo.get, content_hash, url)
+        if memoized is None:
+            return False
+
+        links, media, link_context, stylesheets, feeds = memoized
+
+        crawl_page.discovered_urls = links
+        crawl_page.media_urls = media
+        crawl_page.link_context = link_context
+        crawl_page.stylesheet_urls = stylesheets
+        crawl_page.feed_urls = feeds
+
+        self.media_urls.update(media)
+        logger.debug(f"Reused memoized extraction for {url}")
+        return True
+
+    async def _memoize_extraction(self, content_hash: str, url: str, crawl_page: CrawlPage, body_size: int) -> None:
+
+        if self.extraction_memo is None:
+            return
+
+        self.extraction_memo.put(
+            content_hash,
+            url,
+            crawl_page.discovered_urls,
+            crawl_page.media_urls,
+            crawl_page.link_context,
+            body_size,
+            crawl_page.stylesheet_urls,
+            crawl_page.feed_urls
+        )
+
+        if self.extraction_memo.needs_flush():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.extraction_memo.flush)
+
+    def get_extraction_stats(self) -> Dict[str, Any]:
+
+        stats = {'tiers': dict(self.page_parser.tier_counts)}
+        if self.extraction_memo is not None:
+            stats['memo'] = self.extraction_memo.get_stats()
+        return stats
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+
+        stats = self.hedged_requester.get_stats()
+        stats['hosts'] = self.latency_tracker.get_stats()
+        return stats
+
+    def get_stylesheet_stats(self) -> Dict[str, Any]:
+
+        if self.stylesheet_fetcher is None:
+            return {}
+        return self.stylesheet_fetcher.get_stats()
+
+    def get_feed_stats(self) -> Dict[str, Any]:
+
+        if self.feed_reader is None:
+            return {}
+        return self.feed_reader.get_stats()
+
+    def get_prewarm_stats(self) -> Dict[str, Any]:
+
+        if self.prewarmer is None:
+            return {}
+        return self.prewarmer.get_stats()
+
+    def get_redirect_stats(self) -> Dict[str, Any]:
+
+        stats = {'hops': self.redirect_hops}
+        if self.redirect_cache is not None:
+            cache_stats = self.redirect_cache.get_stats()
+            stats['rewritten'] = cache_stats['rewritten']
+            stats['recorded'] = cache_stats['recorded']
+        return stats
+
+    def get_host_stats(self) -> Dict[str, Any]:
+
+        if self.host_profiles is None:
+            return {}
+        return self.host_profiles.get_stats()
+
+    def get_scope_stats(self) -> Dict[str, Any]:
+
+        if self.scope is None:
+            return {}
+        return self.scope.get_stats()
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+
+        if self.memory_job is None:
+            return {}
+        return self.memory_job.get_stats()
+
+    def get_engine_stats(self) -> Dict[str, Any]:
+
+        return {
+            'extraction': self.get_extraction_stats(),
+            'latency': self.get_latency_stats(),
+            'stylesheets': self.get_stylesheet_stats(),
+            'feeds': self.get_feed_stats(),
+            'prewarm': self.get_prewarm_stats(),
+            'redirects': self.get_redirect_stats(),
+            'hosts': self.get_host_stats(),
+            'scope': self.get_scope_stats(),
+            'memory': self.get_memory_stats(),
+        }
+
+    def close(self) -> None:
+
+        self.frontier.close()
+
+        if self.extraction_memo is not None:
+            self.extraction_memo.close()
+
+        if self.stylesheet_fetcher is not None:
+            self.stylesheet_fetcher.close()
+
+        if self.redirect_cache is not None:
+            self.redirect_cache.close()
+
+        if self.host_profiles is not None:
+            self.host_profiles.close()
+
+    async def crawl(self, url: str, max_depth: int, scope: Optional[ScopeRules] = None) -> Set[str]:
 
         if not url:
             logger.error("Cannot crawl empty URL")
             return set()
 
         self._reset_crawl_state()
-        to_crawl = self._initialize_crawl_queue(url)
+        self.scope = (scope or ScopeRules.from_settings()).compile(url)
+        self.memory_job = get_memory_governor().register(f"crawl {url}", self._get_tracked_bytes, self._shrink_memory)
+        self._initialize_crawl_queue(url)
+        await self._load_host_profiles({url})
 
         try:
-            await self._process_crawl_queue(to_crawl, max_depth, url)
+            await self._process_crawl_queue(max_depth, url)
+        except MemoryBudgetExceeded:
+            await self._stop_background_work()
+            raise
         except Exception as e:
             logger.error(f"Error during crawl queue processing: {e}")
+        finally:
+            self.memory_job.close()
+
+        await self._collect_feed_media()
+        await self._collect_stylesheet_media()
+
+        if self.prewarmer is not None:
+            await self.prewarmer.stop()
+
+        if self.redirect_cache is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.redirect_cache.flush)
+
+        if self.host_profiles is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.host_profiles.save)
+
+        table_stats = self.url_table.get_stats()
+        logger.info(f"Tracked {table_stats['urls']} URLs on {table_stats['hosts']} hosts "
+                    f"in {table_stats['bytes'] // 1024} KB")
+
+        return set(self.media_urls)
+
+    async def _stop_background_work(self) -> None:
+
+        if self.feed_reader is not None:
+            await self.feed_reader.stop()
+
+        if self.stylesheet_fetcher is not None:
+            await self.stylesheet_fetcher.stop()
+
+        if self.prewarmer is not None:
+            await self.prewarmer.stop()
+
+    def _get_tracked_bytes(self) -> int:
+
+        return self.url_table.get_stats()['bytes'] + self.frontier.in_memory() * FRONTIER_ENTRY_BYTES
+
+    def _shrink_memory(self) -> None:
+
+        self.frontier.shrink()
+
+        if self.redirect_cache is not None:
+            self.redirect_cache.shrink()
 
-        return self.media_urls
+    async def _collect_stylesheet_media(self) -> None:
+
+        if self.stylesheet_fetcher is None:
+            return
+
+        try:
+            stylesheet_media = await self.stylesheet_fetcher.drain()
+            self.media_urls.update(stylesheet_media)
+        except Exception as e:
+            logger.error(f"Error collecting stylesheet media: {e}")
+            await self.stylesheet_fetcher.stop()
+
+    async def _collect_feed_media(self) -> None:
+
+        if self.feed_reader is None:
+            return
+
+        try:
+            await self.feed_reader.drain()
+        except Exception as e:
+            logger.error(f"Error collecting feed media: {e}")
+            await self.feed_reader.stop()
 
     def _reset_crawl_state(self) -> None:
 
-        self.visited_urls.clear()
-        self.media_urls.clear()
+        self.frontier.clear()
+        self.url_table.clear()
+        self.url_scorer.reset()
+        self.pages_fetched = 0
+        self.redirect_hops = 0
 
-    def _initialize_crawl_queue(self, start_url: str) -> List[Tuple[str, int]]:
+        if self.crawl_graph is not None:
+            self.crawl_graph = CrawlGraph(self.url_table)
 
-        return [(start_url, 0)]
+        if self.stylesheet_fetcher is not None:
+            self.stylesheet_fetcher.reset()
 
-    async def _process_crawl_queue(self,
-                                to_crawl: List[Tuple[str, int]],
-                                max_depth: int,
-                                base_url: str) -> None:
+        if self.feed_reader is not None:
+            self.feed_reader.reset()
 
-        while to_crawl:
-            try:
+    def _initialize_crawl_queue(self, start_url: str) -> None:
+
+        self.frontier.push(start_url, 0, 0.0)
 
-                current_url, current_depth = to_crawl.pop(0)
+    async def _process_crawl_queue(self, max_depth: int, base_url: str) -> None:
 
-                if current_url in self.visited_urls:
-                    continue
+        while not self._is_budget_exhausted():
+            if not len(self.frontier):
+                # Feeds are read in the background and may still add item links
+                if self.feed_reader is None or not await self.feed_reader.wait():
+                    break
+                continue
 
-                crawl_page = await self.crawl_page(current_url, current_depth, max_depth)
+            await self.memory_job.wait()
+
+            try:
 
-                if self._should_follow_links(crawl_page, current_depth, max_depth):
-                    self._add_new_urls_to_queue(crawl_page.discovered_urls, current_depth, to_crawl, base_url)
+                current_url, current_depth, source_url = self.frontier.pop_entry()
+                self._record_graph_link(source_url, current_url)
+                await self._process_url(current_url, current_depth, max_depth, base_url)
             except Exception as e:
                 logger.error(f"Error processing URL in queue: {e}")
 
+    async def _process_url(self, current_url: str, current_depth: int, max_depth: int, base_url: str) -> None:
+
+        if current_url in self.visited_urls:
+            return
+
+        crawl_page = await self.crawl_page(current_url, current_depth, max_depth)
+
+        if crawl_page.status_code is not None:
+            self._record_page_fetched()
+
+        self._record_graph_page(crawl_page)
+
+        if crawl_page.is_successful:
+            self.url_scorer.record_page(crawl_page.url, len(crawl_page.media_urls))
+
+        if crawl_page.media_urls and self.prewarmer is not None:
+            self.prewarmer.observe(crawl_page.media_urls, connect=False)
+
+        if crawl_page.stylesheet_urls and self.stylesheet_fetcher is not None:
+            self.stylesheet_fetcher.schedule(crawl_page.stylesheet_urls)
+
+        if self._should_follow_links(crawl_page, current_depth, max_depth):
+            await self._add_new_urls_to_queue(crawl_page, current_depth, base_url)
+
+        if crawl_page.feed_urls and self.feed_reader is not None:
+            self._schedule_feeds(crawl_page, current_depth, max_depth)
+
+    def _record_page_fetched(self) -> None:
+
+        self.pages_fetched += 1
+
+    def _record_graph_link(self, source_url: Optional[str], url: str) -> None:
+
+        # Links to pages that have not been visited yet are recorded when they are
+        # popped, so queued URLs stay out of the URL table until they are crawled
+        if self.crawl_graph is not None and source_url is not None:
+            self.crawl_graph.add_links(source_url, (url,))
+
+    def _record_graph_page(self, crawl_page: CrawlPage) -> None:
+
+        if self.crawl_graph is None:
+            return
+
+        if crawl_page.status_code is None and crawl_page.error_message is None:
+            return
+
+        self.crawl_graph.record_page(
+            crawl_page.url,
+            crawl_page.depth,
+            crawl_page.status_code,
+            crawl_page.duration,
+            crawl_page.body_size,
+            crawl_page.media_urls
+        )
+
+    def _schedule_feeds(self, crawl_page: CrawlPage, current_depth: int, max_depth: int) -> int:
+
+        return self.feed_reader.schedule(crawl_page.feed_urls, (crawl_page.url, current_depth, max_depth))
+
+    async def _handle_feed(self, feed: Optional[FeedParser], page_url: str, current_depth: int, max_depth: int) -> None:
+
+        if feed is None:
+            return
+
+        self.media_urls.update(feed.media_urls)
+
+        if self.prewarmer is not None:
+            self.prewarmer.observe(feed.media_urls, connect=False)
+
+        if self.crawl_graph is not None:
+            self.crawl_graph.record_media(page_url, feed.media_urls)
+
+        if current_depth >= max_depth:
+            return
+
+        item_links = set((await self._resolve_redirects(self.scope.filter(feed.item_links))).values())
+        await self._load_host_profiles(item_links)
+        hint = (len(feed.media_urls), 'from:feed')
+
+        if self.crawl_graph is not None:
+            self.crawl_graph.add_links(page_url, (url for url in item_links if url in self.visited_urls))
+
+        for item_url in item_links:
+            if item_url not in self.visited_urls:
+                self._enqueue(item_url, current_depth + 1, hint, page_url)
+
+    def _is_budget_exhausted(self) -> bool:
+
+        return self.max_pages > 0 and self.pages_fetched >= self.max_pages
+
     def _should_follow_links(self, crawl_page: CrawlPage, current_depth: int, max_depth: int) -> bool:
 
         return crawl_page and crawl_page.is_successful and current_depth < max_depth
 
-    def _add_new_urls_to_queue(self,
-                              discovered_urls: Set[str],
-                              current_depth: int,
-                              to_crawl: List[Tuple[str, int]],
-                              base_url: str) -> None:
+    async def _add_new_urls_to_queue(self, crawl_page: CrawlPage, current_depth: int, base_url: str) -> None:
 
-        if not discovered_urls:
+        if not crawl_page.discovered_urls:
             return
 
         try:
 
-            same_domain_urls = self.url_utils.filter_same_domain_urls(
-                discovered_urls, base_url
-            )
+            in_scope_urls = self.scope.filter(crawl_page.discovered_urls)
+            targets = await self._resolve_redirects(in_scope_urls)
+            resolved_urls = set(targets.values())
+            await self._load_host_profiles(resolved_urls)
+
+            if self.crawl_graph is not None:
+                self.crawl_graph.add_links(crawl_page.url, (url for url in resolved_urls if url in self.visited_urls))
 
-            for discovered_url in same_domain_urls:
-                if discovered_url not in self.visited_urls:
-                    to_crawl.append((discovered_url, current_depth + 1))
+            if self.prewarmer is not None:
+                self.prewarmer.observe(url for url in resolved_urls if url not in self.visited_urls)
+
+            parent_media_count = len(crawl_page.media_urls)
+            queued: Set[str] = set()
+
+            for discovered_url, target_url in targets.items():
+                if target_url not in self.visited_urls and target_url not in queued:
+                    queued.add(target_url)
+                    hint = (parent_media_count, crawl_page.link_context.get(discovered_url))
+                    self._enqueue(target_url, current_depth + 1, hint, crawl_page.url)
         except Exception as e:
             logger.warning(f"Error adding URLs to crawl queue: {e}")
+
+    def _enqueue(self, url: str, depth: int, hint: Tuple[int, Optional[str]], source_url: Optional[str] = None) -> None:
+
+        score = self.url_scorer.score(url, depth, *hint)
+        self.frontier.push(url, depth, score, hint, source_url)
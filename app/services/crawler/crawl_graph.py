@@ -0,0 +1,363 @@
+import os
+import sys
+import sqlite3
+import logging
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.crawler.url_table import UrlTable
+
+logger = logging.getLogger(__name__)
+
+NO_PARENT = -1
+NOT_FETCHED = -1
+GRAPH_FORMAT_VERSION = 1
+
+class CrawlGraph:
+
+    def __init__(self, url_table: Optional[UrlTable] = None):
+
+        self.url_table = url_table if url_table is not None else UrlTable()
+
+        self.parents = array('i')
+        self.depths = array('h')
+        self.statuses = array('h')
+        self.latencies = array('f')
+        self.sizes = array('q')
+        self.media_counts = array('i')
+
+        self.edges: Dict[int, array] = {}
+        self.media_sources: Dict[int, int] = {}
+
+        self.pages_recorded = 0
+        self.edge_count = 0
+
+    def intern(self, url: str) -> int:
+
+        url_id = self.url_table.intern(url)
+        self._extend()
+        return url_id
+
+    def _extend(self) -> None:
+
+        missing = len(self.url_table) - len(self.parents)
+        if missing <= 0:
+            return
+
+        self.parents.extend(array('i', [NO_PARENT]) * missing)
+        self.depths.extend(array('h', [-1]) * missing)
+        self.statuses.extend(array('h', [NOT_FETCHED]) * missing)
+        self.latencies.extend(array('f', [0.0]) * missing)
+        self.sizes.extend(array('q', [0]) * missing)
+        self.media_counts.extend(array('i', [0]) * missing)
+
+    def get_parent_url(self, url: str) -> Optional[str]:
+
+        url_id = self.url_table.get_id(url)
+        if url_id is None or url_id >= len(self.parents) or self.parents[url_id] == NO_PARENT:
+            return None
+        return self.url_table.get_url(self.parents[url_id])
+
+    def add_links(self, source_url: str, target_urls: Iterable[str]) -> None:
+
+        self._add_edges(self.intern(source_url), [self.intern(url) for url in target_urls])
+
+    def _add_edges(self, source: int, targets: Iterable[int]) -> None:
+
+        edge_list = self.edges.get(source)
+        if edge_list is None:
+            edge_list = self.edges[source] = array('i')
+
+        for target in targets:
+            if target == source:
+                continue
+
+            edge_list.append(target)
+            self.edge_count += 1
+
+            if self.parents[target] == NO_PARENT and self.statuses[target] == NOT_FETCHED:
+                self.parents[target] = source
+
+    def record_page(self, url: str, depth: int, status: Optional[int], latency: float,
+                    size: int, media_urls: Iterable[str]) -> None:
+
+        url_id = self.intern(url)
+
+        if self.statuses[url_id] == NOT_FETCHED:
+            self.pages_recorded += 1
+
+        self.depths[url_id] = depth
+        self.statuses[url_id] = status or 0
+        self.latencies[url_id] = latency * 1000
+        self.sizes[url_id] = size
+
+        self.record_media(url, media_urls)
+
+    def record_media(self, url: str, media_urls: Iterable[str]) -> None:
+
+        url_id = self.intern(url)
+        count = 0
+
+        for media_url in media_urls:
+            self.media_sources.setdefault(self.url_table.intern(media_url), url_id)
+            count += 1
+
+        self.media_counts[url_id] += count
+
+    def merge(self, other: 'CrawlGraph') -> None:
+
+        mapping = array('i', (self.intern(other.url_table.get_url(other_id)) for other_id in range(len(other.parents))))
+
+        for other_id, url_id in enumerate(mapping):
+            if other.statuses[other_id] == NOT_FETCHED:
+                continue
+
+            if self.statuses[url_id] == NOT_FETCHED:
+                self.pages_recorded += 1
+
+            self.depths[url_id] = other.depths[other_id]
+            self.statuses[url_id] = other.statuses[other_id]
+            self.latencies[url_id] = other.latencies[other_id]
+            self.sizes[url_id] = other.sizes[other_id]
+            self.media_counts[url_id] += other.media_counts[other_id]
+
+            if other.parents[other_id] != NO_PARENT:
+                self.parents[url_id] = mapping[other.parents[other_id]]
+
+        for source, targets in other.edges.items():
+            self._add_edges(mapping[source], (mapping[target] for target in targets))
+
+        for media_id, page_id in other.media_sources.items():
+            self.media_sources.setdefault(self.url_table.intern(other.url_table.get_url(media_id)), mapping[page_id])
+
+    def resolve_parents(self) -> None:
+
+        for source, targets in self.edges.items():
+            source_depth = self.depths[source]
+            if self.statuses[source] == NOT_FETCHED:
+                continue
+
+            for target in targets:
+                if self.statuses[target] == NOT_FETCHED or self.depths[target] <= source_depth:
+                    continue
+
+                parent = self.parents[target]
+                if parent == NO_PARENT or self.statuses[parent] == NOT_FETCHED or self.depths[parent] >= self.depths[target]:
+                    self.parents[target] = source
+
+    def save(self, path: str) -> None:
+
+        temp_path = f"{path}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        connection = sqlite3.connect(temp_path)
+
+        try:
+            connection.execute('PRAGMA journal_mode=OFF')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.executescript(
+                'CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);'
+                'CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL);'
+                'CREATE TABLE pages ('
+                'id INTEGER PRIMARY KEY, '
+                'parent INTEGER, '
+                'depth INTEGER NOT NULL, '
+                'status INTEGER NOT NULL, '
+                'latency_ms REAL NOT NULL, '
+                'bytes INTEGER NOT NULL, '
+                'media INTEGER NOT NULL);'
+                'CREATE TABLE edges (source INTEGER PRIMARY KEY, targets BLOB NOT NULL);'
+                'CREATE TABLE media (url TEXT PRIMARY KEY, page INTEGER NOT NULL);'
+            )
+
+            connection.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('version', str(GRAPH_FORMAT_VERSION)),
+                ('byteorder', sys.byteorder),
+                ('pages', str(self.pages_recorded)),
+                ('edges', str(self.edge_count)),
+            ])
+            connection.executemany('INSERT INTO urls VALUES (?, ?)', (
+                (url_id, self.url_table.get_url(url_id))
+                for url_id in range(len(self.parents))
+                if self.statuses[url_id] != NOT_FETCHED or self.parents[url_id] != NO_PARENT
+            ))
+            connection.executemany('INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                (
+                    url_id,
+                    self.parents[url_id] if self.parents[url_id] != NO_PARENT else None,
+                    self.depths[url_id],
+                    self.statuses[url_id],
+                    round(self.latencies[url_id], 3),
+                    self.sizes[url_id],
+                    self.media_counts[url_id],
+                )
+                for url_id in range(len(self.parents))
+                if self.statuses[url_id] != NOT_FETCHED
+            ))
+            connection.executemany(
+                'INSERT INTO edges VALUES (?, ?)',
+                ((source, targets.tobytes()) for source, targets in self.edges.items() if targets)
+            )
+            connection.executemany('INSERT INTO media VALUES (?, ?)', (
+                (self.url_table.get_url(media_id), page_id) for media_id, page_id in self.media_sources.items()
+            ))
+            connection.execute('CREATE INDEX pages_latency ON pages (latency_ms)')
+            connection.commit()
+        finally:
+            connection.close()
+
+        os.replace(temp_path, path)
+        logger.info(f"Saved crawl graph with {self.pages_recorded} pages, {self.edge_count} links "
+                    f"and {len(self.media_sources)} media to {path}")
+
+class CrawlGraphReader:
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.meta = dict(self.connection.execute('SELECT name, value FROM meta'))
+
+    def close(self) -> None:
+
+        self.connection.close()
+
+    def get_summary(self) -> Dict[str, Any]:
+
+        pages, total_bytes, total_latency, max_depth = self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(latency_ms), 0), COALESCE(MAX(depth), 0) FROM pages'
+        ).fetchone()
+
+        statuses = {
+            str(status): count
+            for status, count in self.connection.execute('SELECT status, COUNT(*) FROM pages GROUP BY status')
+        }
+
+        return {
+            'pages': pages,
+            'urls': self.connection.execute('SELECT COUNT(*) FROM urls').fetchone()[0],
+            'links': int(self.meta.get('edges', 0)),
+            'media': self.connection.execute('SELECT COUNT(*) FROM media').fetchone()[0],
+            'bytes': total_bytes,
+            'latency_ms': round(total_latency, 1),
+            'max_depth': max_depth,
+            'statuses': statuses,
+        }
+
+    def slowest_pages(self, limit: int = 20) -> List[Dict[str, Any]]:
+
+        rows = self.connection.execute(
+            'SELECT urls.url, pages.depth, pages.status, pages.latency_ms, pages.bytes, pages.media '
+            'FROM pages JOIN urls ON urls.id = pages.id '
+            'ORDER BY pages.latency_ms DESC LIMIT ?', (limit,)
+        )
+
+        return [
+            {'url': url, 'depth': depth, 'status': status, 'latency_ms': latency, 'bytes': size, 'media': media}
+            for url, depth, status, latency, size, media in rows
+        ]
+
+    def top_media_subtrees(self, limit: int = 20) -> List[Dict[str, Any]]:
+
+        parents: Dict[int, Optional[int]] = {}
+        media: Dict[int, int] = {}
+
+        for page_id, parent, media_count in self.connection.execute('SELECT id, parent, media FROM pages'):
+            parents[page_id] = parent
+            media[page_id] = media_count
+
+        children: Dict[int, List[int]] = {}
+        roots = []
+
+        for page_id, parent in parents.items():
+            if parent is None or parent not in parents:
+                roots.append(page_id)
+            else:
+                children.setdefault(parent, []).append(page_id)
+
+        subtree_media: Dict[int, int] = {}
+        subtree_pages: Dict[int, int] = {}
+
+        for root in roots:
+            stack = [(root, False)]
+            while stack:
+                page_id, expanded = stack.pop()
+
+                if not expanded:
+                    stack.append((page_id, True))
+                    stack.extend((child, False) for child in children.get(page_id, ()))
+                    continue
+
+                subtree_media[page_id] = media[page_id] + sum(subtree_media[child] for child in children.get(page_id, ()))
+                subtree_pages[page_id] = 1 + sum(subtree_pages[child] for child in children.get(page_id, ()))
+
+        top = sorted(subtree_media, key=lambda page_id: (-subtree_media[page_id], page_id))[:limit]
+        urls = self._get_urls(top)
+
+        return [
+            {
+                'url': urls[page_id],
+                'media': media[page_id],
+                'subtree_media': subtree_media[page_id],
+                'subtree_pages': subtree_pages[page_id],
+            }
+            for page_id in top
+        ]
+
+    def media_path(self, media_url: str) -> Optional[Dict[str, Any]]:
+
+        row = self.connection.execute('SELECT page FROM media WHERE url = ?', (media_url,)).fetchone()
+        if row is None:
+            return None
+
+        path = []
+        seen = set()
+        page_id = row[0]
+
+        while page_id is not None and page_id not in seen:
+            seen.add(page_id)
+
+            page = self.connection.execute(
+                'SELECT urls.url, pages.parent, pages.depth, pages.status FROM urls '
+                'LEFT JOIN pages ON pages.id = urls.id WHERE urls.id = ?', (page_id,)
+            ).fetchone()
+            if page is None:
+                break
+
+            url, parent, depth, status = page
+            path.append({'url': url, 'depth': depth, 'status': status})
+            page_id = parent
+
+        path.reverse()
+        return {'media_url': media_url, 'path': path}
+
+    def get_links(self, url: str) -> Optional[List[str]]:
+
+        row = self.connection.execute('SELECT id FROM urls WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+
+        edge_row = self.connection.execute('SELECT targets FROM edges WHERE source = ?', (row[0],)).fetchone()
+        if edge_row is None:
+            return []
+
+        targets = array('i')
+        targets.frombytes(edge_row[0])
+        if self.meta.get('byteorder', sys.byteorder) != sys.byteorder:
+            targets.byteswap()
+
+        urls = self._get_urls(list(dict.fromkeys(targets)))
+        return [urls[target] for target in dict.fromkeys(targets) if target in urls]
+
+    def _get_urls(self, url_ids: List[int]) -> Dict[int, str]:
+
+        urls: Dict[int, str] = {}
+
+        for start in range(0, len(url_ids), 500):
+            batch = url_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            urls.update(self.connection.execute(f"SELECT id, url FROM urls WHERE id IN ({placeholders})", batch))
+
+        return urls
@@ -0,0 +1,241 @@
+import sys
+import time
+import random
+import logging
+import argparse
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.crawler.page_parser import PageParser
+from app.services.crawler.corpus import CorpusExtractor
+from app.utils.http.response import parse_html, sniff_html_encoding
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://check.example/section/page.html'
+
+WORDS = ['gallery', 'news', 'next', 'older', 'Caf&eacute;', 'A &amp; B', 'more&nbsp;', '&lt;tag&gt;', 'post', 'archive']
+INLINE_TAGS = ['b', 'i', 'span', 'em', 'strong', 'small']
+
+def build_synthetic_corpus(count: int, seed: int = 11) -> Iterator[Tuple[str, bytes]]:
+
+    rng = random.Random(seed)
+
+    def words(n: int) -> str:
+        return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+    def href() -> str:
+        return rng.choice([
+            f'/post-{rng.randrange(500)}', f'post-{rng.randrange(500)}.html', f'../tag/{rng.randrange(50)}/',
+            f'?page={rng.randrange(9)}&amp;sort=new', f'https://other.example/{rng.randrange(99)}',
+            'mailto:me@example.com', '#top', 'javascript:void(0)', f'/files/{rng.randrange(9)}.pdf',
+            f' /spaced-{rng.randrange(9)} ', f'/feed.json',
+        ])
+
+    def anchor() -> str:
+        quote = rng.choice(['"', "'", ''])
+        target = href().strip() if not quote else href()
+        attributes = [f'href={quote}{target}{quote}']
+
+        if rng.random() < 0.2:
+            attributes.append(f'title="{words(2)}"')
+        if rng.random() < 0.1:
+            attributes.append(f'aria-label=\'{words(1)}\'')
+        if rng.random() < 0.1:
+            attributes.append('rel="next nofollow"')
+        if rng.random() < 0.05:
+            attributes.append(f'HREF="/duplicate-{rng.randrange(9)}"')
+
+        rng.shuffle(attributes)
+        tag = rng.choice(['a', 'a', 'a', 'A'])
+        text = words(rng.randint(0, 3))
+
+        if rng.random() < 0.3:
+            inline = rng.choice(INLINE_TAGS)
+            text = f"{text} <{inline}>{words(1)}</{inline}> {words(1)}"
+        if rng.random() < 0.05:
+            text = f"{text}<!-- {words(1)} -->{words(1)}"
+        if rng.random() < 0.03:
+            text = f"{text}<script>var a = '<a href=\"/in-script\">x</a>';</script>"
+        if rng.random() < 0.03:
+            text = f"{text}<br/>{words(1)}"
+
+        return f"<{tag} {' '.join(attributes)}>{text}</{tag}>"
+
+    def body_fragment() -> str:
+        choice = rng.random()
+        if choice < 0.55:
+            return anchor()
+        if choice < 0.62:
+            return f'<area shape="rect" href="{href()}" alt="{words(1)}">'
+        if choice < 0.66:
+            return f'<iframe src="{href()}"></iframe>'
+        if choice < 0.7:
+            return f'<link rel="{rng.choice(["next", "stylesheet", "alternate"])}" type="{rng.choice(["text/html", "application/json", "text/css", "application/rss+xml"])}" href="{href()}">'
+        if choice < 0.74:
+            return f'<p>{words(3)}<p>{words(2)}'
+        if choice < 0.77:
+            return f'</a>{words(1)}'
+        if choice < 0.8:
+            return f'<p><a href="{href()}">{words(1)}</p>{words(1)}</a>'
+        if choice < 0.83:
+            return f'<a href="{href()}">{words(1)}<a href="{href()}">{words(1)}</a>'
+        if choice < 0.86:
+            return f'<a href="{href()}"/>{words(1)}'
+        if choice < 0.9:
+            return f'<img src="/img/{rng.randrange(99)}.jpg" alt="{words(1)}">'
+        if choice < 0.91:
+            return f'<a title="{words(1)} &gt; x>y" href="/download/{rng.randrange(9)}.mp3">{words(1)}</a>'
+        if choice < 0.93:
+            return f'<div style="background: url(/bg/{rng.randrange(9)}.png)">{words(2)}</div>'
+        if choice < 0.96:
+            return f'<video poster="/p.jpg"><source src="/v/{rng.randrange(9)}.mp4"></video>'
+        return f'<div class="{words(1)}" data-x=\'{words(1)}\'>{words(4)}</div>'
+
+    for index in range(count):
+        charset = rng.choice(['utf-8', 'utf-8', 'windows-1252'])
+        icons = '<link rel="icon" href="/favicon.ico"><meta property="og:image" content="/og.png">' if rng.random() < 0.5 else ''
+        head = f'<!DOCTYPE html><html><head><meta charset="{charset}"><title>{words(2)}</title>{icons}</head>'
+        fragments = ''.join(body_fragment() for _ in range(rng.randint(3, 60)))
+        document = f"{head}<body>{fragments}</body></html>"
+
+        yield f"{BASE_URL}?doc={index}", document.encode(charset, errors='replace')
+
+def compare_tiers(parser: PageParser, url: str, body: bytes, content_type: str = 'text/html') -> Dict[str, Any]:
+
+    result: Dict[str, Any] = {'url': url, 'simple': parser.fast_extractor.prescan(body), 'fast': False}
+
+    started = time.perf_counter()
+    soup = parse_html(body, content_type)
+    dom_context: Dict[str, str] = {}
+    dom_stylesheets: Set[str] = set()
+    dom_feeds: Set[str] = set()
+    dom_links = parser.extract_links(soup, url, dom_context, dom_stylesheets, dom_feeds) if soup is not None else set()
+    dom_media = parser.extract_media_urls(soup, url) if soup is not None else set()
+    result['dom_seconds'] = time.perf_counter() - started
+
+    if not result['simple']:
+        return result
+
+    started = time.perf_counter()
+    fast_context: Dict[str, str] = {}
+    fast_stylesheets: Set[str] = set()
+    fast_feeds: Set[str] = set()
+    fast_links = parser.fast_extractor.extract_links(
+        body, sniff_html_encoding(body, content_type), url, fast_context, fast_stylesheets, fast_feeds
+    )
+    result['fast_seconds'] = time.perf_counter() - started
+
+    if fast_links is None:
+        return result
+
+    result['fast'] = True
+    mismatches = []
+
+    if fast_links != dom_links:
+        mismatches.append({
+            'field': 'links',
+            'only_fast': sorted(fast_links - dom_links)[:5],
+            'only_dom': sorted(dom_links - fast_links)[:5],
+        })
+    for field, fast_set, dom_set in (('stylesheets', fast_stylesheets, dom_stylesheets), ('feeds', fast_feeds, dom_feeds)):
+        if fast_set != dom_set:
+            mismatches.append({
+                'field': field,
+                'only_fast': sorted(fast_set - dom_set)[:5],
+                'only_dom': sorted(dom_set - fast_set)[:5],
+            })
+    if dom_media:
+        mismatches.append({'field': 'media', 'only_dom': sorted(dom_media)[:5]})
+    if fast_context != dom_context:
+        differing = sorted(key for key in set(fast_context) | set(dom_context) if fast_context.get(key) != dom_context.get(key))
+        mismatches.append({
+            'field': 'link_context',
+            'examples': [(key, fast_context.get(key), dom_context.get(key)) for key in differing[:3]],
+        })
+
+    result['mismatches'] = mismatches
+    return result
+
+def iter_corpus_documents(inputs: List[str], base_url: Optional[str] = None) -> Iterator[Tuple[str, bytes, str]]:
+
+    extractor = CorpusExtractor(workers=1, base_url=base_url)
+
+    for source, url, content_type, body, path in extractor.iter_tasks(inputs):
+        if 'html' not in content_type:
+            continue
+
+        if body is None and path:
+            with open(path, 'rb') as f:
+                body = f.read()
+
+        yield url, body, content_type
+
+def run_check(documents: Iterator[Tuple[str, bytes, str]], max_examples: int = 10) -> Dict[str, Any]:
+
+    parser = PageParser(two_tier=True)
+
+    summary: Dict[str, Any] = {
+        'documents': 0, 'simple': 0, 'fast': 0, 'mismatched': 0,
+        'dom_seconds': 0.0, 'fast_seconds': 0.0, 'dom_seconds_on_fast': 0.0, 'examples': [],
+    }
+
+    for url, body, content_type in documents:
+        result = compare_tiers(parser, url, body, content_type)
+
+        summary['documents'] += 1
+        summary['dom_seconds'] += result['dom_seconds']
+        summary['simple'] += int(result['simple'])
+
+        if not result['fast']:
+            continue
+
+        summary['fast'] += 1
+        summary['fast_seconds'] += result['fast_seconds']
+        summary['dom_seconds_on_fast'] += result['dom_seconds']
+
+        if result['mismatches']:
+            summary['mismatched'] += 1
+            if len(summary['examples']) < max_examples:
+                summary['examples'].append({'url': url, 'mismatches': result['mismatches']})
+
+    return summary
+
+def main(argv: List[str] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Check that regex-only extraction matches DOM extraction")
+    parser.add_argument('inputs', nargs='*', help="WARC files, WARC directories or mirrored HTML trees")
+    parser.add_argument('--base-url', help="Base URL for HTML trees")
+    parser.add_argument('--synthetic', type=int, default=0, help="Also check N generated pages")
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args(argv)
+
+    if not args.inputs and not args.synthetic:
+        args.synthetic = 2000
+
+    def documents():
+        if args.inputs:
+            yield from iter_corpus_documents(args.inputs, args.base_url)
+        for url, body in build_synthetic_corpus(args.synthetic, args.seed):
+            yield url, body, 'text/html'
+
+    summary = run_check(documents())
+
+    speedup = summary['dom_seconds_on_fast'] / summary['fast_seconds'] if summary['fast_seconds'] else 0
+
+    print(f"documents:        {summary['documents']}")
+    print(f"prescan simple:   {summary['simple']}")
+    print(f"regex-only tier:  {summary['fast']}")
+    print(f"mismatched:       {summary['mismatched']}")
+    print(f"speedup on fast:  {speedup:.1f}x")
+
+    for example in summary['examples']:
+        print(f"\n{example['url']}")
+        for mismatch in example['mismatches']:
+            print(f"  {mismatch}")
+
+    return 1 if summary['mismatched'] else 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import re
+import html
+import logging
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import MEDIA_EXTENSIONS, STREAM_MANIFEST_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+def _build_media_marker_regex() -> re.Pattern:
+
+    extensions = set(STREAM_MANIFEST_EXTENSIONS)
+    for values in MEDIA_EXTENSIONS.values():
+        extensions.update(values)
+
+    alternatives = '|'.join(sorted(re.escape(ext.lstrip('.')) for ext in extensions))
+
+    return re.compile(
+        rb'<(?:img|video|audio|source|picture|template)\b'
+        rb'|srcset|poster\s*=|url\('
+        rb'|\.(?:' + alternatives.encode('ascii') + rb')(?=[?#"\'\s>)&]|$)'
+        rb'|<!\[CDATA\[',
+        re.IGNORECASE
+    )
+
+MEDIA_MARKER_REGEX = _build_media_marker_regex()
+IGNORED_MEDIA_TAG_REGEX = re.compile(rb'<(?:link|meta|script)\s', re.IGNORECASE)
+
+COMMENT_REGEX = re.compile(r'<!--.*?-->', re.DOTALL)
+RAW_TEXT_REGEX = re.compile(r'<(script|style)\b(?:[^>"\']|"[^"]*"|\'[^\']*\')*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+DECLARATION_REGEX = re.compile(r'<[!?][^>]*>')
+TAG_REGEX = re.compile(r'<(/?)([a-zA-Z][^\t\n\r\f />\x00]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+ATTRIBUTE_REGEX = re.compile(
+    r'((?<=[\'"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?(?:\s|/(?!>))*'
+)
+ATTRIBUTE_SEPARATOR_REGEX = re.compile(r'(?:\s|/(?!>))*')
+HAZARD_REGEX = re.compile(r'<!--|<script\b|<style\b|<!\[', re.IGNORECASE)
+
+TEXT_BREAK = '<wbr>'
+
+LINK_TAGS = ('a', 'area', 'frame', 'iframe', 'link')
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+}
+
+class FastExtractor:
+
+    def __init__(self, page_parser):
+
+        self.page_parser = page_parser
+
+    @staticmethod
+    def prescan(body: bytes) -> bool:
+
+        for match in MEDIA_MARKER_REGEX.finditer(body):
+            if match.group(0)[:1] != b'.':
+                return False
+
+            tag_start = body.rfind(b'<', 0, match.start())
+            if tag_start < 0 or body.rfind(b'>', 0, match.start()) > tag_start:
+                return False
+
+            if not IGNORED_MEDIA_TAG_REGEX.match(body, tag_start):
+                return False
+
+        return True
+
+    def extract_links(self,
+                      body: bytes,
+                      encoding: str,
+                      base_url: str,
+                      link_context: Optional[Dict[str, str]] = None,
+                      stylesheets: Optional[Set[str]] = None,
+                      feeds: Optional[Set[str]] = None) -> Optional[Set[str]]:
+
+        try:
+            text = body.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            return None
+
+        text = COMMENT_REGEX.sub(TEXT_BREAK, text)
+        text = RAW_TEXT_REGEX.sub(TEXT_BREAK, text)
+        text = DECLARATION_REGEX.sub(TEXT_BREAK, text)
+
+        if HAZARD_REGEX.search(text):
+            return None
+
+        anchors, frames, link_tags = self._scan_tags(text)
+        if anchors is None:
+            return None
+
+        links: Set[str] = set()
+        parser = self.page_parser
+
+        for tag_name, attributes, anchor_text in anchors:
+            absolute_url = parser._add_page_link(attributes['href'], tag_name, base_url, links)
+            if absolute_url and link_context is not None:
+                self._record_link_context(attributes, anchor_text, absolute_url, link_context)
+
+        for tag_name, attributes in frames:
+            parser._add_page_link(attributes['src'], tag_name, base_url, links)
+
+        for attributes in link_tags:
+            rel = attributes.get('rel', '').lower().split()
+            link_type = attributes.get('type', '').lower()
+
+            if 'next' in rel:
+                absolute_url = parser._add_page_link(attributes['href'], 'a', base_url, links)
+                if absolute_url and link_context is not None:
+                    link_context[absolute_url] = f"{link_context.get(absolute_url, '')} rel:next".strip()
+            elif 'json' in link_type and parser.link_classifier.follow_json:
+                parser._add_page_link(attributes['href'], 'a', base_url, links)
+
+            if 'stylesheet' in rel and stylesheets is not None:
+                parser._add_resource(attributes['href'], base_url, stylesheets)
+            elif parser.is_feed_link(rel, link_type) and feeds is not None:
+                parser._add_resource(attributes['href'], base_url, feeds)
+
+        return links
+
+    def _scan_tags(self, text: str) -> Tuple[Optional[List[Tuple[str, Dict[str, str], str]]], list, list]:
+
+        anchors = []
+        frames = []
+        link_tags = []
+
+        open_anchor: Optional[Tuple[Dict[str, str], List[str]]] = None
+        inner_tags: List[str] = []
+        position = 0
+
+        for match in TAG_REGEX.finditer(text):
+            if open_anchor is not None:
+                open_anchor[1].append(text[position:match.start()])
+            position = match.end()
+
+            closing, name, raw_attributes = match.group(1), match.group(2).lower(), match.group(3)
+
+            if open_anchor is not None and name != 'a':
+                if closing:
+                    if name not in inner_tags:
+                        return None, [], []
+                    last = len(inner_tags) - 1 - inner_tags[::-1].index(name)
+                    del inner_tags[last:]
+                elif name not in VOID_TAGS and not raw_attributes.rstrip().endswith('/'):
+                    inner_tags.append(name)
+
+            if name not in LINK_TAGS:
+                continue
+
+            if closing:
+                if name == 'a' and open_anchor is not None:
+                    if 'href' in open_anchor[0]:
+                        anchors.append(('a', open_anchor[0], self._join_text(open_anchor[1])))
+                    open_anchor = None
+                    inner_tags = []
+                continue
+
+            attributes, self_closing = self._parse_attributes(raw_attributes)
+
+            if name == 'a':
+                if open_anchor is not None:
+                    return None, [], []
+
+                if self_closing:
+                    if 'href' in attributes:
+                        anchors.append(('a', attributes, ''))
+                else:
+                    open_anchor = (attributes, [])
+            elif name == 'area' and 'href' in attributes:
+                anchors.append(('area', attributes, ''))
+            elif name in ('frame', 'iframe') and 'src' in attributes:
+                frames.append((name, attributes))
+            elif name == 'link' and 'href' in attributes:
+                link_tags.append(attributes)
+
+        if open_anchor is not None:
+            return None, [], []
+
+        return anchors, frames, link_tags
+
+    @staticmethod
+    def _parse_attributes(raw_attributes: str) -> Tuple[Dict[str, str], bool]:
+
+        attributes = {}
+        markup = ' ' + raw_attributes + '>'
+        end = ATTRIBUTE_SEPARATOR_REGEX.match(markup).end()
+
+        for match in ATTRIBUTE_REGEX.finditer(markup, end):
+            if match.start() != end:
+                break
+            end = match.end()
+
+            name = match.group(1).lower()
+            value = match.group(3)
+
+            if value is None:
+                value = ''
+            elif value[:1] == value[-1:] and value[:1] in ('"', "'") and len(value) >= 2:
+                value = value[1:-1]
+
+            attributes[name] = html.unescape(value)
+
+        return attributes, markup[end:].strip() == '/>'
+
+    @staticmethod
+    def _join_text(chunks: List[str]) -> str:
+
+        parts = (html.unescape(chunk).strip() for chunk in chunks)
+        return ' '.join(part for part in parts if part)
+
+    @staticmethod
+    def _record_link_context(attributes: Dict[str, str],
+                             anchor_text: str,
+                             absolute_url: str,
+                             link_context: Dict[str, str]) -> None:
+
+        parts = [anchor_text, attributes.get('title', ''), attributes.get('aria-label', '')]
+
+        if 'next' in attributes.get('rel', '').lower().split():
+            parts.append('rel:next')
+
+        context = ' '.join(part for part in parts if part)[:200]
+        if context:
+            existing = link_context.get(absolute_url)
+            link_context[absolute_url] = (f"{existing} {context}" if existing else context)[:400]
@@ -0,0 +1,163 @@
+import re
+import html
+import logging
+
+from typing import Optional, Set
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+from app.services.crawler.url_utils import UrlUtils
+
+logger = logging.getLogger(__name__)
+
+MEDIA_RSS_NAMESPACE = 'http://search.yahoo.com/mrss/'
+ITUNES_NAMESPACE = 'http://www.itunes.com/dtds/podcast-1.0.dtd'
+
+ITEM_TAGS = ('item', 'entry')
+MEDIA_MIME_PREFIXES = ('image/', 'video/', 'audio/')
+MEDIA_RSS_MEDIUMS = ('image', 'video', 'audio')
+HTML_CONTENT_TAGS = ('description', 'encoded', 'content', 'summary')
+
+IMG_SRC_REGEX = re.compile(r'<img\b[^>]*?\ssrc\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+
+def _split_tag(tag: str):
+
+    if tag.startswith('{'):
+        namespace, _, local_name = tag[1:].partition('}')
+        return namespace, local_name
+
+    return '', tag
+
+class FeedParser:
+
+    def __init__(self, feed_url: str):
+
+        self.feed_url = feed_url
+        self.url_utils = UrlUtils()
+        self.parser = XMLPullParser(events=('end',))
+
+        self.media_urls: Set[str] = set()
+        self.item_links: Set[str] = set()
+        self.items = 0
+        self.is_feed = False
+        self.error: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> bool:
+
+        if self.error is not None:
+            return False
+
+        try:
+            self.parser.feed(chunk)
+            self._drain_events()
+            return True
+        except ParseError as e:
+            self.error = str(e)
+            logger.debug(f"Stopped parsing feed {self.feed_url}: {e}")
+            return False
+
+    def close(self) -> None:
+
+        if self.error is not None:
+            return
+
+        try:
+            self.parser.close()
+            self._drain_events()
+        except ParseError as e:
+            self.error = str(e)
+            logger.debug(f"Incomplete feed {self.feed_url}: {e}")
+
+    def _drain_events(self) -> None:
+
+        for _, element in self.parser.read_events():
+            namespace, local_name = _split_tag(element.tag)
+
+            if local_name in ('rss', 'feed', 'RDF', 'channel'):
+                self.is_feed = True
+
+            if local_name in ITEM_TAGS and namespace != MEDIA_RSS_NAMESPACE:
+                self.is_feed = True
+                self.items += 1
+                self._process_item(element)
+                element.clear()
+
+    def _process_item(self, item: Element) -> None:
+
+        for element in item.iter():
+            namespace, local_name = _split_tag(element.tag)
+
+            if namespace == MEDIA_RSS_NAMESPACE:
+                self._process_media_rss(local_name, element)
+            elif namespace == ITUNES_NAMESPACE and local_name == 'image':
+                self._add_media(element.get('href'))
+            elif local_name == 'enclosure':
+                self._add_enclosure(element.get('url'), element.get('type'))
+            elif local_name == 'link':
+                self._process_link(element)
+            elif local_name in HTML_CONTENT_TAGS:
+                self._process_html_content(element)
+
+    def _process_media_rss(self, local_name: str, element: Element) -> None:
+
+        if local_name == 'thumbnail':
+            self._add_media(element.get('url'))
+        elif local_name == 'content':
+            medium = (element.get('medium') or '').lower()
+            mime_type = (element.get('type') or '').lower()
+
+            if medium in MEDIA_RSS_MEDIUMS or mime_type.startswith(MEDIA_MIME_PREFIXES):
+                self._add_media(element.get('url'))
+            else:
+                self._add_media(element.get('url'), require_extension=True)
+
+    def _add_enclosure(self, url: Optional[str], mime_type: Optional[str]) -> None:
+
+        if (mime_type or '').lower().startswith(MEDIA_MIME_PREFIXES):
+            self._add_media(url)
+        else:
+            self._add_media(url, require_extension=True)
+
+    def _process_link(self, element: Element) -> None:
+
+        href = element.get('href')
+
+        if href is None:
+            if element.text:
+                self._add_item_link(element.text)
+            return
+
+        rel = (element.get('rel') or 'alternate').lower()
+
+        if rel == 'enclosure':
+            self._add_enclosure(href, element.get('type'))
+        elif rel == 'alternate':
+            self._add_item_link(href)
+
+    def _process_html_content(self, element: Element) -> None:
+
+        text = element.text or ''
+        if '<img' not in text.lower():
+            return
+
+        for src in IMG_SRC_REGEX.findall(text):
+            self._add_media(html.unescape(src))
+
+    def _add_media(self, url: Optional[str], require_extension: bool = False) -> None:
+
+        if not url or url.strip().startswith('data:'):
+            return
+
+        absolute_url = self.url_utils.build_absolute_url(self.feed_url, url.strip())
+        if not absolute_url:
+            return
+
+        if require_extension and not self.url_utils.is_media_url(absolute_url):
+            return
+
+        self.media_urls.add(absolute_url)
+
+    def _add_item_link(self, url: str) -> None:
+
+        absolute_url = self.url_utils.build_absolute_url(self.feed_url, url.strip())
+        if absolute_url:
+            self.item_links.add(absolute_url)
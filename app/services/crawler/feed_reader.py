@@ -0,0 +1,176 @@
+import asyncio
+import aiohttp
+import logging
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import REQUEST_TIMEOUT, FEED_MAX_SIZE, FEED_CONCURRENCY
+from app.services.crawler.feed_parser import FeedParser
+from app.services.crawler.robots_parser import RobotsParser
+
+logger = logging.getLogger(__name__)
+
+FEED_ACCEPT_HEADER = 'application/rss+xml,application/atom+xml,application/xml;q=0.9,text/xml;q=0.9,*/*;q=0.1'
+FEED_CHUNK_SIZE = 16 * 1024
+
+FeedHandler = Callable[..., Awaitable[None]]
+
+class FeedReader:
+
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 robots_parser: RobotsParser,
+                 handler: Optional[FeedHandler] = None,
+                 concurrency: int = FEED_CONCURRENCY):
+
+        self.session = session
+        self.robots_parser = robots_parser
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.progress: Optional[asyncio.Event] = None
+        self.workers: List[asyncio.Task] = []
+        self.pending = 0
+
+        self.seen: Set[str] = set()
+        self.feeds_parsed = 0
+        self.items = 0
+        self.media_urls: Set[str] = set()
+
+    def reset(self) -> None:
+
+        self.seen.clear()
+        self.feeds_parsed = 0
+        self.items = 0
+        self.media_urls.clear()
+
+    def schedule(self, urls: Iterable[str], source: Tuple[Any, ...] = ()) -> int:
+
+        scheduled = 0
+
+        for url in urls:
+            if url in self.seen:
+                continue
+
+            self.seen.add(url)
+            self._ensure_workers()
+            self.queue.put_nowait((url, source))
+            self.pending += 1
+            scheduled += 1
+
+        return scheduled
+
+    def _ensure_workers(self) -> None:
+
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+            self.progress = asyncio.Event()
+
+        if not self.workers:
+            self.workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    async def _worker(self) -> None:
+
+        while True:
+            url, source = await self.queue.get()
+
+            try:
+                feed = await self.read(url)
+                if self.handler is not None:
+                    await self.handler(feed, *source)
+            except Exception as e:
+                logger.warning(f"Error handling feed {url}: {e}")
+            finally:
+                self.pending -= 1
+                self.progress.set()
+                self.queue.task_done()
+
+    async def wait(self) -> bool:
+
+        if not self.pending:
+            return False
+
+        self.progress.clear()
+        await self.progress.wait()
+        return True
+
+    async def drain(self) -> None:
+
+        if self.queue is not None:
+            await self.queue.join()
+
+        await self.stop()
+
+    async def stop(self) -> None:
+
+        for worker in self.workers:
+            worker.cancel()
+
+        if self.workers:
+            await asyncio.gather(*self.workers, return_exceptions=True)
+
+        self.workers = []
+        self.queue = None
+        self.progress = None
+        self.pending = 0
+
+    async def read(self, url: str) -> Optional[FeedParser]:
+
+        if not await self.robots_parser.is_allowed(url):
+            logger.debug(f"Skipping feed {url}: disallowed by robots.txt")
+            return None
+
+        try:
+            feed = await self._fetch_and_parse(url)
+        except asyncio.TimeoutError:
+            logger.debug(f"Timeout fetching feed {url}")
+            return None
+        except aiohttp.ClientError as e:
+            logger.debug(f"HTTP client error fetching feed {url}: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Error reading feed {url}: {e}")
+            return None
+
+        if feed is None or not feed.is_feed:
+            return None
+
+        self.feeds_parsed += 1
+        self.items += feed.items
+        self.media_urls.update(feed.media_urls)
+
+        logger.info(f"Feed {url}: {feed.items} items, {len(feed.media_urls)} media URLs, "
+                    f"{len(feed.item_links)} item links")
+        return feed
+
+    async def _fetch_and_parse(self, url: str) -> Optional[FeedParser]:
+
+        async with self.session.get(url, timeout=REQUEST_TIMEOUT, headers={'Accept': FEED_ACCEPT_HEADER}) as response:
+            if response.status != 200:
+                logger.debug(f"Skipping feed {url}: HTTP {response.status}")
+                return None
+
+            feed = FeedParser(url)
+            size = 0
+
+            async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                size += len(chunk)
+
+                if not feed.feed(chunk):
+                    break
+
+                if size > FEED_MAX_SIZE:
+                    logger.debug(f"Feed {url} exceeds {FEED_MAX_SIZE} bytes, keeping the items parsed so far")
+                    return feed
+
+        feed.close()
+        return feed
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'feeds': self.feeds_parsed,
+            'items': self.items,
+            'media': len(self.media_urls),
+        }
@@ -0,0 +1,314 @@
+import heapq
+import logging
+import itertools
+
+from collections import deque
+from typing import Optional, Tuple, List, Any, Union
+
+from app.config import CRAWL_FRONTIER, FRONTIER_MEMORY_LIMIT, FRONTIER_SPILL_DIR
+from app.services.crawler.frontier_store import FrontierSpillStore, SpillRow
+from app.services.crawler.url_table import UrlTable
+
+logger = logging.getLogger(__name__)
+
+UrlKey = Union[str, int]
+
+class FifoFrontier:
+
+    def __init__(self):
+
+        self.queue = deque()
+
+    def push(self,
+             url: UrlKey,
+             depth: int,
+             score: float = 0.0,
+             hint: Optional[Tuple[int, Optional[str]]] = None,
+             source: Optional[str] = None) -> None:
+
+        self.queue.append((url, depth, source))
+
+    def pop(self) -> Optional[Tuple[UrlKey, int]]:
+
+        entry = self.pop_entry()
+        return entry[:2] if entry is not None else None
+
+    def pop_entry(self) -> Optional[Tuple[UrlKey, int, Optional[str]]]:
+
+        if not self.queue:
+            return None
+        return self.queue.popleft()
+
+    def clear(self) -> None:
+
+        self.queue.clear()
+
+    def close(self) -> None:
+
+        self.clear()
+
+    def in_memory(self) -> int:
+
+        return len(self.queue)
+
+    def shrink(self) -> int:
+
+        return 0
+
+    def __len__(self) -> int:
+
+        return len(self.queue)
+
+class PriorityFrontier:
+
+    MIN_RESCORE_INTERVAL = 8
+    RESCORE_INTERVAL_DIVISOR = 1000
+
+    def __init__(self, scorer: Any = None, url_table: Optional[UrlTable] = None):
+
+        self.scorer = scorer
+        self.url_table = url_table
+        self.heap: List[Tuple[float, int, UrlKey, int, Optional[Tuple[int, Optional[str]]], int, Optional[str]]] = []
+        self.counter = itertools.count()
+        self.rescored_version = 0
+
+    def push(self,
+             url: UrlKey,
+             depth: int,
+             score: float = 0.0,
+             hint: Optional[Tuple[int, Optional[str]]] = None,
+             source: Optional[str] = None) -> None:
+
+        heapq.heappush(self.heap, (-score, next(self.counter), url, depth, hint, self._scorer_version(), source))
+
+    def pop(self) -> Optional[Tuple[UrlKey, int]]:
+
+        entry = self.pop_entry()
+        return entry[:2] if entry is not None else None
+
+    def pop_entry(self) -> Optional[Tuple[UrlKey, int, Optional[str]]]:
+
+        if self._should_rescore_all():
+            self._rescore_all()
+
+        while self.heap:
+            neg_score, _, url, depth, hint, version, source = heapq.heappop(self.heap)
+
+            if hint is None or version == self._scorer_version():
+                return url, depth, source
+
+            score = self.scorer.score(self._get_url(url), depth, *hint)
+
+            if not self.heap or score >= -self.heap[0][0]:
+                return url, depth, source
+
+            self.push(url, depth, score, hint, source)
+
+        return None
+
+    def clear(self) -> None:
+
+        self.heap.clear()
+        self.counter = itertools.count()
+        self.rescored_version = 0
+
+    def close(self) -> None:
+
+        self.clear()
+
+    def in_memory(self) -> int:
+
+        return len(self.heap)
+
+    def shrink(self) -> int:
+
+        return 0
+
+    def _should_rescore_all(self) -> bool:
+
+        if self.scorer is None or not self.heap:
+            return False
+
+        interval = max(self.MIN_RESCORE_INTERVAL, len(self.heap) // self.RESCORE_INTERVAL_DIVISOR)
+        return self._scorer_version() - self.rescored_version >= interval
+
+    def _rescore_all(self) -> None:
+
+        version = self._scorer_version()
+        rescored = []
+
+        for neg_score, sequence, url, depth, hint, _, source in self.heap:
+            if hint is not None:
+                neg_score = -self.scorer.score(self._get_url(url), depth, *hint)
+            rescored.append((neg_score, sequence, url, depth, hint, version, source))
+
+        heapq.heapify(rescored)
+        self.heap = rescored
+        self.rescored_version = version
+
+    def _get_url(self, url: UrlKey) -> str:
+
+        return self.url_table.get_url(url) if self.url_table is not None else url
+
+    def _scorer_version(self) -> int:
+
+        return self.scorer.version if self.scorer is not None else 0
+
+    def __len__(self) -> int:
+
+        return len(self.heap)
+
+SPILL_BATCH_SIZE = 1000
+
+class SpillingFifoFrontier(FifoFrontier):
+
+    def __init__(self, memory_limit: int, spill_dir: Optional[str] = None, batch_size: int = SPILL_BATCH_SIZE):
+
+        super().__init__()
+
+        self.batch_size = batch_size
+        self.memory_limit = max(batch_size, memory_limit)
+        self.store = FrontierSpillStore(spill_dir)
+        self.pending: List[SpillRow] = []
+        self.counter = itertools.count()
+
+    def push(self,
+             url: UrlKey,
+             depth: int,
+             score: float = 0.0,
+             hint: Optional[Tuple[int, Optional[str]]] = None,
+             source: Optional[str] = None) -> None:
+
+        if not len(self.store) and not self.pending and len(self.queue) < self.memory_limit:
+            self.queue.append((url, depth, source))
+            return
+
+        self.pending.append((0.0, next(self.counter), url, depth, None, None, 0, source))
+
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+
+    def pop_entry(self) -> Optional[Tuple[UrlKey, int, Optional[str]]]:
+
+        if not self.queue:
+            self._refill()
+
+        return super().pop_entry()
+
+    def _flush(self) -> None:
+
+        self.store.append(self.pending)
+        self.pending = []
+
+    def _refill(self) -> None:
+
+        self._flush()
+        self.queue.extend((row[2], row[3], row[7]) for row in self.store.take(self.batch_size))
+
+    def clear(self) -> None:
+
+        super().clear()
+        self.pending = []
+        self.store.clear()
+        self.counter = itertools.count()
+
+    def __len__(self) -> int:
+
+        return len(self.queue) + len(self.pending) + len(self.store)
+
+class SpillingPriorityFrontier(PriorityFrontier):
+
+    def __init__(self,
+                 scorer: Any = None,
+                 memory_limit: int = FRONTIER_MEMORY_LIMIT,
+                 spill_dir: Optional[str] = None,
+                 batch_size: int = SPILL_BATCH_SIZE,
+                 url_table: Optional[UrlTable] = None):
+
+        super().__init__(scorer, url_table)
+
+        self.batch_size = batch_size
+        self.memory_limit = max(2 * batch_size, memory_limit)
+        self.store = FrontierSpillStore(spill_dir)
+        self.disk_best: Optional[Tuple[float, int]] = None
+
+    def push(self,
+             url: UrlKey,
+             depth: int,
+             score: float = 0.0,
+             hint: Optional[Tuple[int, Optional[str]]] = None,
+             source: Optional[str] = None) -> None:
+
+        super().push(url, depth, score, hint, source)
+
+        if len(self.heap) > self.memory_limit:
+            self._spill()
+
+    def pop_entry(self) -> Optional[Tuple[UrlKey, int, Optional[str]]]:
+
+        if self.disk_best is not None and (not self.heap or self.disk_best < self.heap[0][:2]):
+            self._refill()
+
+        return super().pop_entry()
+
+    def shrink(self) -> int:
+
+        spilled = len(self.heap) - self.batch_size
+        if spilled <= 0:
+            return 0
+
+        self._spill(self.batch_size)
+        logger.info(f"Spilled {spilled} pending URLs to disk to free memory")
+        return spilled
+
+    def _spill(self, keep: Optional[int] = None) -> None:
+
+        self.heap.sort()
+        keep = self.memory_limit // 2 if keep is None else keep
+
+        rows = [
+            (neg_score, sequence, url, depth,
+             hint[0] if hint is not None else None, hint[1] if hint is not None else None, version, source)
+            for neg_score, sequence, url, depth, hint, version, source in self.heap[keep:]
+        ]
+
+        del self.heap[keep:]
+        self.store.append(rows)
+
+        if self.disk_best is None or rows[0][:2] < self.disk_best:
+            self.disk_best = rows[0][:2]
+
+    def _refill(self) -> None:
+
+        for neg_score, sequence, url, depth, hint_media, hint_context, version, source in self.store.take(self.batch_size):
+            hint = (hint_media, hint_context) if hint_media is not None else None
+            heapq.heappush(self.heap, (neg_score, sequence, url, depth, hint, version, source))
+
+        self.disk_best = self.store.peek_key()
+
+    def clear(self) -> None:
+
+        super().clear()
+        self.store.clear()
+        self.disk_best = None
+
+    def __len__(self) -> int:
+
+        return len(self.heap) + len(self.store)
+
+def create_frontier(kind: str = CRAWL_FRONTIER,
+                    scorer: Any = None,
+                    memory_limit: int = FRONTIER_MEMORY_LIMIT,
+                    spill_dir: Optional[str] = FRONTIER_SPILL_DIR,
+                    url_table: Optional[UrlTable] = None):
+
+    if kind == 'fifo':
+        return SpillingFifoFrontier(memory_limit, spill_dir) if memory_limit > 0 else FifoFrontier()
+
+    if kind != 'priority':
+        logger.warning(f"Unknown frontier type '{kind}', using priority frontier")
+
+    if memory_limit > 0:
+        return SpillingPriorityFrontier(scorer, memory_limit, spill_dir, url_table=url_table)
+
+    return PriorityFrontier(scorer, url_table)
\ No newline at end of file
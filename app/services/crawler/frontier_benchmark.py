@@ -0,0 +1,153 @@
+import sys
+import random
+import logging
+import argparse
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from app.services.crawler.url_scorer import UrlScorer
+from app.services.crawler.frontier import create_frontier
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://bench.example'
+
+NAV_PATHS = ['/about', '/contact', '/privacy', '/terms', '/login', '/register', '/help', '/faq', '/cart', '/search']
+
+@dataclass
+class SyntheticPage:
+    url: str
+    media: Set[str] = field(default_factory=set)
+    links: Dict[str, str] = field(default_factory=dict)
+
+def build_site(seed: int = 7, sections: int = 8, albums: int = 12, posts: int = 120) -> Dict[str, SyntheticPage]:
+
+    rng = random.Random(seed)
+    site: Dict[str, SyntheticPage] = {}
+
+    def page(path: str) -> SyntheticPage:
+        url = f"{BASE_URL}{path}"
+        if url not in site:
+            site[url] = SyntheticPage(url=url)
+        return site[url]
+
+    def link(source: SyntheticPage, path: str, context: str = '') -> None:
+        source.links[f"{BASE_URL}{path}"] = context
+
+    home = page('/')
+
+    for nav_path in NAV_PATHS:
+        page(nav_path)
+
+    for section in range(sections):
+        section_page = page(f'/news/section-{section}')
+        link(home, f'/news/section-{section}', f'Section {section}')
+
+        for post in range(section, posts, sections):
+            post_page = page(f'/news/post-{post}')
+            link(section_page, f'/news/post-{post}', f'Read post {post}')
+
+            if rng.random() < 0.3:
+                post_page.media.add(f"{BASE_URL}/static/post-{post}.jpg")
+
+            for _ in range(3):
+                other = rng.randrange(posts)
+                link(post_page, f'/news/post-{other}', f'Related {other}')
+
+    for album in range(albums):
+        pages_in_album = rng.randint(2, 5)
+        link(home, f'/gallery/album-{album}', f'Album {album} has:img')
+
+        for number in range(1, pages_in_album + 1):
+            path = f'/gallery/album-{album}' if number == 1 else f'/gallery/album-{album}/page/{number}'
+            album_page = page(path)
+
+            for item in range(20):
+                photo_id = f'{album}-{number}-{item}'
+                album_page.media.add(f"{BASE_URL}/media/thumb-{photo_id}.jpg")
+
+                if item < 4:
+                    photo_page = page(f'/photos/{photo_id}')
+                    photo_page.media.add(f"{BASE_URL}/media/full-{photo_id}.jpg")
+                    link(album_page, f'/photos/{photo_id}', 'has:img')
+
+            if number < pages_in_album:
+                link(album_page, f'/gallery/album-{album}/page/{number + 1}', 'Next rel:next')
+
+    for url, synthetic_page in site.items():
+        for nav_path in NAV_PATHS:
+            link(synthetic_page, nav_path, nav_path.strip('/').title())
+
+    return site
+
+def simulate_crawl(site: Dict[str, SyntheticPage], kind: str, page_budget: int, max_depth: int = 6) -> Dict[str, float]:
+
+    scorer = UrlScorer()
+    frontier = create_frontier(kind, scorer)
+
+    visited: Set[str] = set()
+    media: Set[str] = set()
+
+    frontier.push(f"{BASE_URL}/", 0, 0.0)
+
+    while len(frontier) and len(visited) < page_budget:
+        url, depth = frontier.pop()
+
+        if url in visited or depth > max_depth:
+            continue
+
+        visited.add(url)
+
+        synthetic_page = site.get(url)
+        if synthetic_page is None:
+            continue
+
+        media.update(synthetic_page.media)
+        scorer.record_page(url, len(synthetic_page.media))
+
+        if depth >= max_depth:
+            continue
+
+        for child_url, context in synthetic_page.links.items():
+            if child_url not in visited:
+                hint = (len(synthetic_page.media), context)
+                score = scorer.score(child_url, depth + 1, *hint)
+                frontier.push(child_url, depth + 1, score, hint)
+
+    pages = len(visited)
+    return {
+        'pages': pages,
+        'media': len(media),
+        'media_per_page': round(len(media) / pages, 2) if pages else 0
+    }
+
+def run_benchmark(budgets: List[int], seed: int = 7) -> List[Dict[str, float]]:
+
+    site = build_site(seed=seed)
+    results = []
+
+    for budget in budgets:
+        for kind in ('fifo', 'priority'):
+            result = simulate_crawl(site, kind, budget)
+            result.update({'frontier': 'bfs' if kind == 'fifo' else kind, 'budget': budget})
+            results.append(result)
+
+    return results
+
+def main(argv: List[str] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Compare BFS and priority crawl frontiers on a synthetic site")
+    parser.add_argument('--budgets', type=int, nargs='+', default=[25, 50, 100, 200])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    print(f"{'budget':>8} {'frontier':>10} {'pages':>7} {'media':>7} {'media/page':>11}")
+    for result in run_benchmark(args.budgets, args.seed):
+        print(f"{result['budget']:>8} {result['frontier']:>10} {result['pages']:>7} "
+              f"{result['media']:>7} {result['media_per_page']:>11}")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,181 @@
+import os
+import heapq
+import sqlite3
+import logging
+import tempfile
+
+from collections import deque
+from typing import Deque, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SpillRow = Tuple[float, int, Union[str, int], int, Optional[int], Optional[str], int, Optional[str]]
+
+RUN_READ_SIZE = 128
+
+class _SpillRun:
+
+    __slots__ = ('next_rowid', 'end_rowid', 'buffer', 'last_key')
+
+    def __init__(self, start_rowid: int, end_rowid: int, last_key: Tuple[float, int]):
+
+        self.next_rowid = start_rowid
+        self.end_rowid = end_rowid
+        self.buffer: Deque[SpillRow] = deque()
+        self.last_key = last_key
+
+class FrontierSpillStore:
+
+    def __init__(self, spill_dir: Optional[str] = None):
+
+        self.spill_dir = spill_dir or None
+        self.db_path: Optional[str] = None
+        self.connection: Optional[sqlite3.Connection] = None
+
+        self.runs: List[_SpillRun] = []
+        self.next_rowid = 1
+        self.count = 0
+
+        self.rows_spilled = 0
+        self.rows_loaded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+
+        if self.connection is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+
+            fd, self.db_path = tempfile.mkstemp(prefix='frontier-', suffix='.sqlite3', dir=self.spill_dir)
+            os.close(fd)
+
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=OFF')
+            self.connection.execute('PRAGMA synchronous=OFF')
+            self.connection.execute('PRAGMA cache_size=-2048')
+            self.connection.execute(
+                'CREATE TABLE frontier ('
+                'id INTEGER PRIMARY KEY, '
+                'sort_key REAL NOT NULL, '
+                'sequence INTEGER NOT NULL, '
+                'url NOT NULL, '
+                'depth INTEGER NOT NULL, '
+                'hint_media INTEGER, '
+                'hint_context TEXT, '
+                'version INTEGER NOT NULL, '
+                'source TEXT)'
+            )
+
+            logger.debug(f"Spilling crawl frontier to {self.db_path}")
+
+        return self.connection
+
+    def append(self, rows: List[SpillRow]) -> None:
+
+        if not rows:
+            return
+
+        connection = self._connect()
+        start_rowid = self.next_rowid
+
+        connection.executemany(
+            'INSERT INTO frontier VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((start_rowid + offset,) + row for offset, row in enumerate(rows))
+        )
+        connection.commit()
+
+        self.next_rowid += len(rows)
+        self.count += len(rows)
+        self.rows_spilled += len(rows)
+
+        first_key, last_key = (rows[0][0], rows[0][1]), (rows[-1][0], rows[-1][1])
+        last_run = self.runs[-1] if self.runs else None
+
+        if last_run is not None and last_run.end_rowid == start_rowid - 1 and first_key >= last_run.last_key:
+            last_run.end_rowid = self.next_rowid - 1
+            last_run.last_key = last_key
+        else:
+            self.runs.append(_SpillRun(start_rowid, self.next_rowid - 1, last_key))
+
+    def _head(self, run: _SpillRun) -> Optional[SpillRow]:
+
+        if not run.buffer and run.next_rowid <= run.end_rowid:
+            end = min(run.end_rowid, run.next_rowid + RUN_READ_SIZE - 1)
+            run.buffer.extend(self._connect().execute(
+                'SELECT sort_key, sequence, url, depth, hint_media, hint_context, version, source '
+                'FROM frontier WHERE id BETWEEN ? AND ? ORDER BY id', (run.next_rowid, end)
+            ))
+            run.next_rowid = end + 1
+
+        return run.buffer[0] if run.buffer else None
+
+    def take(self, limit: int) -> List[SpillRow]:
+
+        heads = []
+        for index, run in enumerate(self.runs):
+            head = self._head(run)
+            if head is not None:
+                heads.append((head[0], head[1], index))
+
+        heapq.heapify(heads)
+        rows = []
+
+        while heads and len(rows) < limit:
+            _, _, index = heapq.heappop(heads)
+            run = self.runs[index]
+            rows.append(run.buffer.popleft())
+
+            head = self._head(run)
+            if head is not None:
+                heapq.heappush(heads, (head[0], head[1], index))
+
+        self.runs = [run for run in self.runs if run.buffer or run.next_rowid <= run.end_rowid]
+        self.count -= len(rows)
+        self.rows_loaded += len(rows)
+
+        if not self.runs:
+            self._truncate()
+
+        return rows
+
+    def peek_key(self) -> Optional[Tuple[float, int]]:
+
+        best = None
+
+        for run in self.runs:
+            head = self._head(run)
+            if head is not None and (best is None or (head[0], head[1]) < best):
+                best = (head[0], head[1])
+
+        return best
+
+    def _truncate(self) -> None:
+
+        if self.connection is not None:
+            self.connection.execute('DELETE FROM frontier')
+            self.connection.commit()
+
+        self.next_rowid = 1
+
+    def clear(self) -> None:
+
+        self.close()
+        self.runs = []
+        self.next_rowid = 1
+        self.count = 0
+
+    def close(self) -> None:
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+        if self.db_path:
+            try:
+                os.remove(self.db_path)
+            except OSError as e:
+                logger.debug(f"Error removing frontier spill file {self.db_path}: {e}")
+            self.db_path = None
+
+    def __len__(self) -> int:
+
+        return self.count
@@ -0,0 +1,68 @@
+import logging
+
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from app.config import (
+    MEDIA_EXTENSIONS, STREAM_MANIFEST_EXTENSIONS, NON_PAGE_EXTENSIONS, PAGE_LINK_TAGS,
+    PAGE_CONTENT_TYPES, FOLLOW_JSON_LINKS
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE = 'page'
+MEDIA = 'media'
+ASSET = 'asset'
+
+class LinkClassifier:
+
+    def __init__(self, follow_json: bool = FOLLOW_JSON_LINKS):
+
+        self.follow_json = follow_json
+
+        self.media_extensions = set()
+        for extensions in MEDIA_EXTENSIONS.values():
+            self.media_extensions.update(extensions)
+        self.media_extensions.update(STREAM_MANIFEST_EXTENSIONS)
+
+        self.non_page_extensions = set(NON_PAGE_EXTENSIONS)
+        self.page_tags = set(PAGE_LINK_TAGS)
+
+    def classify(self, url: str, tag_name: Optional[str] = None) -> str:
+
+        suffix = self._get_suffix(url)
+
+        if suffix in self.media_extensions:
+            return MEDIA
+
+        if suffix == '.json':
+            return PAGE if self.follow_json else ASSET
+
+        if suffix in self.non_page_extensions:
+            return ASSET
+
+        if tag_name is None or tag_name in self.page_tags:
+            return PAGE
+
+        return ASSET
+
+    def is_page_url(self, url: str, tag_name: Optional[str] = None) -> bool:
+
+        return self.classify(url, tag_name) == PAGE
+
+    def is_page_content_type(self, content_type: str) -> bool:
+
+        if not content_type:
+            return False
+
+        content_type = content_type.lower()
+        return any(page_type in content_type for page_type in PAGE_CONTENT_TYPES)
+
+    def _get_suffix(self, url: str) -> str:
+
+        try:
+            return Path(urlparse(url).path.lower()).suffix
+        except Exception as e:
+            logger.debug(f"Error reading extension of {url}: {e}")
+            return ''
\ No newline at end of file
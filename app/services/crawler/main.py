@@ -1,22 +1,35 @@
+import os
+import asyncio
 import logging
 import aiohttp
 
-from typing import Tuple, List, Set, Dict, Optional
+from typing import Any, Tuple, List, Set, Dict, Optional
 from datetime import datetime
 
-from app.config import USER_AGENT, MAX_CRAWL_DEPTH
+from app.config import USER_AGENT, MAX_CRAWL_DEPTH, WARC_RECORD, WARC_REPLAY_PATH, CRAWL_WORKERS, CONNECTION_PREWARM
 from app.models.crawler import CrawlStats, CrawlSession
 from app.services.cache import CacheManager
 from app.services.crawler.url_utils import UrlUtils
 from app.services.crawler.crawl_engine import CrawlEngine
+from app.services.crawler.sharded import ShardedCrawl
+from app.services.crawler.scope import ScopeRules
+from app.services.crawler.crawl_graph import CrawlGraph
 from app.services.crawler.stats_manager import StatsManager
 from app.services.crawler.session_manager import CrawlSessionManager
+from app.utils.http.warc import WarcWriter
+from app.utils.http.recording import RecordingSession, ReplaySession
+from app.utils.http.prewarm import ConnectionPrewarmer
+from app.utils.memory import MemoryBudgetExceeded
 
 logger = logging.getLogger(__name__)
 
 class Crawler:
 
-    def __init__(self, session_id: Optional[str] = None):
+    def __init__(self,
+                 session_id: Optional[str] = None,
+                 record: bool = WARC_RECORD,
+                 replay_path: Optional[str] = WARC_REPLAY_PATH,
+                 workers: int = CRAWL_WORKERS):
 
         self.cache_manager = CacheManager()
         self.session_manager = CrawlSessionManager(self.cache_manager)
@@ -24,9 +37,15 @@ class Crawler:
         self.url_utils = UrlUtils()
 
         self.session_id = session_id
+        self.record = record
+        self.replay_path = replay_path
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
 
         self.session = None
         self.crawl_engine = None
+        self.prewarmer: Optional[ConnectionPrewarmer] = None
+        self.engine_stats: Optional[Dict[str, Any]] = None
+        self.crawl_graph: Optional[CrawlGraph] = None
 
         self.original_url = None
 
@@ -38,30 +57,58 @@ class Crawler:
 
     async def _create_http_session(self, headers: Dict[str, str]) -> None:
 
+        if self.replay_path:
+            logger.info(f"Replaying crawl from {self.replay_path}")
+            self.session = ReplaySession.from_path(self.replay_path)
+            self.crawl_engine = CrawlEngine(self.session, hedge=False, redirects=False, profiles=False, memo=False)
+            return
+
         try:
 
-            self.session = aiohttp.ClientSession(
-                headers=headers,
-                connector=aiohttp.TCPConnector(ssl=False)
-            )
-            self.crawl_engine = CrawlEngine(self.session)
+            if CONNECTION_PREWARM:
+                self.prewarmer = ConnectionPrewarmer()
+                self.session = self.prewarmer.create_session(headers, ssl=False)
+            else:
+                self.session = aiohttp.ClientSession(
+                    headers=headers,
+                    connector=aiohttp.TCPConnector(ssl=False)
+                )
         except Exception as e:
             logger.error(f"Error creating HTTP session: {e}")
 
+            self.prewarmer = None
             self.session = aiohttp.ClientSession(headers=headers)
-            self.crawl_engine = CrawlEngine(self.session)
+
+        if self.record and self.session_id:
+            warc_dir = self.cache_manager.get_warc_dir(self.session_id)
+            self.session = RecordingSession(self.session, WarcWriter(warc_dir, 'crawl'))
+            self.crawl_engine = CrawlEngine(self.session, hedge=False, prewarmer=self.prewarmer, redirects=False, profiles=False)
+            return
+
+        self.crawl_engine = CrawlEngine(self.session, prewarmer=self.prewarmer)
 
     async def close(self) -> None:
 
+        if self.crawl_engine:
+            self.crawl_engine.close()
+
+        if self.prewarmer:
+            await self.prewarmer.close()
+            self.prewarmer = None
+
         if self.session:
             await self.session.close()
             self.session = None
             self.crawl_engine = None
 
-    async def crawl(self, url: str, max_depth: int = MAX_CRAWL_DEPTH) -> Tuple[CrawlStats, List[str]]:
+    async def crawl(self,
+                    url: str,
+                    max_depth: int = MAX_CRAWL_DEPTH,
+                    scope: Optional[ScopeRules] = None) -> Tuple[CrawlStats, List[str]]:
 
-        await self.init_session()
         self.stats_manager.reset()
+        self.engine_stats = None
+        self.crawl_graph = None
 
         try:
 
@@ -71,10 +118,15 @@ class Crawler:
 
             crawl_session = self._setup_crawl_session(url, max_depth)
 
+            await self.init_session()
+
             logger.info(f"Starting crawl for {url} with max depth {max_depth}")
-            media_urls = await self._perform_crawl(url, max_depth)
+            media_urls = await self._perform_crawl(url, max_depth, scope)
 
             return self._finalize_crawl(crawl_session, media_urls)
+        except MemoryBudgetExceeded as e:
+            self._handle_crawl_error(url, e)
+            raise
         except Exception as e:
             return self._handle_crawl_error(url, e)
         finally:
@@ -107,15 +159,52 @@ class Crawler:
             logger.error(f"Error setting up crawl session: {e}")
             return None
 
-    async def _perform_crawl(self, url: str, max_depth: int) -> Set[str]:
+    async def _perform_crawl(self, url: str, max_depth: int, scope: Optional[ScopeRules] = None) -> Set[str]:
+
+        if self._should_shard():
+            sharded_crawl = ShardedCrawl(self.workers)
+            loop = asyncio.get_running_loop()
+            media_urls, self.engine_stats = await loop.run_in_executor(None, sharded_crawl.run, url, max_depth, scope)
+            self.crawl_graph = sharded_crawl.crawl_graph
+            return media_urls
+
+        media_urls = await self.crawl_engine.crawl(url, max_depth, scope)
+        self.crawl_graph = self.crawl_engine.crawl_graph
+        return media_urls
+
+    def _should_shard(self) -> bool:
+
+        if self.workers <= 1:
+            return False
 
-        return await self.crawl_engine.crawl(url, max_depth)
+        if self.replay_path or self.record:
+            logger.info("Recording and replay run in a single process, ignoring CRAWL_WORKERS")
+            return False
+
+        return True
 
     def _finalize_crawl(self, crawl_session: Optional[CrawlSession], media_urls: Set[str]) -> Tuple[CrawlStats, List[str]]:
 
         self.stats_manager.finalize()
+
+        engine_stats = self.engine_stats
+        if engine_stats is None and self.crawl_engine:
+            engine_stats = self.crawl_engine.get_engine_stats()
+
+        if engine_stats:
+            self.stats_manager.update_extraction_stats(engine_stats['extraction'])
+            self.stats_manager.update_latency_stats(engine_stats['latency'])
+            self.stats_manager.update_stylesheet_stats(engine_stats['stylesheets'])
+            self.stats_manager.update_feed_stats(engine_stats['feeds'])
+            self.stats_manager.update_prewarm_stats(engine_stats['prewarm'])
+            self.stats_manager.update_redirect_stats(engine_stats['redirects'])
+            self.stats_manager.update_scope_stats(engine_stats['scope'])
+            self.stats_manager.update_memory_stats(engine_stats['memory'])
+
         stats = self.stats_manager.get_stats()
 
+        self._save_crawl_graph()
+
         self.session_manager.mark_session_completed(
             self.session_id,
             stats.total_pages,
@@ -133,6 +222,16 @@ class Crawler:
         logger.info(f"Crawling completed for {url_to_log}. Found {len(media_urls_list)} media URLs.")
         return stats, media_urls_list
 
+    def _save_crawl_graph(self) -> None:
+
+        if self.crawl_graph is None or not self.session_id:
+            return
+
+        try:
+            self.crawl_graph.save(self.cache_manager.get_crawl_graph_path(self.session_id))
+        except Exception as e:
+            logger.error(f"Error saving crawl graph: {e}")
+
     def _handle_crawl_error(self, url: str, error: Exception) -> Tuple[CrawlStats, List[str]]:
 
         logger.error(f"Error crawling {url}: {error}")
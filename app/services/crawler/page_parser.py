@@ -1,49 +1,134 @@
 import logging
 import re
 import json
-from typing import Set, Dict, Any, List, Optional
+from typing import Set, Dict, Any, List, Optional, Tuple
 from bs4 import BeautifulSoup, Tag
 
 from app.services.crawler.url_utils import UrlUtils
-from app.config import URL_KEYS, MEDIA_KEYS, SKIP_JSON_KEYS, URL_MEDIA_ATTRIBUTES
+from app.services.crawler.link_classifier import LinkClassifier
+from app.services.crawler.fast_extractor import FastExtractor
+from app.utils.http.response import parse_html, sniff_html_encoding
+from app.config import (
+    URL_KEYS, MEDIA_KEYS, SKIP_JSON_KEYS, URL_MEDIA_ATTRIBUTES, TWO_TIER_EXTRACTION, FEED_CONTENT_TYPES
+)
 
 logger = logging.getLogger(__name__)
 
 class PageParser:
 
-    def __init__(self):
+    def __init__(self, two_tier: bool = TWO_TIER_EXTRACTION):
 
         self.url_utils = UrlUtils()
+        self.link_classifier = LinkClassifier()
+        self.fast_extractor = FastExtractor(self) if two_tier else None
+        self.tier_counts = {'fast': 0, 'dom': 0}
 
         self.css_url_regex = re.compile(r'url\([\'"]?([^\'"()]+)[\'"]?\)')
-
-    def extract_links(self, soup: BeautifulSoup, base_url: str) -> Set[str]:
+        self.css_import_regex = re.compile(r'@import\s+(?:url\(\s*)?[\'"]?([^\'"()\s;]+)', re.IGNORECASE)
+        self.css_comment_regex = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+    def extract_from_html(self,
+                          body: bytes,
+                          base_url: str,
+                          content_type: str = '',
+                          link_context: Optional[Dict[str, str]] = None,
+                          stylesheets: Optional[Set[str]] = None,
+                          feeds: Optional[Set[str]] = None) -> Optional[Tuple[Set[str], Set[str]]]:
+
+        if self.fast_extractor is not None and self.fast_extractor.prescan(body):
+            encoding = sniff_html_encoding(body, content_type)
+            links = self.fast_extractor.extract_links(body, encoding, base_url, link_context, stylesheets, feeds)
+
+            if links is not None:
+                self.tier_counts['fast'] += 1
+                return links, set()
+
+        soup = parse_html(body, content_type)
+        if soup is None:
+            return None
+
+        self.tier_counts['dom'] += 1
+        return self.extract_links(soup, base_url, link_context, stylesheets, feeds), self.extract_media_urls(soup, base_url)
+
+    def extract_links(self,
+                      soup: BeautifulSoup,
+                      base_url: str,
+                      link_context: Optional[Dict[str, str]] = None,
+                      stylesheets: Optional[Set[str]] = None,
+                      feeds: Optional[Set[str]] = None) -> Set[str]:
 
         links = set()
 
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href'].strip()
-            if href and not href.startswith(('javascript:', 'mailto:', 'tel:', '#')):
-                absolute_url = self.url_utils.build_absolute_url(base_url, href)
-                if absolute_url:
-                    links.add(absolute_url)
+        for tag in soup.find_all(['a', 'area'], href=True):
+            absolute_url = self._add_page_link(tag['href'], tag.name, base_url, links)
+            if absolute_url and link_context is not None:
+                self._record_link_context(tag, absolute_url, link_context)
 
-        for tag in soup.find_all(attrs={'src': True}):
-            src = tag['src'].strip()
-            absolute_url = self.url_utils.build_absolute_url(base_url, src)
-            if absolute_url:
-                links.add(absolute_url)
+        for tag in soup.find_all(['frame', 'iframe'], src=True):
+            self._add_page_link(tag['src'], tag.name, base_url, links)
 
-        for style_tag in soup.find_all('style'):
-            if style_tag.string:
-                css_urls = self.css_url_regex.findall(style_tag.string)
-                for css_url in css_urls:
-                    absolute_url = self.url_utils.build_absolute_url(base_url, css_url)
-                    if absolute_url:
-                        links.add(absolute_url)
+        for link_tag in soup.find_all('link', href=True):
+            rel = [value.lower() for value in link_tag.get('rel') or []]
+            link_type = (link_tag.get('type') or '').lower()
+
+            if 'next' in rel:
+                absolute_url = self._add_page_link(link_tag['href'], 'a', base_url, links)
+                if absolute_url and link_context is not None:
+                    link_context[absolute_url] = f"{link_context.get(absolute_url, '')} rel:next".strip()
+            elif 'json' in link_type and self.link_classifier.follow_json:
+                self._add_page_link(link_tag['href'], 'a', base_url, links)
+
+            if 'stylesheet' in rel and stylesheets is not None:
+                self._add_resource(link_tag['href'], base_url, stylesheets)
+            elif self.is_feed_link(rel, link_type) and feeds is not None:
+                self._add_resource(link_tag['href'], base_url, feeds)
 
         return links
 
+    @staticmethod
+    def is_feed_link(rel: List[str], link_type: str) -> bool:
+
+        return 'alternate' in rel and link_type.split(';')[0].strip() in FEED_CONTENT_TYPES
+
+    def _add_resource(self, href: str, base_url: str, resources: Set[str]) -> None:
+
+        href = href.strip()
+        if not href or href.startswith(('javascript:', 'data:', '#')):
+            return
+
+        absolute_url = self.url_utils.build_absolute_url(base_url, href)
+        if absolute_url:
+            resources.add(absolute_url)
+
+    def _add_page_link(self, href: str, tag_name: str, base_url: str, links: Set[str]) -> Optional[str]:
+
+        href = href.strip()
+        if not href or href.startswith(('javascript:', 'mailto:', 'tel:', 'data:', '#')):
+            return None
+
+        absolute_url = self.url_utils.build_absolute_url(base_url, href)
+        if absolute_url and self.link_classifier.is_page_url(absolute_url, tag_name):
+            links.add(absolute_url)
+            return absolute_url
+
+        return None
+
+    def _record_link_context(self, tag: Tag, absolute_url: str, link_context: Dict[str, str]) -> None:
+
+        parts = [tag.get_text(' ', strip=True), tag.get('title', ''), tag.get('aria-label', '')]
+
+        rel = [value.lower() for value in tag.get('rel') or []]
+        if 'next' in rel:
+            parts.append('rel:next')
+
+        if tag.find('img') is not None:
+            parts.append('has:img')
+
+        context = ' '.join(part for part in parts if part)[:200]
+        if context:
+            existing = link_context.get(absolute_url)
+            link_context[absolute_url] = (f"{existing} {context}" if existing else context)[:400]
+
     def extract_media_urls(self, soup: BeautifulSoup, base_url: str) -> Set[str]:
 
         media_urls = set()
@@ -88,6 +173,13 @@ class PageParser:
                 if absolute_url:
                     media_urls.add(absolute_url)
 
+        for embed_tag in soup.find_all(['iframe', 'frame', 'embed'], src=True):
+            src = embed_tag['src'].strip()
+            if src and self.url_utils.is_media_url(src):
+                absolute_url = self.url_utils.build_absolute_url(base_url, src)
+                if absolute_url:
+                    media_urls.add(absolute_url)
+
         for tag in soup.find_all(style=True):
             style = tag['style']
             urls = self.css_url_regex.findall(style)
@@ -107,6 +199,30 @@ class PageParser:
 
         return media_urls
 
+    def extract_css_media(self, css_text: str, css_url: str) -> Tuple[Set[str], Set[str]]:
+
+        media_urls = set()
+        imports = set()
+
+        css_text = self.css_comment_regex.sub(' ', css_text)
+
+        for href in self.css_import_regex.findall(css_text):
+            self._add_resource(href, css_url, imports)
+
+        for css_url_value in self.css_url_regex.findall(css_text):
+            css_url_value = css_url_value.strip()
+            if not css_url_value or css_url_value.startswith('data:'):
+                continue
+
+            absolute_url = self.url_utils.build_absolute_url(css_url, css_url_value)
+            if not absolute_url:
+                continue
+
+            if self.url_utils.is_media_url(absolute_url):
+                media_urls.add(absolute_url)
+
+        return media_urls, imports
+
     def extract_media_from_json(self, data: Any, base_url: str) -> Set[str]:
 
         media_urls = set()
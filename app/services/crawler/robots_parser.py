@@ -1,20 +1,22 @@
+import asyncio
 import aiohttp
 import logging
 
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 from urllib.parse import urlparse
-from urllib.robotparser import RobotFileParser
 
 from app.config import USER_AGENT, RESPECT_ROBOTS_TXT
+from app.services.crawler.robots_rules import RobotsRules
 
 logger = logging.getLogger(__name__)
 
 class RobotsParser:
 
-    def __init__(self, session: aiohttp.ClientSession):
+    def __init__(self, session: aiohttp.ClientSession, host_profiles: Any = None):
 
         self.session = session
-        self.robots_cache: Dict[str, RobotFileParser] = {}
+        self.host_profiles = host_profiles
+        self.robots_cache: Dict[str, RobotsRules] = {}
 
     async def is_allowed(self, url: str) -> bool:
 
@@ -25,45 +27,78 @@ class RobotsParser:
 
             parsed = urlparse(url)
 
-            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+            rules = await self._get_robots_rules(self.get_robots_url(url))
 
-            parser = await self._get_robots_parser(robots_url)
+            path = parsed.path or '/'
+            if parsed.query:
+                path = f"{path}?{parsed.query}"
 
-            if parser:
-                return parser.can_fetch(USER_AGENT, url)
-
-            return True
+            return rules.is_allowed(path)
         except Exception as e:
             logger.warning(f"Error checking robots.txt for {url}: {e}")
 
             return True
 
-    async def _get_robots_parser(self, robots_url: str) -> Optional[RobotFileParser]:
+    @staticmethod
+    def get_robots_url(url: str) -> str:
+
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    async def get_rules(self, url: str) -> RobotsRules:
+
+        return await self._get_robots_rules(self.get_robots_url(url))
+
+    def seed(self, robots_cache: Dict[str, RobotsRules]) -> None:
+
+        self.robots_cache.update(robots_cache)
+
+    async def _get_robots_rules(self, robots_url: str) -> RobotsRules:
 
         if robots_url in self.robots_cache:
             return self.robots_cache[robots_url]
 
-        try:
-            parser = RobotFileParser(robots_url)
+        host = urlparse(robots_url).netloc.lower()
+        stored = None
+
+        if self.host_profiles is not None:
+            hosts = self.host_profiles.get_unloaded_hosts([robots_url])
+            if hosts:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.host_profiles.load_hosts, hosts)
 
+            stored = self.host_profiles.get_robots(host)
+
+        if stored is not None:
+            logger.debug(f"Using stored robots.txt for {host}")
+            rules = self._compile(robots_url, *stored)
+        else:
+            rules = await self._fetch_robots_rules(robots_url, host)
+
+        self.robots_cache[robots_url] = rules
+        return rules
+
+    async def _fetch_robots_rules(self, robots_url: str, host: str) -> RobotsRules:
+
+        try:
             async with self.session.get(robots_url, timeout=10) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    parser.parse(content.splitlines())
-                    self.robots_cache[robots_url] = parser
-                    return parser
-                else:
-
-                    logger.debug(f"No robots.txt found at {robots_url} (status: {response.status})")
-
-                    empty_parser = RobotFileParser()
-                    empty_parser.parse([])
-                    self.robots_cache[robots_url] = empty_parser
-                    return empty_parser
+                content = await response.text() if response.status == 200 else None
+
+                if self.host_profiles is not None and response.status < 500:
+                    self.host_profiles.record_robots(host, content, response.status)
+
+                return self._compile(robots_url, content, response.status)
         except Exception as e:
             logger.warning(f"Error fetching robots.txt from {robots_url}: {e}")
+            return RobotsRules.allow_all()
+
+    @staticmethod
+    def _compile(robots_url: str, content: Optional[str], status: int) -> RobotsRules:
+
+        if status == 200 and content is not None:
+            rules = RobotsRules.parse(content.splitlines(), USER_AGENT)
+            logger.debug(f"Compiled {rules.rule_count} robots.txt rules from {robots_url}")
+            return rules
 
-            empty_parser = RobotFileParser()
-            empty_parser.parse([])
-            self.robots_cache[robots_url] = empty_parser
-            return empty_parser
\ No newline at end of file
+        logger.debug(f"No robots.txt found at {robots_url} (status: {status})")
+        return RobotsRules.allow_all()
@@ -0,0 +1,189 @@
+import re
+import logging
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+PATH_SAFE_CHARACTERS = "/?#[]@!$&'()*+,;=:-._~%"
+PERCENT_ESCAPE_REGEX = re.compile(r'%[0-9a-fA-F]{2}')
+
+def normalize_robots_path(path: str) -> str:
+
+    if not path.startswith('/'):
+        path = '/' + path
+
+    path = quote(path, safe=PATH_SAFE_CHARACTERS)
+    return PERCENT_ESCAPE_REGEX.sub(lambda match: match.group(0).upper(), path)
+
+def get_product_token(user_agent: str) -> str:
+
+    return user_agent.split('/', 1)[0].split()[0].lower() if user_agent.strip() else '*'
+
+class _TrieNode:
+
+    __slots__ = ('children', 'rule', 'patterns', 'decision')
+
+    def __init__(self):
+
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.rule: Optional[Tuple[int, bool]] = None
+        self.patterns: List[Tuple[int, bool, re.Pattern]] = []
+        self.decision: Optional[bool] = None
+
+class RobotsRules:
+
+    MEMO_SIZE = 4096
+
+    def __init__(self, rules: Iterable[Tuple[bool, str]] = ()):
+
+        self.root = _TrieNode()
+        self.rule_count = 0
+        self.wildcard_count = 0
+
+        self.memo: OrderedDict[str, bool] = OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+        for allow, pattern in rules:
+            self._add_rule(allow, pattern)
+
+    @classmethod
+    def parse(cls, lines: Iterable[str], user_agent: str) -> 'RobotsRules':
+
+        token = get_product_token(user_agent)
+        groups: List[Tuple[List[str], List[Tuple[bool, str]]]] = []
+        agents: List[str] = []
+        rules: List[Tuple[bool, str]] = []
+        in_rules = False
+
+        for line in lines:
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+
+            field, value = line.split(':', 1)
+            field = field.strip().lower()
+            value = value.strip()
+
+            if field in ('user-agent', 'useragent'):
+                if in_rules:
+                    groups.append((agents, rules))
+                    agents, rules, in_rules = [], [], False
+                agents.append(value.lower())
+            elif field in ('allow', 'disallow'):
+                in_rules = True
+                if agents and value:
+                    rules.append((field == 'allow', value))
+
+        if agents:
+            groups.append((agents, rules))
+
+        selected = [group_rules for group_agents, group_rules in groups if token in group_agents]
+        if not selected:
+            selected = [group_rules for group_agents, group_rules in groups if '*' in group_agents]
+
+        return cls(rule for group_rules in selected for rule in group_rules)
+
+    @classmethod
+    def allow_all(cls) -> 'RobotsRules':
+
+        return cls()
+
+    def _add_rule(self, allow: bool, pattern: str) -> None:
+
+        pattern = normalize_robots_path(pattern)
+        length = len(pattern)
+        literal = pattern.rstrip('*')
+        prefix = re.split(r'[*$]', literal, 1)[0]
+
+        self.rule_count += 1
+
+        node = self.root
+        for character in prefix:
+            node = node.children.setdefault(character, _TrieNode())
+
+        if prefix != literal:
+            self.wildcard_count += 1
+            node.patterns.append((length, allow, self._compile_pattern(pattern)))
+        elif node.rule is None or self._is_better(length, allow, node.rule):
+            node.rule = (length, allow)
+
+    @staticmethod
+    def _compile_pattern(pattern: str) -> re.Pattern:
+
+        anchored = pattern.endswith('$')
+        if anchored:
+            pattern = pattern[:-1]
+
+        expression = '.*'.join(re.escape(part) for part in pattern.split('*'))
+        return re.compile(expression + ('$' if anchored else ''), re.DOTALL)
+
+    @staticmethod
+    def _is_better(length: int, allow: bool, current: Tuple[int, bool]) -> bool:
+
+        return length > current[0] or (length == current[0] and allow and not current[1])
+
+    def is_allowed(self, path: str) -> bool:
+
+        if self.rule_count == 0:
+            return True
+
+        memoized = self.memo.get(path)
+        if memoized is not None:
+            self.memo.move_to_end(path)
+            self.memo_hits += 1
+            return memoized
+
+        normalized = normalize_robots_path(path)
+        if normalized == '/robots.txt':
+            return True
+
+        best: Optional[Tuple[int, bool]] = None
+        patterns = list(self.root.patterns)
+
+        deepest = node = self.root
+        for character in normalized:
+            node = node.children.get(character)
+            if node is None:
+                break
+            deepest = node
+            if node.rule is not None and (best is None or self._is_better(*node.rule, best)):
+                best = node.rule
+            if node.patterns:
+                patterns.extend(node.patterns)
+
+        # Without wildcard rules on the way, every path ending at the same node gets the same answer
+        if not patterns:
+            if deepest.decision is not None:
+                self.memo_hits += 1
+                return deepest.decision
+
+            self.memo_misses += 1
+            deepest.decision = best is None or best[1]
+            return deepest.decision
+
+        self.memo_misses += 1
+
+        for length, allow, regex in patterns:
+            if (best is None or self._is_better(length, allow, best)) and regex.match(normalized):
+                best = (length, allow)
+
+        decision = best is None or best[1]
+
+        self.memo[path] = decision
+        if len(self.memo) > self.MEMO_SIZE:
+            self.memo.popitem(last=False)
+
+        return decision
+
+    def get_stats(self) -> Dict[str, int]:
+
+        return {
+            'rules': self.rule_count,
+            'wildcard_rules': self.wildcard_count,
+            'memo_hits': self.memo_hits,
+            'memo_misses': self.memo_misses,
+        }
@@ -0,0 +1,207 @@
+import re
+import logging
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from app.config import CRAWL_SCOPE_INCLUDE, CRAWL_SCOPE_EXCLUDE
+
+logger = logging.getLogger(__name__)
+
+RULE_KINDS = ('domain', 'host', 'path', 'regex', 'query')
+OUT_OF_SCOPE = 'out_of_scope'
+
+SCHEME = r'[a-zA-Z][a-zA-Z0-9+.\-]*://'
+USERINFO = r'(?:[^/?#@\n]*@)?'
+HOST_END = r'(?=[/?#\n]|$)'
+BACKREFERENCE_REGEX = re.compile(r'\\[1-9]|\(\?P=')
+NAMED_GROUP_REGEX = re.compile(r'\(\?P?<(?![=!])')
+
+class ScopeError(ValueError):
+    pass
+
+def _host_pattern(host: str) -> str:
+
+    port = '' if ':' in host else r'(?::\d+)?'
+    return f"(?i:{re.escape(host)}){port}"
+
+def _compile_rule(kind: str, value: str, host: Optional[str] = None) -> str:
+
+    if kind == 'domain':
+        return SCHEME + USERINFO + r'(?:[^/?#@\n]*\.)?' + _host_pattern(value.lstrip('.')) + HOST_END
+
+    if kind == 'host':
+        return SCHEME + USERINFO + _host_pattern(value) + HOST_END
+
+    if kind == 'path':
+        authority = USERINFO + _host_pattern(host) if host else r'[^/?#\n]*'
+        return SCHEME + authority + re.escape(value)
+
+    if kind == 'query':
+        return r'[^?#\n]*\?(?:[^#\n]*&)?' + re.escape(value) + r'(?=[=&#\n]|$)'
+
+    return r'[^\n]*?(?:' + value + ')'
+
+class ScopeRules:
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+
+        self.include = [self.parse_rule(rule) for rule in include if rule.strip()]
+        self.exclude = [self.parse_rule(rule) for rule in exclude if rule.strip()]
+
+    @staticmethod
+    def parse_rule(rule: str) -> Tuple[str, str]:
+
+        if not isinstance(rule, str) or ':' not in rule:
+            raise ScopeError(f"Invalid scope rule {rule!r}: expected '<kind>:<value>'")
+
+        kind, value = rule.strip().split(':', 1)
+        kind = kind.strip().lower()
+
+        if kind not in RULE_KINDS:
+            raise ScopeError(f"Unknown scope rule kind {kind!r}: expected one of {', '.join(RULE_KINDS)}")
+
+        if kind != 'regex':
+            value = value.strip()
+
+        if not value:
+            raise ScopeError(f"Empty value in scope rule {rule!r}")
+
+        if kind == 'path' and not value.startswith('/'):
+            raise ScopeError(f"Path scope rule {rule!r} must start with '/'")
+
+        if kind == 'regex':
+            if BACKREFERENCE_REGEX.search(value):
+                raise ScopeError(f"Backreferences are not supported in scope rule {rule!r}")
+            if NAMED_GROUP_REGEX.search(value):
+                raise ScopeError(f"Named groups are not supported in scope rule {rule!r}")
+            try:
+                # Compiled the way the matcher embeds it, so e.g. global inline flags are rejected here
+                re.compile(f"^(?:({_compile_rule(kind, value)}))", re.MULTILINE)
+            except re.error as e:
+                raise ScopeError(f"Invalid regex in scope rule {rule!r}: {e}")
+
+        return kind, value
+
+    @classmethod
+    def from_settings(cls) -> 'ScopeRules':
+
+        return cls(CRAWL_SCOPE_INCLUDE, CRAWL_SCOPE_EXCLUDE)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ScopeRules':
+
+        if not data:
+            return cls.from_settings()
+
+        if not isinstance(data, dict):
+            raise ScopeError("Scope must be an object with 'include' and 'exclude' rule lists")
+
+        include = data.get('include', CRAWL_SCOPE_INCLUDE)
+        exclude = data.get('exclude', CRAWL_SCOPE_EXCLUDE)
+
+        for rules in (include, exclude):
+            if not isinstance(rules, list):
+                raise ScopeError("Scope 'include' and 'exclude' must be lists of rules")
+
+        return cls(include, exclude)
+
+    def to_dict(self) -> Dict[str, List[str]]:
+
+        return {
+            'include': [f"{kind}:{value}" for kind, value in self.include],
+            'exclude': [f"{kind}:{value}" for kind, value in self.exclude],
+        }
+
+    def spans_hosts(self, base_url: str) -> bool:
+
+        # Path rules are bound to the base host; domain, query and regex rules can match any number of hosts
+        base_host = urlsplit(base_url).netloc.lower()
+        hosts = set()
+
+        for kind, value in self.include or [('host', base_host)]:
+            if kind in ('domain', 'query', 'regex'):
+                return True
+            hosts.add(value.lower() if kind == 'host' else base_host)
+
+        return len(hosts) > 1
+
+    def compile(self, base_url: str) -> 'ScopeMatcher':
+
+        base_host = urlsplit(base_url).netloc
+        include = self.include or [('host', base_host)]
+        return ScopeMatcher(include, self.exclude, base_host)
+
+class ScopeMatcher:
+
+    def __init__(self, include: List[Tuple[str, str]], exclude: List[Tuple[str, str]], base_host: Optional[str] = None):
+
+        alternatives = []
+        self.group_rules: Dict[int, Optional[str]] = {}
+        group = 1
+
+        for action, rules in (('exclude', exclude), ('include', include)):
+            for kind, value in rules:
+                fragment = _compile_rule(kind, value, base_host if action == 'include' else None)
+                self.group_rules[group] = f"{action} {kind}:{value}" if action == 'exclude' else None
+                alternatives.append(f"({fragment})")
+                group += 1 + re.compile(fragment, re.MULTILINE).groups
+
+        try:
+            self.pattern = re.compile('^(?:' + '|'.join(alternatives) + ')', re.MULTILINE)
+        except re.error as e:
+            raise ScopeError(f"Scope rules could not be combined: {e}")
+
+        self.checked = 0
+        self.kept = 0
+        self.drops: Counter = Counter()
+
+    def _reason(self, match: Optional[re.Match]) -> Optional[str]:
+
+        if match is None:
+            return OUT_OF_SCOPE
+        return self.group_rules[match.lastindex]
+
+    def check(self, url: str) -> Optional[str]:
+
+        if '\n' in url:
+            return OUT_OF_SCOPE
+        return self._reason(self.pattern.match(url))
+
+    def allows(self, url: str) -> bool:
+
+        reason = self.check(url)
+        self._count(reason)
+        return reason is None
+
+    def filter(self, urls: Iterable[str]) -> Set[str]:
+
+        candidates = [url for url in urls if '\n' not in url]
+        group_rules = self.group_rules
+        kept = set()
+
+        for url, match in zip(candidates, map(self.pattern.match, candidates)):
+            reason = group_rules[match.lastindex] if match is not None else OUT_OF_SCOPE
+            if reason is None:
+                kept.add(url)
+            else:
+                self.drops[reason] += 1
+
+        self.checked += len(candidates)
+        self.kept += len(kept)
+
+        return kept
+
+    def _count(self, reason: Optional[str]) -> None:
+
+        self.checked += 1
+
+        if reason is None:
+            self.kept += 1
+        else:
+            self.drops[reason] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {'checked': self.checked, 'kept': self.kept, 'dropped': dict(self.drops)}
@@ -0,0 +1,489 @@
+import zlib
+import queue
+import asyncio
+import aiohttp
+import logging
+import multiprocessing
+
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from app.config import (
+    USER_AGENT, MAX_CRAWL_PAGES, MAX_CONCURRENT_REQUESTS, CONNECTION_PREWARM, RESPECT_ROBOTS_TXT, HOST_PROFILES
+)
+from app.models.crawler import CrawlPage
+from app.services.cache.host_profiles import HostProfiles, HostProfileStore
+from app.services.crawler.crawl_engine import CrawlEngine
+from app.services.crawler.crawl_graph import CrawlGraph
+from app.services.crawler.feed_parser import FeedParser
+from app.services.crawler.robots_parser import RobotsParser
+from app.services.crawler.robots_rules import RobotsRules
+from app.services.crawler.scope import ScopeRules
+from app.utils.http.prewarm import ConnectionPrewarmer
+from app.utils.memory import MemoryBudgetExceeded, configure_memory_governor
+
+logger = logging.getLogger(__name__)
+
+IDLE_POLL_INTERVAL = 0.02
+RESULT_POLL_INTERVAL = 1.0
+SHUTDOWN_TIMEOUT = 10
+SENT_CACHE_SIZE = 16384
+
+def shard_for(url: str, shard_count: int, by_host: bool = False) -> int:
+
+    if shard_count <= 1:
+        return 0
+
+    key = urlparse(url).netloc.lower() if by_host else url
+    return zlib.crc32(key.encode('utf-8', errors='replace')) % shard_count
+
+def get_shard_concurrency(shard_id: int, shard_count: int, total: int = MAX_CONCURRENT_REQUESTS) -> int:
+
+    # Shards crawl the same hosts, so they split one request budget instead of each taking it whole
+    share, remainder = divmod(max(1, total), max(1, shard_count))
+    return max(1, share + (1 if shard_id < remainder else 0))
+
+class ShardCrawlEngine(CrawlEngine):
+
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 shard_id: int,
+                 shard_count: int,
+                 inboxes: List[Any],
+                 outstanding: Any,
+                 global_pages: Any,
+                 stop_event: Any,
+                 prewarmer: Optional[ConnectionPrewarmer] = None,
+                 robots_cache: Optional[Dict[str, RobotsRules]] = None,
+                 by_host: bool = False):
+
+        super().__init__(session, prewarmer=prewarmer)
+
+        if self.host_profiles is not None:
+            self.host_profiles.persist = False
+
+        self.semaphore = asyncio.Semaphore(get_shard_concurrency(shard_id, shard_count))
+        if robots_cache:
+            self.robots_parser.seed(robots_cache)
+
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.by_host = by_host
+        self.inboxes = inboxes
+        self.outstanding = outstanding
+        self.global_pages = global_pages
+        self.stop_event = stop_event
+
+        self.outbox: Dict[int, List[Tuple[str, int, Tuple[int, Optional[str]], Optional[str]]]] = defaultdict(list)
+        self.recently_sent: Dict[str, None] = OrderedDict()
+        self.urls_sent = 0
+        self.urls_received = 0
+
+    def _owns(self, url: str) -> bool:
+
+        return shard_for(url, self.shard_count, self.by_host) == self.shard_id
+
+    def _adjust_outstanding(self, delta: int) -> None:
+
+        with self.outstanding.get_lock():
+            self.outstanding.value += delta
+
+    def _initialize_crawl_queue(self, start_url: str) -> None:
+
+        if self._owns(start_url):
+            super()._initialize_crawl_queue(start_url)
+
+    def _enqueue(self, url: str, depth: int, hint: Tuple[int, Optional[str]], source_url: Optional[str] = None) -> None:
+
+        if self._owns(url):
+            self._adjust_outstanding(1)
+            super()._enqueue(url, depth, hint, source_url)
+            return
+
+        if not self._mark_sent(url):
+            return
+
+        self._adjust_outstanding(1)
+        self.outbox[shard_for(url, self.shard_count, self.by_host)].append((url, depth, hint, source_url))
+
+    def _mark_sent(self, url: str) -> bool:
+
+        # Only recent sends are remembered; the owning shard drops anything it already visited
+        if url in self.recently_sent:
+            self.recently_sent.move_to_end(url)
+            return False
+
+        self.recently_sent[url] = None
+        if len(self.recently_sent) > SENT_CACHE_SIZE:
+            self.recently_sent.popitem(last=False)
+
+        return True
+
+    def _send(self) -> None:
+
+        for shard, batch in self.outbox.items():
+            if batch:
+                self.inboxes[shard].put(batch)
+                self.urls_sent += len(batch)
+
+        self.outbox.clear()
+
+    def _receive(self) -> None:
+
+        inbox = self.inboxes[self.shard_id]
+
+        while True:
+            try:
+                batch = inbox.get_nowait()
+            except queue.Empty:
+                return
+
+            self.urls_received += len(batch)
+
+            for url, depth, hint, source_url in batch:
+                if url in self.visited_urls:
+                    self._adjust_outstanding(-1)
+                else:
+                    super()._enqueue(url, depth, tuple(hint), source_url)
+
+    def _schedule_feeds(self, crawl_page: CrawlPage, current_depth: int, max_depth: int) -> int:
+
+        scheduled = super()._schedule_feeds(crawl_page, current_depth, max_depth)
+        self._adjust_outstanding(scheduled)
+        return scheduled
+
+    async def _handle_feed(self, feed: Optional[FeedParser], page_url: str, current_depth: int, max_depth: int) -> None:
+
+        try:
+            await super()._handle_feed(feed, page_url, current_depth, max_depth)
+        finally:
+            self._send()
+            self._adjust_outstanding(-1)
+
+    def _record_page_fetched(self) -> None:
+
+        super()._record_page_fetched()
+
+        with self.global_pages.get_lock():
+            self.global_pages.value += 1
+
+    def _is_budget_exhausted(self) -> bool:
+
+        if self.stop_event.is_set():
+            return True
+
+        return self.max_pages > 0 and self.global_pages.value >= self.max_pages
+
+    async def _process_crawl_queue(self, max_depth: int, base_url: str) -> None:
+
+        while not self._is_budget_exhausted():
+            self._receive()
+
+            if not len(self.frontier):
+                if self.outstanding.value <= 0:
+                    break
+
+                await asyncio.sleep(IDLE_POLL_INTERVAL)
+                continue
+
+            await self.memory_job.wait()
+
+            current_url, current_depth, source_url = self.frontier.pop_entry()
+
+            try:
+                self._record_graph_link(source_url, current_url)
+                await self._process_url(current_url, current_depth, max_depth, base_url)
+            except Exception as e:
+                logger.error(f"Error processing URL in queue: {e}")
+            finally:
+                self._send()
+                self._adjust_outstanding(-1)
+
+    def get_shard_stats(self) -> Dict[str, int]:
+
+        return {
+            'pages': self.pages_fetched,
+            'urls_sent': self.urls_sent,
+            'urls_received': self.urls_received,
+        }
+
+async def _crawl_shard(shard_id: int,
+                       shard_count: int,
+                       url: str,
+                       max_depth: int,
+                       scope: Optional[ScopeRules],
+                       inboxes: List[Any],
+                       outstanding: Any,
+                       global_pages: Any,
+                       stop_event: Any,
+                       robots_cache: Dict[str, RobotsRules],
+                       by_host: bool) -> Dict[str, Any]:
+
+    headers = {'User-Agent': USER_AGENT}
+    prewarmer = ConnectionPrewarmer() if CONNECTION_PREWARM else None
+
+    if prewarmer is not None:
+        session = prewarmer.create_session(headers, ssl=False)
+    else:
+        session = aiohttp.ClientSession(headers=headers, connector=aiohttp.TCPConnector(ssl=False))
+
+    engine = ShardCrawlEngine(
+        session, shard_id, shard_count, inboxes, outstanding, global_pages, stop_event, prewarmer, robots_cache, by_host
+    )
+
+    try:
+        media_urls = await engine.crawl(url, max_depth, scope)
+
+        return {
+            'shard': shard_id,
+            'media': sorted(media_urls),
+            'engine_stats': engine.get_engine_stats(),
+            'shard_stats': engine.get_shard_stats(),
+            'graph': engine.crawl_graph,
+            'host_profiles': engine.host_profiles.get_dirty() if engine.host_profiles is not None else [],
+        }
+    finally:
+        engine.close()
+        if prewarmer is not None:
+            await prewarmer.close()
+        await session.close()
+
+def _run_shard(shard_id: int,
+               shard_count: int,
+               url: str,
+               max_depth: int,
+               scope: Optional[ScopeRules],
+               inboxes: List[Any],
+               results: Any,
+               outstanding: Any,
+               global_pages: Any,
+               stop_event: Any,
+               robots_cache: Dict[str, RobotsRules],
+               by_host: bool,
+               log_level: int) -> None:
+
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    configure_memory_governor(shard_count)
+
+    try:
+        result = asyncio.run(
+            _crawl_shard(shard_id, shard_count, url, max_depth, scope, inboxes, outstanding, global_pages, stop_event,
+                         robots_cache, by_host)
+        )
+    except MemoryBudgetExceeded as e:
+        logger.error(f"Crawl shard {shard_id} stopped: {e}")
+        result = {'shard': shard_id, 'error': str(e), 'memory_exceeded': True}
+    except Exception as e:
+        logger.error(f"Crawl shard {shard_id} failed: {e}")
+        result = {'shard': shard_id, 'error': str(e)}
+
+    results.put(result)
+
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+
+async def _fetch_robots(url: str) -> Dict[str, RobotsRules]:
+
+    if not RESPECT_ROBOTS_TXT:
+        return {}
+
+    host_profiles = HostProfiles() if HOST_PROFILES else None
+
+    try:
+        async with aiohttp.ClientSession(
+            headers={'User-Agent': USER_AGENT}, connector=aiohttp.TCPConnector(ssl=False)
+        ) as session:
+            robots_parser = RobotsParser(session, host_profiles)
+            await robots_parser.get_rules(url)
+    finally:
+        if host_profiles is not None:
+            host_profiles.save()
+            host_profiles.close()
+
+    return robots_parser.robots_cache
+
+class ShardedCrawl:
+
+    def __init__(self, workers: int, max_pages: int = MAX_CRAWL_PAGES):
+
+        self.workers = max(1, workers)
+        self.max_pages = max_pages
+        self.context = multiprocessing.get_context('spawn')
+        self.crawl_graph: Optional[CrawlGraph] = None
+
+    def run(self, url: str, max_depth: int, scope: Optional[ScopeRules] = None) -> Tuple[Set[str], Dict[str, Any]]:
+
+        inboxes = [self.context.Queue() for _ in range(self.workers)]
+        results = self.context.Queue()
+        outstanding = self.context.Value('q', 1)
+        global_pages = self.context.Value('q', 0)
+        stop_event = self.context.Event()
+        robots_cache = asyncio.run(_fetch_robots(url))
+        by_host = (scope or ScopeRules.from_settings()).spans_hosts(url)
+
+        processes = [
+            self.context.Process(
+                target=_run_shard,
+                args=(shard_id, self.workers, url, max_depth, scope, inboxes, results, outstanding, global_pages,
+                      stop_event, robots_cache, by_host, logging.getLogger().getEffectiveLevel()),
+                name=f"crawl-shard-{shard_id}",
+                daemon=True
+            )
+            for shard_id in range(self.workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        logger.info(f"Started {self.workers} crawl shards for {url}, partitioned by {'host' if by_host else 'URL'}")
+
+        try:
+            shard_results = self._collect_results(results, processes, stop_event)
+        finally:
+            stop_event.set()
+            self._shutdown(processes, inboxes + [results])
+
+        save_host_profiles(shard_results)
+
+        for result in shard_results:
+            if result.get('memory_exceeded'):
+                raise MemoryBudgetExceeded(result['error'])
+
+        media_urls: Set[str] = set()
+        for result in shard_results:
+            media_urls.update(result.get('media', []))
+
+        self.crawl_graph = merge_crawl_graphs(shard_results)
+
+        return media_urls, merge_engine_stats(shard_results)
+
+    def _collect_results(self, results: Any, processes: List[Any], stop_event: Any) -> List[Dict[str, Any]]:
+
+        collected: Dict[int, Dict[str, Any]] = {}
+
+        while len(collected) < len(processes):
+            try:
+                result = results.get(timeout=RESULT_POLL_INTERVAL)
+                collected[result['shard']] = result
+
+                if 'error' in result:
+                    stop_event.set()
+                continue
+            except queue.Empty:
+                pass
+
+            for shard_id, process in enumerate(processes):
+                if shard_id not in collected and not process.is_alive() and process.exitcode is not None:
+                    logger.error(f"Crawl shard {shard_id} exited with code {process.exitcode} before reporting")
+                    collected[shard_id] = {'shard': shard_id, 'error': f"exit code {process.exitcode}"}
+                    stop_event.set()
+
+        return [collected[shard_id] for shard_id in sorted(collected)]
+
+    @staticmethod
+    def _shutdown(processes: List[Any], queues: List[Any]) -> None:
+
+        for process in processes:
+            process.join(timeout=SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"Terminating unresponsive crawl shard {process.name}")
+                process.terminate()
+                process.join()
+
+        for shard_queue in queues:
+            shard_queue.cancel_join_thread()
+            shard_queue.close()
+
+def merge_engine_stats(shard_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+    merged: Dict[str, Any] = {
+        'extraction': {'tiers': defaultdict(int), 'memo': defaultdict(int)},
+        'latency': {'requests': 0, 'hedges': 0, 'hedge_wins': 0, 'hosts': {}},
+        'stylesheets': defaultdict(int),
+        'feeds': defaultdict(int),
+        'prewarm': defaultdict(int),
+        'redirects': defaultdict(int),
+        'hosts': defaultdict(int),
+        'scope': defaultdict(int),
+        'memory': defaultdict(int),
+        'shards': [],
+    }
+
+    for result in shard_results:
+        stats = result.get('engine_stats')
+        merged['shards'].append({'shard': result['shard'], 'error': result.get('error'), **result.get('shard_stats', {})})
+
+        if not stats:
+            continue
+
+        extraction = stats.get('extraction', {})
+        for tier, count in extraction.get('tiers', {}).items():
+            merged['extraction']['tiers'][tier] += count
+        for key in ('hits', 'misses'):
+            merged['extraction']['memo'][key] += extraction.get('memo', {}).get(key, 0)
+
+        latency = stats.get('latency', {})
+        for key in ('requests', 'hedges', 'hedge_wins'):
+            merged['latency'][key] += latency.get(key, 0)
+        for host, host_stats in latency.get('hosts', {}).items():
+            _merge_host_latency(merged['latency']['hosts'], host, host_stats)
+
+        for section in ('stylesheets', 'feeds', 'prewarm', 'redirects', 'hosts', 'scope', 'memory'):
+            for key, value in stats.get(section, {}).items():
+                if isinstance(value, dict):
+                    merged[section].setdefault(key, defaultdict(int))
+                    for sub_key, sub_value in value.items():
+                        merged[section][key][sub_key] += sub_value
+                else:
+                    merged[section][key] += value
+
+    memo = merged['extraction']['memo']
+    lookups = memo['hits'] + memo['misses']
+    memo['hit_rate'] = round(100 * memo['hits'] / lookups, 1) if lookups > 0 else 0
+
+    return merged
+
+def save_host_profiles(shard_results: List[Dict[str, Any]]) -> int:
+
+    # Shards only collect profile changes; they are merged into the store once, here
+    profiles = [profile for result in shard_results for profile in result.get('host_profiles', [])]
+    if not profiles:
+        return 0
+
+    store = HostProfileStore()
+    try:
+        saved = store.save(profiles)
+    finally:
+        store.close()
+
+    logger.info(f"Saved {saved} host profile updates from {len(shard_results)} crawl shards")
+    return saved
+
+def merge_crawl_graphs(shard_results: List[Dict[str, Any]]) -> Optional[CrawlGraph]:
+
+    graphs = [result['graph'] for result in shard_results if result.get('graph') is not None]
+    if not graphs:
+        return None
+
+    merged = CrawlGraph()
+    for graph in graphs:
+        merged.merge(graph)
+
+    merged.resolve_parents()
+    return merged
+
+def _merge_host_latency(hosts: Dict[str, Dict[str, Any]], host: str, host_stats: Dict[str, Any]) -> None:
+
+    existing = hosts.get(host)
+    if existing is None:
+        hosts[host] = dict(host_stats)
+        return
+
+    samples = existing['samples'] + host_stats['samples']
+    for key in ('p50', 'p95', 'p99'):
+        weighted = existing[key] * existing['samples'] + host_stats[key] * host_stats['samples']
+        existing[key] = round(weighted / samples, 3) if samples else 0
+
+    existing['samples'] = samples
+    existing['timeouts'] = existing.get('timeouts', 0) + host_stats.get('timeouts', 0)
@@ -36,6 +36,120 @@ class StatsManager:
         else:
             logger.debug(f"Failed to crawl {page.url} (depth {page.depth}): {page.error_message}")
 
+    def update_extraction_stats(self, extraction_stats: Dict[str, Any]):
+
+        memo_stats = extraction_stats.get('memo', {})
+        tiers = extraction_stats.get('tiers', {})
+
+        self.stats.extraction_memo_hits = memo_stats.get('hits', 0)
+        self.stats.extraction_memo_misses = memo_stats.get('misses', 0)
+        self.stats.fast_extractions = tiers.get('fast', 0)
+        self.stats.dom_extractions = tiers.get('dom', 0)
+
+        if memo_stats:
+            logger.info(f"Extraction memo: {memo_stats.get('hits', 0)} hits, "
+                        f"{memo_stats.get('misses', 0)} misses ({memo_stats.get('hit_rate', 0)}% hit rate)")
+
+        if tiers:
+            logger.info(f"Extraction tiers: {tiers.get('fast', 0)} regex-only, {tiers.get('dom', 0)} DOM")
+
+    def update_latency_stats(self, latency_stats: Dict[str, Any]):
+
+        hosts = latency_stats.get('hosts', {})
+
+        self.stats.hedged_requests = latency_stats.get('hedges', 0)
+        self.stats.hedge_wins = latency_stats.get('hedge_wins', 0)
+        self.stats.request_timeouts = sum(host.get('timeouts', 0) for host in hosts.values())
+
+        for host, host_stats in hosts.items():
+            if not host_stats['samples']:
+                continue
+            logger.info(f"Latency for {host}: p50 {host_stats['p50']}s, p95 {host_stats['p95']}s, "
+                        f"p99 {host_stats['p99']}s over {host_stats['samples']} requests")
+
+        if self.stats.hedged_requests:
+            logger.info(f"Hedged {self.stats.hedged_requests} requests, "
+                        f"{self.stats.hedge_wins} hedges answered first")
+
+    def update_stylesheet_stats(self, stylesheet_stats: Dict[str, Any]):
+
+        if not stylesheet_stats:
+            return
+
+        cache_stats = stylesheet_stats.get('cache', {})
+
+        self.stats.stylesheets_fetched = stylesheet_stats.get('fetched', 0)
+        self.stats.stylesheet_cache_hits = cache_stats.get('hits', 0)
+        self.stats.stylesheet_media = stylesheet_stats.get('media', 0)
+
+        if stylesheet_stats.get('stylesheets'):
+            logger.info(f"Stylesheets: {stylesheet_stats['stylesheets']} linked, "
+                        f"{self.stats.stylesheets_fetched} fetched, {self.stats.stylesheet_cache_hits} from cache, "
+                        f"{self.stats.stylesheet_media} media URLs")
+
+    def update_feed_stats(self, feed_stats: Dict[str, Any]):
+
+        if not feed_stats:
+            return
+
+        self.stats.feeds_parsed = feed_stats.get('feeds', 0)
+        self.stats.feed_items = feed_stats.get('items', 0)
+        self.stats.feed_media = feed_stats.get('media', 0)
+
+        if self.stats.feeds_parsed:
+            logger.info(f"Feeds: {self.stats.feeds_parsed} parsed, {self.stats.feed_items} items, "
+                        f"{self.stats.feed_media} media URLs")
+
+    def update_prewarm_stats(self, prewarm_stats: Dict[str, Any]):
+
+        if not prewarm_stats:
+            return
+
+        self.stats.prewarmed_connections = prewarm_stats.get('connections_opened', 0)
+        self.stats.prewarm_time_saved = round(prewarm_stats.get('setup_time_saved', 0.0), 3)
+
+        if prewarm_stats.get('hosts'):
+            logger.info(f"Pre-warm: {prewarm_stats['hosts']} hosts, {prewarm_stats.get('dns_prefetched', 0)} DNS lookups, "
+                        f"{self.stats.prewarmed_connections} connections opened, "
+                        f"{prewarm_stats.get('connections_used', 0)} used, {self.stats.prewarm_time_saved}s setup saved")
+
+    def update_redirect_stats(self, redirect_stats: Dict[str, Any]):
+
+        if not redirect_stats:
+            return
+
+        self.stats.redirect_hops = redirect_stats.get('hops', 0)
+        self.stats.redirects_rewritten = redirect_stats.get('rewritten', 0)
+
+        if self.stats.redirect_hops or self.stats.redirects_rewritten:
+            logger.info(f"Redirects: {self.stats.redirect_hops} hops followed, "
+                        f"{self.stats.redirects_rewritten} URLs rewritten to their permanent target, "
+                        f"{redirect_stats.get('recorded', 0)} new permanent redirects recorded")
+
+    def update_scope_stats(self, scope_stats: Dict[str, Any]):
+
+        if not scope_stats:
+            return
+
+        self.stats.scope_kept = scope_stats.get('kept', 0)
+        self.stats.scope_dropped = dict(scope_stats.get('dropped', {}))
+
+        if self.stats.scope_dropped:
+            reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(self.stats.scope_dropped.items()))
+            logger.info(f"Scope: {self.stats.scope_kept} links kept, dropped {reasons}")
+
+    def update_memory_stats(self, memory_stats: Dict[str, Any]):
+
+        if not memory_stats:
+            return
+
+        self.stats.memory_pauses = memory_stats.get('pauses', 0)
+        self.stats.memory_paused_seconds = round(memory_stats.get('paused_seconds', 0.0), 3)
+
+        if self.stats.memory_pauses:
+            logger.info(f"Memory: crawl paused {self.stats.memory_pauses} times for "
+                        f"{self.stats.memory_paused_seconds}s, {memory_stats.get('shrinks', 0)} cache shrinks")
+
     def finalize(self):
 
         self.stats.end_time = datetime.now()
@@ -61,6 +175,49 @@ class StatsManager:
                 "videos": self.stats.total_videos,
                 "audio": self.stats.total_audio
             },
+            "extraction": {
+                "fast": self.stats.fast_extractions,
+                "dom": self.stats.dom_extractions
+            },
+            "extraction_memo": {
+                "hits": self.stats.extraction_memo_hits,
+                "misses": self.stats.extraction_memo_misses,
+                "hit_rate": self._percentage(
+                    self.stats.extraction_memo_hits,
+                    self.stats.extraction_memo_hits + self.stats.extraction_memo_misses
+                )
+            },
+            "stylesheets": {
+                "fetched": self.stats.stylesheets_fetched,
+                "cache_hits": self.stats.stylesheet_cache_hits,
+                "media": self.stats.stylesheet_media
+            },
+            "feeds": {
+                "parsed": self.stats.feeds_parsed,
+                "items": self.stats.feed_items,
+                "media": self.stats.feed_media
+            },
+            "prewarm": {
+                "connections": self.stats.prewarmed_connections,
+                "time_saved": self.stats.prewarm_time_saved
+            },
+            "redirects": {
+                "hops": self.stats.redirect_hops,
+                "rewritten": self.stats.redirects_rewritten
+            },
+            "memory": {
+                "pauses": self.stats.memory_pauses,
+                "paused_seconds": self.stats.memory_paused_seconds
+            },
+            "scope": {
+                "kept": self.stats.scope_kept,
+                "dropped": self.stats.scope_dropped
+            },
+            "requests": {
+                "timeouts": self.stats.request_timeouts,
+                "hedged": self.stats.hedged_requests,
+                "hedge_wins": self.stats.hedge_wins
+            },
             "timing": {
                 "duration_seconds": duration,
                 "duration_formatted": self._format_duration(duration),
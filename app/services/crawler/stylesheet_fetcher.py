@@ -0,0 +1,217 @@
+import re
+import asyncio
+import aiohttp
+import logging
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import REQUEST_TIMEOUT, STYLESHEET_CONCURRENCY, STYLESHEET_MAX_SIZE
+from app.services.crawler.page_parser import PageParser
+from app.services.crawler.robots_parser import RobotsParser
+from app.services.cache.stylesheet_cache import StylesheetCache
+from app.utils.http.response import get_charset
+
+logger = logging.getLogger(__name__)
+
+STYLESHEET_ACCEPT_HEADER = 'text/css,*/*;q=0.1'
+CSS_CHARSET_REGEX = re.compile(rb'^@charset\s+"([A-Za-z0-9_\-]+)"\s*;')
+MAX_IMPORT_DEPTH = 2
+
+class StylesheetTooLargeError(Exception):
+    pass
+
+class StylesheetFetcher:
+
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 robots_parser: RobotsParser,
+                 page_parser: PageParser,
+                 cache: Optional[StylesheetCache] = None,
+                 concurrency: int = STYLESHEET_CONCURRENCY):
+
+        self.session = session
+        self.robots_parser = robots_parser
+        self.page_parser = page_parser
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+        self.seen: Set[str] = set()
+        self.media_urls: Set[str] = set()
+        self.fetched = 0
+        self.failed = 0
+
+    def reset(self) -> None:
+
+        self.seen.clear()
+        self.media_urls.clear()
+        self.fetched = 0
+        self.failed = 0
+
+        if self.cache is not None:
+            self.cache.hits = self.cache.misses = 0
+
+    def schedule(self, urls: Set[str], depth: int = 0) -> None:
+
+        for url in urls:
+            if url in self.seen:
+                continue
+
+            self.seen.add(url)
+            self._ensure_workers()
+            self.queue.put_nowait((url, depth))
+
+    def _ensure_workers(self) -> None:
+
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+
+        if not self.workers:
+            self.workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    async def _worker(self) -> None:
+
+        while True:
+            url, depth = await self.queue.get()
+
+            try:
+                await self._process_stylesheet(url, depth)
+            except Exception as e:
+                logger.warning(f"Error processing stylesheet {url}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def drain(self) -> Set[str]:
+
+        if self.queue is not None:
+            await self.queue.join()
+
+        await self.stop()
+
+        if self.cache is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.flush)
+
+        return self.media_urls
+
+    async def stop(self) -> None:
+
+        for worker in self.workers:
+            worker.cancel()
+
+        if self.workers:
+            await asyncio.gather(*self.workers, return_exceptions=True)
+
+        self.workers = []
+        self.queue = None
+
+    async def _process_stylesheet(self, url: str, depth: int) -> None:
+
+        cached = None
+        if self.cache is not None:
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(None, self.cache.get, url)
+
+        if cached is not None:
+            media, imports = cached
+        else:
+            if not await self.robots_parser.is_allowed(url):
+                logger.debug(f"Skipping stylesheet {url}: disallowed by robots.txt")
+                return
+
+            result = await self._fetch_stylesheet(url)
+            if result is None:
+                self.failed += 1
+                return
+
+            self.fetched += 1
+            media, imports = result
+
+            if self.cache is not None:
+                self.cache.put(url, media, imports)
+                if self.cache.needs_flush():
+                    await asyncio.get_running_loop().run_in_executor(None, self.cache.flush)
+
+        self.media_urls.update(media)
+
+        if imports and depth < MAX_IMPORT_DEPTH:
+            self.schedule(imports, depth + 1)
+
+    async def _fetch_stylesheet(self, url: str) -> Optional[Tuple[Set[str], Set[str]]]:
+
+        try:
+            async with self.session.get(
+                url,
+                timeout=REQUEST_TIMEOUT,
+                headers={'Accept': STYLESHEET_ACCEPT_HEADER}
+            ) as response:
+                if response.status != 200:
+                    logger.debug(f"Skipping stylesheet {url}: HTTP {response.status}")
+                    return None
+
+                content_type = response.headers.get('Content-Type', '')
+                body = await self._read_limited(response)
+
+            css_text = self._decode(body, content_type)
+            return self.page_parser.extract_css_media(css_text, url)
+        except StylesheetTooLargeError:
+            logger.debug(f"Skipping stylesheet {url}: larger than {STYLESHEET_MAX_SIZE} bytes")
+        except asyncio.TimeoutError:
+            logger.debug(f"Timeout fetching stylesheet {url}")
+        except aiohttp.ClientError as e:
+            logger.debug(f"HTTP client error fetching stylesheet {url}: {e}")
+
+        return None
+
+    @staticmethod
+    async def _read_limited(response: aiohttp.ClientResponse) -> bytes:
+
+        if (getattr(response, 'content_length', None) or 0) > STYLESHEET_MAX_SIZE:
+            raise StylesheetTooLargeError()
+
+        chunks = []
+        size = 0
+
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > STYLESHEET_MAX_SIZE:
+                raise StylesheetTooLargeError()
+            chunks.append(chunk)
+
+        return b''.join(chunks)
+
+    @staticmethod
+    def _decode(body: bytes, content_type: str) -> str:
+
+        encoding = get_charset(content_type)
+
+        if body.startswith(b'\xef\xbb\xbf'):
+            encoding = 'utf-8-sig'
+        elif not encoding:
+            match = CSS_CHARSET_REGEX.match(body)
+            encoding = match.group(1).decode('ascii') if match else 'utf-8'
+
+        try:
+            return body.decode(encoding, errors='replace')
+        except LookupError:
+            return body.decode('utf-8', errors='replace')
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        stats = {
+            'stylesheets': len(self.seen),
+            'fetched': self.fetched,
+            'failed': self.failed,
+            'media': len(self.media_urls),
+        }
+
+        if self.cache is not None:
+            stats['cache'] = self.cache.get_stats()
+
+        return stats
+
+    def close(self) -> None:
+
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,117 @@
+import re
+import math
+import logging
+
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.config import MEDIA_PATH_TOKENS, LOW_VALUE_PATH_TOKENS, PAGINATION_HINTS
+
+logger = logging.getLogger(__name__)
+
+class UrlScorer:
+
+    PARENT_YIELD_WEIGHT = 1.0
+    LEARNED_TOKEN_WEIGHT = 1.5
+    MEDIA_TOKEN_BONUS = 2.0
+    PAGINATION_BONUS = 2.5
+    THUMBNAIL_LINK_BONUS = 1.0
+    FEED_ITEM_BONUS = 3.0
+    LOW_VALUE_PENALTY = 4.0
+    DEPTH_PENALTY = 0.5
+
+    def __init__(self):
+
+        self.media_tokens = set(MEDIA_PATH_TOKENS)
+        self.low_value_tokens = set(LOW_VALUE_PATH_TOKENS)
+        self.pagination_hints = [hint.lower() for hint in PAGINATION_HINTS]
+
+        self.token_split_regex = re.compile(r'[/\-_.,;=&?]+')
+        self.page_query_regex = re.compile(r'(^|&)(page|p|pg|offset|start)=\d+', re.IGNORECASE)
+        self.page_path_regex = re.compile(r'/(page|p)/\d+/?$', re.IGNORECASE)
+
+        self.token_stats: Dict[str, Tuple[int, int]] = {}
+        self.version = 0
+
+    def reset(self) -> None:
+
+        self.token_stats.clear()
+        self.version = 0
+
+    def tokenize(self, url: str) -> List[str]:
+
+        try:
+            path = urlparse(url).path.lower()
+        except Exception:
+            return []
+
+        return [token for token in self.token_split_regex.split(path) if token and not token.isdigit()]
+
+    def record_page(self, url: str, media_count: int) -> None:
+
+        for token in set(self.tokenize(url)):
+            pages, media = self.token_stats.get(token, (0, 0))
+            self.token_stats[token] = (pages + 1, media + media_count)
+
+        self.version += 1
+
+    def score(self,
+              url: str,
+              depth: int,
+              parent_media_count: int = 0,
+              anchor_context: Optional[str] = None) -> float:
+
+        tokens = self.tokenize(url)
+        score = self.PARENT_YIELD_WEIGHT * math.log1p(parent_media_count)
+
+        if any(token in self.media_tokens for token in tokens):
+            score += self.MEDIA_TOKEN_BONUS
+
+        if any(token in self.low_value_tokens for token in tokens):
+            score -= self.LOW_VALUE_PENALTY
+
+        learned = max((self._token_yield(token) for token in tokens), default=0.0)
+
+        score += self.LEARNED_TOKEN_WEIGHT * math.log1p(learned)
+
+        if self._is_pagination(url, anchor_context):
+            score += self.PAGINATION_BONUS
+
+        if anchor_context and 'has:img' in anchor_context:
+            score += self.THUMBNAIL_LINK_BONUS
+
+        if anchor_context and 'from:feed' in anchor_context:
+            score += self.FEED_ITEM_BONUS
+
+        score -= self.DEPTH_PENALTY * depth
+
+        return score
+
+    def _token_yield(self, token: str) -> float:
+
+        pages, media = self.token_stats.get(token, (0, 0))
+        if pages == 0:
+            return 0.0
+
+        return media / pages
+
+    def _is_pagination(self, url: str, anchor_context: Optional[str]) -> bool:
+
+        if anchor_context:
+            context = anchor_context.lower()
+            if 'rel:next' in context:
+                return True
+
+            words = context.split()
+            if any(hint in words for hint in self.pagination_hints):
+                return True
+
+        try:
+            parsed = urlparse(url)
+        except Exception:
+            return False
+
+        if self.page_path_regex.search(parsed.path):
+            return True
+
+        return bool(parsed.query and self.page_query_regex.search(parsed.query))
\ No newline at end of file
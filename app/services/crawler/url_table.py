@@ -0,0 +1,202 @@
+import hashlib
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+VISITED = 1
+MEDIA = 2
+DOWNLOADED = 8
+
+EMPTY_SLOT = -1
+INITIAL_CAPACITY = 1024
+
+class UrlTable:
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+
+        self.initial_capacity = capacity
+        self.clear()
+
+    def clear(self) -> None:
+
+        self.hosts: List[str] = []
+        self.host_ids: Dict[str, int] = {}
+
+        self.url_hosts = array('i')
+        self.offsets = array('q', [0])
+        self.paths = bytearray()
+        self.hashes = array('q')
+        self.flags = bytearray()
+        self.flag_counts: Dict[int, int] = {}
+
+        self.slots = array('i', [EMPTY_SLOT]) * self.initial_capacity
+
+    @staticmethod
+    def _hash(url: str) -> int:
+
+        digest = hashlib.blake2b(url.encode('utf-8', errors='surrogatepass'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little', signed=True)
+
+    @staticmethod
+    def _split(url: str) -> Tuple[str, str]:
+
+        scheme_end = url.find('://')
+        if scheme_end < 0:
+            return '', url
+
+        path_start = url.find('/', scheme_end + 3)
+        if path_start < 0:
+            return url, ''
+
+        return url[:path_start], url[path_start:]
+
+    def _find(self, url: str, url_hash: int) -> Tuple[int, int]:
+
+        mask = len(self.slots) - 1
+        slot = url_hash & mask
+
+        while True:
+            url_id = self.slots[slot]
+            if url_id == EMPTY_SLOT or (self.hashes[url_id] == url_hash and self.get_url(url_id) == url):
+                return slot, url_id
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+
+        self.slots = array('i', [EMPTY_SLOT]) * (len(self.slots) * 2)
+        mask = len(self.slots) - 1
+
+        for url_id, url_hash in enumerate(self.hashes):
+            slot = url_hash & mask
+            while self.slots[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            self.slots[slot] = url_id
+
+    def get_id(self, url: str) -> Optional[int]:
+
+        url_id = self._find(url, self._hash(url))[1]
+        return None if url_id == EMPTY_SLOT else url_id
+
+    def intern(self, url: str) -> int:
+
+        url_hash = self._hash(url)
+        slot, url_id = self._find(url, url_hash)
+        if url_id != EMPTY_SLOT:
+            return url_id
+
+        host, path = self._split(url)
+
+        host_id = self.host_ids.get(host)
+        if host_id is None:
+            host_id = self.host_ids[host] = len(self.hosts)
+            self.hosts.append(host)
+
+        url_id = len(self.hashes)
+        self.url_hosts.append(host_id)
+        self.paths += path.encode('utf-8', errors='surrogatepass')
+        self.offsets.append(len(self.paths))
+        self.hashes.append(url_hash)
+        self.flags.append(0)
+        self.slots[slot] = url_id
+
+        if 2 * len(self.hashes) > len(self.slots):
+            self._grow()
+
+        return url_id
+
+    def get_url(self, url_id: int) -> str:
+
+        path = self.paths[self.offsets[url_id]:self.offsets[url_id + 1]].decode('utf-8', errors='surrogatepass')
+        return self.hosts[self.url_hosts[url_id]] + path
+
+    def get_host(self, url_id: int) -> str:
+
+        return self.hosts[self.url_hosts[url_id]]
+
+    def has(self, url_id: int, flag: int) -> bool:
+
+        return bool(self.flags[url_id] & flag)
+
+    def mark(self, url_id: int, flag: int) -> bool:
+
+        if self.flags[url_id] & flag:
+            return False
+
+        self.flags[url_id] |= flag
+        self.flag_counts[flag] = self.flag_counts.get(flag, 0) + 1
+        return True
+
+    def unmark_all(self, flag: int) -> None:
+
+        if self.flag_counts.get(flag):
+            self.flags = self.flags.translate(bytes(value & ~flag for value in range(256)))
+            self.flag_counts[flag] = 0
+
+    def count(self, flag: int) -> int:
+
+        return self.flag_counts.get(flag, 0)
+
+    def iter_ids(self, flag: int) -> Iterator[int]:
+
+        for url_id, value in enumerate(self.flags):
+            if value & flag:
+                yield url_id
+
+    def get_stats(self) -> Dict[str, int]:
+
+        return {
+            'urls': len(self),
+            'hosts': len(self.hosts),
+            'bytes': (len(self.paths) + self.url_hosts.itemsize * len(self.url_hosts)
+                      + self.offsets.itemsize * len(self.offsets) + self.hashes.itemsize * len(self.hashes)
+                      + self.slots.itemsize * len(self.slots) + len(self.flags)
+                      + sum(len(host) for host in self.hosts)),
+        }
+
+    def __len__(self) -> int:
+
+        return len(self.hashes)
+
+class UrlIdSet:
+
+    def __init__(self, table: UrlTable, flag: int):
+
+        self.table = table
+        self.flag = flag
+
+    def add(self, url: str) -> int:
+
+        url_id = self.table.intern(url)
+        self.table.mark(url_id, self.flag)
+        return url_id
+
+    def add_id(self, url_id: int) -> bool:
+
+        return self.table.mark(url_id, self.flag)
+
+    def update(self, urls: Iterable[str]) -> None:
+
+        for url in urls:
+            self.add(url)
+
+    def has_id(self, url_id: int) -> bool:
+
+        return self.table.has(url_id, self.flag)
+
+    def clear(self) -> None:
+
+        self.table.unmark_all(self.flag)
+
+    def __contains__(self, url: str) -> bool:
+
+        url_id = self.table.get_id(url)
+        return url_id is not None and self.table.has(url_id, self.flag)
+
+    def __iter__(self) -> Iterator[str]:
+
+        for url_id in self.table.iter_ids(self.flag):
+            yield self.table.get_url(url_id)
+
+    def __len__(self) -> int:
+
+        return self.table.count(self.flag)
@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Set, Optional
 from urllib.parse import urlparse, urljoin, urlunparse
 
-from app.config import MEDIA_EXTENSIONS
+from app.config import MEDIA_EXTENSIONS, STREAM_MANIFEST_EXTENSIONS
 
 logger = logging.getLogger(__name__)
 
@@ -77,4 +77,6 @@ class UrlUtils:
         for media_type, extensions in MEDIA_EXTENSIONS.items():
             all_media_extensions.extend(extensions)
 
+        all_media_extensions.extend(STREAM_MANIFEST_EXTENSIONS)
+
         return suffix in all_media_extensions
\ No newline at end of file
@@ -1,30 +1,190 @@
+import os
+import time
+import hashlib
+import functools
 import logging
 import asyncio
 import aiohttp
 import aiofiles
 
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 
-from app.config import REQUEST_TIMEOUT, MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, MAX_AUDIO_SIZE
+from app.config import MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, MAX_AUDIO_SIZE
 from app.services.media.mime_utils import MimeTypeUtils
+from app.services.cache.redirect_cache import RedirectCache
+from app.services.cache.host_profiles import HostProfiles
+from app.services.cache.media_store import MediaStore
+from app.services.cache.media_cache import MediaHttpCache
+from app.utils.http.latency import HostLatencyTracker
+from app.utils.http.host_limits import HostConcurrencyLimiter, THROTTLE_STATUSES
 
 logger = logging.getLogger(__name__)
 
+THROTTLE_RETRIES = 2
+THROTTLE_BACKOFF = 0.5
+MAX_RETRY_AFTER = 10
+CHUNK_SIZE = 64 * 1024
+STORE_BUFFER_LIMIT = 1024 * 1024
+
 class DownloadHandler:
 
-    def __init__(self, session: aiohttp.ClientSession):
+    def __init__(self,
+                 session: aiohttp.ClientSession,
+                 redirect_cache: Optional[RedirectCache] = None,
+                 host_profiles: Optional[HostProfiles] = None,
+                 media_store: Optional[MediaStore] = None,
+                 session_id: Optional[str] = None,
+                 http_cache: Optional[MediaHttpCache] = None):
         self.session = session
+        self.redirect_cache = redirect_cache
+        self.host_profiles = host_profiles
+        self.media_store = media_store
+        self.session_id = session_id
+        self.http_cache = http_cache if media_store is not None else None
+        self.file_details: Dict[str, Dict[str, Any]] = {}
         self.mime_utils = MimeTypeUtils()
+        self.latency_tracker = HostLatencyTracker(profiles=host_profiles)
+        self.limiter = HostConcurrencyLimiter(profiles=host_profiles)
+        self.redirect_hops = 0
+
+    async def download_file(self,
+                            url: str,
+                            file_path: str,
+                            indexed: Optional[Dict[str, Any]] = None) -> Tuple[bool, Optional[str], int]:
+
+        cached = None
+        loop = asyncio.get_running_loop()
+
+        if self.http_cache is not None:
+            cached = await loop.run_in_executor(None, self._find_cached, url)
+
+        if cached is None and indexed is not None and self.media_store is not None:
+            cached = await loop.run_in_executor(None, self._find_indexed, indexed)
+
+        if cached is not None and self.http_cache is not None and self.http_cache.is_fresh(cached):
+            result = await self._use_cached(url, Path(file_path), cached)
+            if result is not None:
+                self.http_cache.record_hit(cached)
+                logger.debug(f"Using fresh cached copy of {url}")
+                return result
+            cached = None
+
+        result = await self._download_with_retries(url, file_path, cached)
+
+        if result is None:
+            logger.debug(f"Cached copy of {url} disappeared after revalidation, downloading it again")
+            result = await self._download_with_retries(url, file_path)
+
+        return result
+
+    async def _download_with_retries(self,
+                                     url: str,
+                                     file_path: str,
+                                     cached: Optional[Dict[str, Any]] = None) -> Optional[Tuple[bool, Optional[str], int]]:
+
+        for attempt in range(THROTTLE_RETRIES + 1):
+            async with self.limiter.slot(url):
+                result = await self._fetch_file(url, file_path, cached)
+
+            if isinstance(result, float):
+                logger.debug(f"Throttled downloading {url}, retrying in {result:.1f}s")
+                await asyncio.sleep(result * (attempt + 1))
+                continue
+
+            return result
+
+        logger.warning(f"Failed to download {url}: still throttled after {THROTTLE_RETRIES} retries")
+        return False, None, 0
+
+    def _find_cached(self, url: str) -> Optional[Dict[str, Any]]:
+
+        cached = self.http_cache.lookup(url)
+        if cached is not None and not os.path.exists(self.media_store.get_blob_path(cached['digest'])):
+            self.http_cache.forget(url)
+            return None
+
+        return cached
+
+    def _find_indexed(self, indexed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 
-    async def download_file(self, url: str, file_path: str) -> Tuple[bool, Optional[str], int]:
+        if not indexed.get('digest') or not (indexed.get('etag') or indexed.get('last_modified')):
+            return None
+
+        if not os.path.exists(self.media_store.get_blob_path(indexed['digest'])):
+            return None
+
+        return {
+            'digest': indexed['digest'],
+            'size': indexed['size'],
+            'etag': indexed.get('etag'),
+            'last_modified': indexed.get('last_modified'),
+            'mime_type': indexed.get('mime_type'),
+            'fresh_until': 0.0,
+        }
+
+    async def _use_cached(self, url: str, path: Path, cached: Dict[str, Any]) -> Optional[Tuple[bool, Optional[str], int]]:
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            linked = await loop.run_in_executor(
+                None, self.media_store.link, cached['digest'], cached['size'], str(path), self.session_id
+            )
+        except Exception as e:
+            logger.warning(f"Error linking cached copy of {url}: {e}")
+            linked = False
+
+        if not linked:
+            if self.http_cache is not None:
+                await loop.run_in_executor(None, self.http_cache.forget, url)
+            return None
+
+        self.file_details[str(path)] = {
+            'digest': cached['digest'],
+            'etag': cached['etag'],
+            'last_modified': cached['last_modified'],
+        }
+        return True, cached['mime_type'] or self.mime_utils.get_mime_type(str(path)), cached['size']
+
+    async def _fetch_file(self,
+                          url: str,
+                          file_path: str,
+                          cached: Optional[Dict[str, Any]] = None) -> Union[Tuple[bool, Optional[str], int], float, None]:
 
         path = Path(file_path)
         path.parent.mkdir(parents=True, exist_ok=True)
 
+        timeout = self.latency_tracker.get_timeout(url)
+        started = time.monotonic()
+        headers = MediaHttpCache.get_conditional_headers(cached) if cached is not None else None
+
         try:
 
-            async with self.session.get(url, timeout=REQUEST_TIMEOUT) as response:
+            async with self.session.get(url, timeout=timeout, headers=headers) as response:
+                self.latency_tracker.record(url, time.monotonic() - started)
+                self.limiter.record(url, response.status)
+
+                if self.host_profiles is not None:
+                    self.host_profiles.record_response(url, response.status)
+
+                if response.history:
+                    self._record_redirects(url, response)
+
+                if response.status in THROTTLE_STATUSES:
+                    return self._get_retry_delay(response)
+
+                if response.status == 304 and cached is not None:
+                    result = await self._use_cached(url, path, cached)
+                    if result is not None:
+                        if self.http_cache is not None:
+                            await asyncio.get_running_loop().run_in_executor(
+                                None, self.http_cache.refresh, url, cached, response.headers
+                            )
+                        logger.info(f"Revalidated cached copy of {url} ({cached['size']} bytes not downloaded)")
+                        return result
+                    return None
+
                 if response.status != 200:
                     logger.warning(f"Failed to download {url}: HTTP {response.status}")
                     return False, None, 0
@@ -48,19 +208,15 @@ class DownloadHandler:
 
                         pass
 
-                async with aiofiles.open(path, 'wb') as f:
-                    file_size = 0
-                    chunk_size = 1024 * 64
+                if self.media_store is not None:
+                    body = await self._store_body(url, response, path, media_type)
+                else:
+                    body = await self._write_body(url, response, path, media_type)
 
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        await f.write(chunk)
-                        file_size += len(chunk)
+                if body is None:
+                    return False, None, 0
 
-                        if self._is_file_too_large(file_size, media_type):
-                            logger.warning(f"File too large during download: {url} ({file_size} bytes)")
-                            await f.close()
-                            path.unlink(missing_ok=True)
-                            return False, None, 0
+                file_size, digest = body
 
                 mime_type = self.mime_utils.get_mime_type(str(path))
                 actual_media_type = self.mime_utils.get_media_type(mime_type)
@@ -70,21 +226,152 @@ class DownloadHandler:
                     path.unlink(missing_ok=True)
                     return False, None, 0
 
+                self.file_details[str(path)] = {
+                    'digest': digest,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+
+                if self.http_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self.http_cache.store, url, response.headers, digest, file_size, mime_type
+                    )
+
                 logger.info(f"Downloaded {url} to {path} ({file_size} bytes)")
                 return True, mime_type, file_size
 
         except asyncio.TimeoutError:
             logger.warning(f"Timeout downloading {url}")
-            if path.exists():
-                path.unlink()
+            self.latency_tracker.record_timeout(url)
+            self.limiter.record(url, None)
+            self._remove_partial(path)
             return False, None, 0
 
         except Exception as e:
             logger.warning(f"Error downloading {url}: {e}")
-            if path.exists():
-                path.unlink()
+            self._remove_partial(path)
             return False, None, 0
 
+    @staticmethod
+    def _remove_partial(path: Path) -> None:
+
+        path.unlink(missing_ok=True)
+        path.with_name(path.name + '.part').unlink(missing_ok=True)
+
+    async def _write_body(self,
+                          url: str,
+                          response: aiohttp.ClientResponse,
+                          path: Path,
+                          media_type: str) -> Optional[Tuple[int, str]]:
+
+        hasher = hashlib.sha256()
+        part_path = path.with_name(path.name + '.part')
+
+        async with aiofiles.open(part_path, 'wb') as f:
+            file_size = 0
+
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                await f.write(chunk)
+                hasher.update(chunk)
+                file_size += len(chunk)
+
+                if self._is_file_too_large(file_size, media_type):
+                    logger.warning(f"File too large during download: {url} ({file_size} bytes)")
+                    await f.close()
+                    part_path.unlink(missing_ok=True)
+                    return None
+
+        os.replace(part_path, path)
+        return file_size, hasher.hexdigest()
+
+    async def _store_body(self,
+                          url: str,
+                          response: aiohttp.ClientResponse,
+                          path: Path,
+                          media_type: str) -> Optional[Tuple[int, str]]:
+
+        hasher = hashlib.sha256()
+        chunks = []
+        file_size = 0
+        temp_path = None
+        temp_file = None
+
+        try:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                hasher.update(chunk)
+                file_size += len(chunk)
+
+                if self._is_file_too_large(file_size, media_type):
+                    logger.warning(f"File too large during download: {url} ({file_size} bytes)")
+                    return None
+
+                if temp_file is not None:
+                    await temp_file.write(chunk)
+                    continue
+
+                chunks.append(chunk)
+
+                if file_size > STORE_BUFFER_LIMIT:
+                    temp_path = self.media_store.create_temp_file()
+                    temp_file = await aiofiles.open(temp_path, 'wb')
+                    await temp_file.write(b''.join(chunks))
+                    chunks = []
+
+            if temp_file is not None:
+                await temp_file.close()
+                temp_file = None
+
+            digest = hasher.hexdigest()
+            store_temp_path, temp_path = temp_path, None
+
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, functools.partial(
+                self.media_store.add, digest, file_size, str(path), self.session_id,
+                data=b''.join(chunks) if store_temp_path is None else None, temp_path=store_temp_path
+            ))
+            return file_size, digest
+        finally:
+            if temp_file is not None:
+                await temp_file.close()
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_http_cache_stats(self) -> Dict[str, Any]:
+
+        if self.http_cache is None:
+            return {}
+        return self.http_cache.get_stats()
+
+    def get_store_stats(self) -> Dict[str, Any]:
+
+        if self.media_store is None:
+            return {}
+        return self.media_store.get_stats()
+
+    @staticmethod
+    def _get_retry_delay(response: aiohttp.ClientResponse) -> float:
+
+        try:
+            return min(MAX_RETRY_AFTER, max(THROTTLE_BACKOFF, float(response.headers.get('Retry-After', ''))))
+        except ValueError:
+            return THROTTLE_BACKOFF
+
+    def _record_redirects(self, url: str, response: aiohttp.ClientResponse) -> None:
+
+        self.redirect_hops += len(response.history)
+
+        if self.redirect_cache is not None:
+            self.redirect_cache.record(url, response)
+
+    def get_redirect_stats(self) -> Dict[str, Any]:
+
+        stats = {'hops': self.redirect_hops}
+        if self.redirect_cache is not None:
+            cache_stats = self.redirect_cache.get_stats()
+            stats['rewritten'] = cache_stats['rewritten']
+            stats['recorded'] = cache_stats['recorded']
+        return stats
+
     def _is_file_too_large(self, file_size: int, media_type: str) -> bool:
 
         if media_type == 'image' and file_size > MAX_IMAGE_SIZE:
@@ -3,24 +3,46 @@ import asyncio
 import aiohttp
 import logging
 
-from typing import List, Optional, Dict, Any, Set
+from typing import Iterable, List, Optional, Dict, Any
 
 from app.models.media import Media
 from app.services.cache import CacheManager
+from app.services.cache.redirect_cache import RedirectCache
+from app.services.cache.host_profiles import HostProfiles
+from app.services.cache.media_store import MediaStore
+from app.services.cache.media_cache import MediaHttpCache
+from app.services.cache.download_index import DownloadIndex
+from app.services.crawler.url_table import UrlTable, UrlIdSet, DOWNLOADED
 from app.services.media.mime_utils import MimeTypeUtils
 from app.services.media.path_utils import MediaPathUtils
 from app.services.media.metadata_generator import MediaMetadataGenerator
 from app.services.media.thumbnail_generator import ThumbnailGenerator
 from app.services.media.download_handler import DownloadHandler
-from app.config import CACHE_DIR, USER_AGENT, MAX_CONCURRENT_DOWNLOADS
+from app.services.media.stream_handler import StreamHandler
+from app.utils.http.warc import WarcWriter
+from app.utils.http.recording import RecordingSession, ReplaySession
+from app.utils.http.prewarm import ConnectionPrewarmer
+from app.utils.memory import MemoryJob, MemoryBudgetExceeded, get_memory_governor
+from app.config import (
+    CACHE_DIR, USER_AGENT, MAX_CONCURRENT_DOWNLOADS, WARC_RECORD, WARC_REPLAY_PATH, CONNECTION_PREWARM,
+    REDIRECT_CACHE, HOST_PROFILES, MEDIA_STORE, MEDIA_HTTP_CACHE
+)
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_TASK_BYTES = 4096
+
 class MediaDownloader:
 
-    def __init__(self, session_id: str = None, cache_dir: str = CACHE_DIR):
+    def __init__(self,
+                 session_id: str = None,
+                 cache_dir: str = CACHE_DIR,
+                 record: bool = WARC_RECORD,
+                 replay_path: Optional[str] = WARC_REPLAY_PATH):
 
         self.cache_manager = CacheManager(cache_dir)
+        self.record = record
+        self.replay_path = replay_path
 
         self.session_id = self._initialize_session(session_id)
 
@@ -28,7 +50,7 @@ class MediaDownloader:
 
         self._initialize_utilities()
 
-        self.downloaded_urls: Set[str] = set()
+        self.downloaded_urls = UrlIdSet(UrlTable(), DOWNLOADED)
 
         self.cache_manager.update_session_access_time(self.session_id)
 
@@ -50,8 +72,26 @@ class MediaDownloader:
         self.thumbnail_generator = ThumbnailGenerator()
 
         self.session = None
+        self.prewarmer = None
+        self.prewarm_stats: Dict[str, Any] = {}
+        self.redirect_cache = RedirectCache() if REDIRECT_CACHE and not (self.record or self.replay_path) else None
+        self.redirect_stats: Dict[str, Any] = {}
+        self.host_profiles = HostProfiles() if HOST_PROFILES and not (self.record or self.replay_path) else None
+        self.host_stats: Dict[str, Any] = {}
+        self.media_store = MediaStore(self.cache_manager.get_shared_dir('media')) if MEDIA_STORE else None
+        self.store_stats: Dict[str, Any] = {}
+        self.http_cache = (
+            MediaHttpCache(self.cache_manager.get_shared_dir('media'))
+            if MEDIA_HTTP_CACHE and self.media_store and not (self.record or self.replay_path) else None
+        )
+        self.http_cache_stats: Dict[str, Any] = {}
+        self.index_stats: Dict[str, Any] = {}
+        self.download_index = DownloadIndex(self.cache_manager.get_download_index_path(self.session_id))
         self.download_handler = None
+        self.stream_handler = None
         self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        self.memory_job: Optional[MemoryJob] = None
+        self.memory_stats: Dict[str, Any] = {}
 
     async def init_session(self) -> None:
 
@@ -61,25 +101,100 @@ class MediaDownloader:
 
     def _create_http_session(self, headers: Dict[str, str]) -> None:
 
+        if self.replay_path:
+            logger.info(f"Replaying media downloads from {self.replay_path}")
+            self.session = ReplaySession.from_path(self.replay_path)
+            self._create_handlers()
+            return
+
         try:
 
-            self.session = aiohttp.ClientSession(
-                headers=headers,
-                connector=aiohttp.TCPConnector(ssl=False)
-            )
-            self.download_handler = DownloadHandler(self.session)
+            if CONNECTION_PREWARM:
+                self.prewarmer = ConnectionPrewarmer()
+                self.session = self.prewarmer.create_session(headers, ssl=False)
+            else:
+                self.session = aiohttp.ClientSession(
+                    headers=headers,
+                    connector=aiohttp.TCPConnector(ssl=False)
+                )
         except Exception as e:
             logger.error(f"Error creating HTTP session: {e}")
 
+            self.prewarmer = None
             self.session = aiohttp.ClientSession(headers=headers)
-            self.download_handler = DownloadHandler(self.session)
+
+        if self.record:
+            warc_dir = self.cache_manager.get_warc_dir(self.session_id)
+            self.session = RecordingSession(self.session, WarcWriter(warc_dir, 'media'))
+
+        self._create_handlers()
+
+    def _create_handlers(self) -> None:
+
+        self.download_handler = DownloadHandler(
+            self.session, self.redirect_cache, self.host_profiles, self.media_store, self.session_id, self.http_cache
+        )
+        self.stream_handler = StreamHandler(self.session)
 
     async def close(self) -> None:
 
+        if self.prewarmer:
+            await self.prewarmer.close()
+            self.prewarm_stats = self.prewarmer.get_stats()
+            self.prewarmer = None
+
+            if self.prewarm_stats.get('hosts'):
+                logger.info(f"Download pre-warm: {self.prewarm_stats['hosts']} hosts, "
+                            f"{self.prewarm_stats['connections_used']}/{self.prewarm_stats['connections_opened']} "
+                            f"warm connections used, {self.prewarm_stats['setup_time_saved']}s setup saved")
+
+        if self.download_handler:
+            self.redirect_stats = self.download_handler.get_redirect_stats()
+
+            if self.redirect_stats.get('hops') or self.redirect_stats.get('rewritten'):
+                logger.info(f"Download redirects: {self.redirect_stats['hops']} hops followed, "
+                            f"{self.redirect_stats.get('rewritten', 0)} URLs rewritten to their permanent target")
+
+        if self.download_handler and self.host_profiles:
+            self.host_stats = dict(self.host_profiles.get_stats(), **self.download_handler.limiter.get_stats())
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.host_profiles.close)
+
+        if self.redirect_cache:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.redirect_cache.close)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.download_index.close)
+
+        self.index_stats = self.download_index.get_stats()
+        if self.index_stats['reused']:
+            logger.info(f"Reused {self.index_stats['reused']} complete downloads already in session {self.session_id}")
+
+        if self.download_handler and self.http_cache:
+            self.http_cache_stats = self.download_handler.get_http_cache_stats()
+
+            if self.http_cache_stats['hits'] or self.http_cache_stats['revalidated']:
+                logger.info(f"Media cache: {self.http_cache_stats['hits']} fresh hits, "
+                            f"{self.http_cache_stats['revalidated']} revalidated, {self.http_cache_stats['misses']} downloaded "
+                            f"({self.http_cache_stats['bytes_not_fetched']} bytes not fetched)")
+
+            self.http_cache.close()
+
+        if self.download_handler and self.media_store:
+            self.store_stats = self.download_handler.get_store_stats()
+
+            if self.store_stats.get('deduplicated'):
+                logger.info(f"Media store: {self.store_stats['stored']} new files, "
+                            f"{self.store_stats['deduplicated']} reused ({self.store_stats['bytes_saved']} bytes not written)")
+
+            self.media_store.close()
+
         if self.session:
             await self.session.close()
             self.session = None
             self.download_handler = None
+            self.stream_handler = None
 
     def cleanup(self) -> None:
 
@@ -90,10 +205,19 @@ class MediaDownloader:
 
         await self.init_session()
         results = []
+        self.memory_job = get_memory_governor().register(
+            f"download {source_url}", self._get_tracked_bytes, self._shrink_memory
+        )
 
         try:
 
-            tasks = self._create_download_tasks(urls, source_url)
+            targets = await self._resolve_redirects(urls)
+            await self._load_host_profiles(targets.values())
+
+            if self.prewarmer is not None:
+                self.prewarmer.observe(targets.values())
+
+            tasks = self._create_download_tasks(targets, source_url)
 
             if tasks:
                 results = await self._process_download_tasks(tasks)
@@ -102,28 +226,67 @@ class MediaDownloader:
 
             return results
         finally:
+            self.memory_job.close()
+            self.memory_stats = self.memory_job.get_stats()
             await self.close()
 
-    def _create_download_tasks(self, urls: List[str], source_url: str) -> List[asyncio.Task]:
+    def _get_tracked_bytes(self) -> int:
+
+        return self.downloaded_urls.table.get_stats()['bytes'] + len(self.downloaded_urls) * DOWNLOAD_TASK_BYTES
+
+    def _shrink_memory(self) -> None:
+
+        if self.redirect_cache is not None:
+            self.redirect_cache.shrink()
+
+    async def _resolve_redirects(self, urls: List[str]) -> Dict[str, str]:
+
+        if self.redirect_cache is None:
+            return {url: url for url in urls}
+
+        hosts = self.redirect_cache.get_unloaded_hosts(urls)
+        if hosts:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.redirect_cache.load_hosts, hosts)
+
+        return {url: self.redirect_cache.resolve(url) for url in urls}
+
+    async def _load_host_profiles(self, urls: Iterable[str]) -> None:
+
+        if self.host_profiles is None:
+            return
+
+        hosts = self.host_profiles.get_unloaded_hosts(urls)
+        if hosts:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.host_profiles.load_hosts, hosts)
+
+    def _create_download_tasks(self, targets: Dict[str, str], source_url: str) -> List[asyncio.Task]:
 
         tasks = []
 
-        for url in urls:
+        for url, fetch_url in targets.items():
 
-            if url in self.downloaded_urls:
+            if fetch_url in self.downloaded_urls:
                 logger.debug(f"Skipping duplicate URL: {url}")
                 continue
 
-            task = asyncio.create_task(self._download_single_media(url, source_url))
+            task = asyncio.create_task(self._download_single_media(url, source_url, fetch_url))
             tasks.append(task)
 
-            self.downloaded_urls.add(url)
+            self.downloaded_urls.add(fetch_url)
 
         return tasks
 
     async def _process_download_tasks(self, tasks: List[asyncio.Task]) -> List[Media]:
 
-        results = await asyncio.gather(*tasks)
+        try:
+            results = await asyncio.gather(*tasks)
+        except MemoryBudgetExceeded:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
         return [r for r in results if r is not None]
 
@@ -135,23 +298,42 @@ class MediaDownloader:
             logger.info(f"Cached {len(results)} media files in session {self.session_id}")
             logger.info(f"Cache directory: {self.cache_dir}")
 
-    async def _download_single_media(self, url: str, source_url: str) -> Optional[Media]:
+    async def _download_single_media(self, url: str, source_url: str, fetch_url: Optional[str] = None) -> Optional[Media]:
 
         cache_path = self.path_utils.get_cache_file_path(url)
+        fetch_url = fetch_url or url
 
         try:
             async with self.semaphore:
+                await self.memory_job.wait()
+
+                indexed = self.download_index.entries.get(url)
+                if indexed is not None:
+                    loop = asyncio.get_running_loop()
+                    existing_path = await loop.run_in_executor(None, self._find_complete_download, url, indexed)
+                    if existing_path:
+                        return await self._process_existing_file(url, source_url, existing_path)
 
-                if os.path.exists(cache_path):
-                    return await self._process_existing_file(url, source_url, cache_path)
+                if self.stream_handler.is_manifest_url(fetch_url):
+                    return await self._download_and_process_stream(url, source_url, cache_path, fetch_url)
 
-                return await self._download_and_process_file(url, source_url, cache_path)
+                return await self._download_and_process_file(url, source_url, cache_path, fetch_url, indexed)
 
+        except MemoryBudgetExceeded:
+            raise
         except Exception as e:
             logger.warning(f"Error processing media file {url}: {e}")
             self._cleanup_failed_download(cache_path)
             return None
 
+    def _find_complete_download(self, url: str, entry: Dict[str, Any]) -> Optional[str]:
+
+        blob_path = None
+        if self.media_store is not None and entry.get('digest'):
+            blob_path = self.media_store.get_blob_path(entry['digest'])
+
+        return self.download_index.find_complete(url, blob_path)
+
     async def _process_existing_file(self, url: str, source_url: str, cache_path: str) -> Optional[Media]:
 
         file_size = os.path.getsize(cache_path)
@@ -161,6 +343,7 @@ class MediaDownloader:
         if not media_type:
 
             os.remove(cache_path)
+            self.download_index.remove(url)
             return None
 
         logger.info(f"Using cached file for {url}: {cache_path}")
@@ -174,18 +357,50 @@ class MediaDownloader:
             media_type, metadata
         )
 
-    async def _download_and_process_file(self, url: str, source_url: str, cache_path: str) -> Optional[Media]:
+    async def _download_and_process_file(self,
+                                         url: str,
+                                         source_url: str,
+                                         cache_path: str,
+                                         fetch_url: str,
+                                         indexed: Optional[Dict[str, Any]] = None) -> Optional[Media]:
 
-        success, mime_type, file_size = await self.download_handler.download_file(url, cache_path)
+        # A stale index entry still carries the validators of the copy it described
+        success, mime_type, file_size = await self.download_handler.download_file(fetch_url, cache_path, indexed)
 
         if not success:
             return None
 
+        return await self._process_downloaded_file(url, source_url, cache_path, mime_type, file_size)
+
+    async def _download_and_process_stream(self, url: str, source_url: str, cache_path: str, fetch_url: str) -> Optional[Media]:
+
+        success, mime_type, file_size, file_path = await self.stream_handler.download_stream(fetch_url, cache_path)
+
+        if not success:
+            return None
+
+        return await self._process_downloaded_file(url, source_url, file_path, mime_type, file_size)
+
+    async def _process_downloaded_file(self,
+                                       url: str,
+                                       source_url: str,
+                                       cache_path: str,
+                                       mime_type: str,
+                                       file_size: int) -> Optional[Media]:
+
+        details = self.download_handler.file_details.pop(cache_path, None)
+
         media_type = self.mime_utils.get_media_type(mime_type)
         if not media_type:
             self._cleanup_failed_download(cache_path)
             return None
 
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.download_index.record, url, cache_path, mime_type, details)
+
+        if self.download_index.needs_flush():
+            await loop.run_in_executor(None, self.download_index.flush)
+
         metadata = await self.metadata_generator.create_metadata(cache_path, mime_type, file_size)
 
         thumbnail_path = await self._ensure_thumbnail(cache_path, media_type)
@@ -0,0 +1,388 @@
+import re
+import math
+import logging
+import xml.etree.ElementTree as ET
+
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+HLS = 'hls'
+DASH = 'dash'
+
+HLS_CONTENT_TYPES = ['application/vnd.apple.mpegurl', 'application/x-mpegurl', 'audio/mpegurl', 'audio/x-mpegurl']
+DASH_CONTENT_TYPES = ['application/dash+xml']
+
+class ManifestError(Exception):
+    pass
+
+class Segment:
+
+    def __init__(self, url: str, byte_range: Optional[Tuple[int, int]] = None):
+
+        self.url = url
+        self.byte_range = byte_range
+
+    def get_headers(self) -> Dict[str, str]:
+
+        if self.byte_range is None:
+            return {}
+
+        start, length = self.byte_range
+        return {'Range': f"bytes={start}-{start + length - 1}"}
+
+class Rendition:
+
+    def __init__(self,
+                 kind: str,
+                 bandwidth: int = 0,
+                 url: Optional[str] = None,
+                 width: int = 0,
+                 height: int = 0,
+                 audio_group: Optional[str] = None):
+
+        self.kind = kind
+        self.bandwidth = bandwidth
+        self.url = url
+        self.width = width
+        self.height = height
+        self.audio_group = audio_group
+
+        self.duration = 0.0
+        self.init_segment: Optional[Segment] = None
+        self.segments: List[Segment] = []
+
+    @property
+    def is_loaded(self) -> bool:
+
+        return bool(self.segments)
+
+    def estimate_size(self, duration: Optional[float] = None) -> int:
+
+        return int(self.bandwidth / 8 * (duration if duration is not None else self.duration))
+
+class Manifest:
+
+    def __init__(self, kind: str, url: str):
+
+        self.kind = kind
+        self.url = url
+        self.duration = 0.0
+        self.video: List[Rendition] = []
+        self.audio: List[Rendition] = []
+        self.audio_groups: Dict[str, Rendition] = {}
+
+def detect_manifest_kind(url: str, content_type: str = '', text: str = '') -> Optional[str]:
+
+    content_type = content_type.lower()
+    path = url.split('?', 1)[0].split('#', 1)[0].lower()
+
+    if any(ct in content_type for ct in HLS_CONTENT_TYPES) or path.endswith('.m3u8') or text.lstrip().startswith('#EXTM3U'):
+        return HLS
+
+    if any(ct in content_type for ct in DASH_CONTENT_TYPES) or path.endswith('.mpd') or '<MPD' in text[:2048]:
+        return DASH
+
+    return None
+
+def parse_manifest(url: str, text: str, content_type: str = '') -> Manifest:
+
+    kind = detect_manifest_kind(url, content_type, text)
+
+    if kind == HLS:
+        return parse_hls(url, text)
+    if kind == DASH:
+        return parse_dash(url, text)
+
+    raise ManifestError(f"Unrecognized stream manifest at {url}")
+
+# HLS
+
+_hls_attribute_regex = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+def _parse_hls_attributes(value: str) -> Dict[str, str]:
+
+    return {key: val.strip('"') for key, val in _hls_attribute_regex.findall(value)}
+
+def _parse_byte_range(value: str, next_offset: int) -> Tuple[int, int]:
+
+    length, _, offset = value.partition('@')
+    start = int(offset) if offset else next_offset
+    return start, int(length)
+
+def parse_hls(url: str, text: str) -> Manifest:
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or not lines[0].startswith('#EXTM3U'):
+        raise ManifestError(f"Invalid HLS playlist at {url}")
+
+    manifest = Manifest(HLS, url)
+
+    if any(line.startswith('#EXT-X-STREAM-INF') for line in lines):
+        _parse_hls_master(manifest, lines)
+    else:
+        rendition = Rendition('video', url=url)
+        load_hls_media_playlist(rendition, text)
+        manifest.video.append(rendition)
+        manifest.duration = rendition.duration
+
+    return manifest
+
+def _parse_hls_master(manifest: Manifest, lines: List[str]) -> None:
+
+    pending: Optional[Dict[str, str]] = None
+
+    for line in lines:
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            pending = _parse_hls_attributes(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MEDIA:'):
+            attributes = _parse_hls_attributes(line.split(':', 1)[1])
+            if attributes.get('TYPE') == 'AUDIO' and attributes.get('URI'):
+                group = attributes.get('GROUP-ID', '')
+                if group not in manifest.audio_groups or attributes.get('DEFAULT') == 'YES':
+                    manifest.audio_groups[group] = Rendition('audio', url=urljoin(manifest.url, attributes['URI']))
+        elif pending is not None and not line.startswith('#'):
+            width, _, height = pending.get('RESOLUTION', '0x0').partition('x')
+            codecs = pending.get('CODECS', '')
+            kind = 'audio' if codecs and all(codec.strip().startswith(('mp4a', 'ac-3', 'ec-3', 'opus')) for codec in codecs.split(',')) else 'video'
+
+            rendition = Rendition(
+                kind,
+                bandwidth=int(pending.get('BANDWIDTH', 0) or 0),
+                url=urljoin(manifest.url, line),
+                width=int(width or 0) if width.isdigit() else 0,
+                height=int(height or 0) if height.isdigit() else 0,
+                audio_group=pending.get('AUDIO')
+            )
+
+            (manifest.audio if kind == 'audio' else manifest.video).append(rendition)
+            pending = None
+
+def load_hls_media_playlist(rendition: Rendition, text: str) -> None:
+
+    segment_duration = 0.0
+    byte_range: Optional[Tuple[int, int]] = None
+    next_offset = 0
+
+    rendition.segments = []
+    rendition.duration = 0.0
+
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+
+        if line.startswith('#EXTINF:'):
+            segment_duration = float(line[8:].split(',', 1)[0] or 0)
+        elif line.startswith('#EXT-X-BYTERANGE:'):
+            byte_range = _parse_byte_range(line.split(':', 1)[1], next_offset)
+        elif line.startswith('#EXT-X-KEY:'):
+            attributes = _parse_hls_attributes(line.split(':', 1)[1])
+            if attributes.get('METHOD', 'NONE') != 'NONE':
+                raise ManifestError(f"Encrypted HLS rendition ({attributes.get('METHOD')}) is not supported")
+        elif line.startswith('#EXT-X-MAP:'):
+            attributes = _parse_hls_attributes(line.split(':', 1)[1])
+            map_range = _parse_byte_range(attributes['BYTERANGE'], 0) if 'BYTERANGE' in attributes else None
+            rendition.init_segment = Segment(urljoin(rendition.url, attributes['URI']), map_range)
+        elif not line.startswith('#'):
+            rendition.segments.append(Segment(urljoin(rendition.url, line), byte_range))
+            rendition.duration += segment_duration
+
+            if byte_range is not None:
+                next_offset = byte_range[0] + byte_range[1]
+
+            segment_duration = 0.0
+            byte_range = None
+
+# DASH
+
+_iso_duration_regex = re.compile(
+    r'P(?:(?P<days>[\d.]+)D)?(?:T(?:(?P<hours>[\d.]+)H)?(?:(?P<minutes>[\d.]+)M)?(?:(?P<seconds>[\d.]+)S)?)?'
+)
+_dash_template_regex = re.compile(r'\$(RepresentationID|Number|Bandwidth|Time)(?:%0(\d+)d)?\$')
+
+def parse_iso_duration(value: Optional[str]) -> float:
+
+    if not value:
+        return 0.0
+
+    match = _iso_duration_regex.fullmatch(value.strip())
+    if not match:
+        return 0.0
+
+    parts = {key: float(val) for key, val in match.groupdict().items() if val}
+    return parts.get('days', 0) * 86400 + parts.get('hours', 0) * 3600 + parts.get('minutes', 0) * 60 + parts.get('seconds', 0)
+
+def _strip_namespaces(root: ET.Element) -> None:
+
+    for element in root.iter():
+        if isinstance(element.tag, str) and '}' in element.tag:
+            element.tag = element.tag.split('}', 1)[1]
+
+def _resolve_base(base_url: str, element: ET.Element) -> str:
+
+    base = element.find('BaseURL')
+    if base is not None and base.text:
+        return urljoin(base_url, base.text.strip())
+    return base_url
+
+def _fill_template(template: str, representation_id: str, bandwidth: int, number: int, time: int) -> str:
+
+    values = {'RepresentationID': representation_id, 'Bandwidth': bandwidth, 'Number': number, 'Time': time}
+
+    def substitute(match: re.Match) -> str:
+        value = values[match.group(1)]
+        width = match.group(2)
+        return str(value).zfill(int(width)) if width and match.group(1) != 'RepresentationID' else str(value)
+
+    return _dash_template_regex.sub(substitute, template).replace('$$', '$')
+
+def _merge_attributes(*elements: Optional[ET.Element]) -> Dict[str, str]:
+
+    merged: Dict[str, str] = {}
+    for element in elements:
+        if element is not None:
+            merged.update(element.attrib)
+    return merged
+
+def parse_dash(url: str, text: str) -> Manifest:
+
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as e:
+        raise ManifestError(f"Invalid DASH manifest at {url}: {e}")
+
+    _strip_namespaces(root)
+
+    if root.get('type') == 'dynamic':
+        logger.info(f"DASH manifest at {url} is live; only the currently advertised segments will be fetched")
+
+    manifest = Manifest(DASH, url)
+    manifest.duration = parse_iso_duration(root.get('mediaPresentationDuration'))
+
+    mpd_base = _resolve_base(url, root)
+
+    period = root.find('Period')
+    if period is None:
+        raise ManifestError(f"DASH manifest at {url} has no Period")
+
+    period_duration = parse_iso_duration(period.get('duration')) or manifest.duration
+    manifest.duration = manifest.duration or period_duration
+    period_base = _resolve_base(mpd_base, period)
+
+    for adaptation in period.findall('AdaptationSet'):
+        adaptation_base = _resolve_base(period_base, adaptation)
+
+        for representation in adaptation.findall('Representation'):
+            mime_type = representation.get('mimeType') or adaptation.get('mimeType') or ''
+            content_type = adaptation.get('contentType') or mime_type.split('/', 1)[0]
+
+            if content_type not in ('video', 'audio'):
+                continue
+
+            rendition = Rendition(
+                content_type,
+                bandwidth=int(representation.get('bandwidth', 0) or 0),
+                url=_resolve_base(adaptation_base, representation),
+                width=int(representation.get('width', 0) or 0),
+                height=int(representation.get('height', 0) or 0)
+            )
+            rendition.duration = manifest.duration
+
+            _load_dash_segments(rendition, adaptation, representation, period_duration)
+
+            if rendition.segments:
+                (manifest.audio if content_type == 'audio' else manifest.video).append(rendition)
+
+    return manifest
+
+def _load_dash_segments(rendition: Rendition,
+                        adaptation: ET.Element,
+                        representation: ET.Element,
+                        period_duration: float) -> None:
+
+    representation_id = representation.get('id', '')
+    base_url = rendition.url
+
+    segment_list = representation.find('SegmentList')
+    if segment_list is None:
+        segment_list = adaptation.find('SegmentList')
+
+    if segment_list is not None:
+        initialization = segment_list.find('Initialization')
+        if initialization is not None and initialization.get('sourceURL'):
+            rendition.init_segment = Segment(urljoin(base_url, initialization.get('sourceURL')))
+
+        for segment_url in segment_list.findall('SegmentURL'):
+            media = segment_url.get('media')
+            byte_range = _parse_media_range(segment_url.get('mediaRange'))
+            rendition.segments.append(Segment(urljoin(base_url, media) if media else base_url, byte_range))
+        return
+
+    adaptation_template = adaptation.find('SegmentTemplate')
+    representation_template = representation.find('SegmentTemplate')
+
+    if adaptation_template is None and representation_template is None:
+        if representation.find('BaseURL') is None and adaptation.find('BaseURL') is None:
+            logger.debug(f"Skipping DASH representation {representation_id!r}: no segments and no BaseURL")
+            return
+
+        rendition.segments.append(Segment(base_url))
+        return
+
+    attributes = _merge_attributes(adaptation_template, representation_template)
+    timeline = None
+    for template in (representation_template, adaptation_template):
+        if template is not None and template.find('SegmentTimeline') is not None:
+            timeline = template.find('SegmentTimeline')
+            break
+
+    bandwidth = rendition.bandwidth
+    timescale = int(attributes.get('timescale', 1) or 1)
+    start_number = int(attributes.get('startNumber', 1) or 1)
+    media_template = attributes.get('media')
+
+    if 'initialization' in attributes:
+        init_url = _fill_template(attributes['initialization'], representation_id, bandwidth, start_number, 0)
+        rendition.init_segment = Segment(urljoin(base_url, init_url))
+
+    if not media_template:
+        return
+
+    if timeline is not None:
+        number = start_number
+        time = 0
+
+        for entry in timeline.findall('S'):
+            time = int(entry.get('t', time))
+            duration = int(entry.get('d', 0))
+            repeat = int(entry.get('r', 0))
+
+            if repeat < 0:
+                remaining = period_duration * timescale - time
+                repeat = max(0, math.ceil(remaining / duration) - 1) if duration else 0
+
+            for _ in range(repeat + 1):
+                media_url = _fill_template(media_template, representation_id, bandwidth, number, time)
+                rendition.segments.append(Segment(urljoin(base_url, media_url)))
+                number += 1
+                time += duration
+        return
+
+    segment_duration = int(attributes.get('duration', 0) or 0)
+    if not segment_duration or not period_duration:
+        raise ManifestError(f"Cannot determine segment count for DASH representation {representation_id}")
+
+    count = math.ceil(period_duration * timescale / segment_duration)
+    for index in range(count):
+        number = start_number + index
+        media_url = _fill_template(media_template, representation_id, bandwidth, number, index * segment_duration)
+        rendition.segments.append(Segment(urljoin(base_url, media_url)))
+
+def _parse_media_range(value: Optional[str]) -> Optional[Tuple[int, int]]:
+
+    if not value:
+        return None
+
+    start, _, end = value.partition('-')
+    return int(start), int(end) - int(start) + 1
@@ -1,4 +1,3 @@
-import uuid
 import hashlib
 import logging
 
@@ -16,9 +15,10 @@ class MediaPathUtils:
 
         parsed = urlparse(url)
         filename = Path(unquote(parsed.path)).name
+        url_hash = hashlib.md5(url.encode()).hexdigest()
 
         if not filename:
-            filename = f"{hashlib.md5(url.encode()).hexdigest()}"
+            filename = url_hash
 
         path = Path(filename)
         base = path.stem
@@ -26,7 +26,7 @@ class MediaPathUtils:
 
         base = ''.join(c for c in base if c.isalnum() or c in '_-.')
 
-        unique_filename = f"{base}_{str(uuid.uuid4().hex[:8])}{ext}"
+        unique_filename = f"{base}_{url_hash[:8]}{ext}"
 
         return str(self.cache_dir / unique_filename)
 
@@ -0,0 +1,288 @@
+import os
+import shutil
+import asyncio
+import logging
+import aiohttp
+import aiofiles
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.config import (
+    MAX_VIDEO_SIZE, MAX_AUDIO_SIZE, REQUEST_TIMEOUT,
+    STREAM_MANIFEST_EXTENSIONS, STREAM_SEGMENT_CONCURRENCY, STREAM_REMUX
+)
+from app.services.media.mime_utils import MimeTypeUtils
+from app.services.media.manifest_parser import (
+    HLS, Manifest, ManifestError, Rendition, Segment,
+    detect_manifest_kind, parse_manifest, load_hls_media_playlist
+)
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_CHUNK_SIZE = 64 * 1024
+SEGMENT_RETRIES = 2
+AUDIO_SHARE_OF_BUDGET = 0.2
+TS_SYNC_BYTE = b'\x47'
+
+class StreamTooLargeError(Exception):
+    pass
+
+class StreamHandler:
+
+    def __init__(self, session: aiohttp.ClientSession, concurrency: int = STREAM_SEGMENT_CONCURRENCY):
+
+        self.session = session
+        self.mime_utils = MimeTypeUtils()
+        self.concurrency = max(1, concurrency)
+        self.ffmpeg = shutil.which('ffmpeg') if STREAM_REMUX else None
+
+    @staticmethod
+    def is_manifest_url(url: str) -> bool:
+
+        path = url.split('?', 1)[0].split('#', 1)[0].lower()
+        return path.endswith(tuple(STREAM_MANIFEST_EXTENSIONS))
+
+    async def download_stream(self, url: str, file_path: str) -> Tuple[bool, Optional[str], int, str]:
+
+        try:
+            manifest = await self._fetch_manifest(url)
+            video, audio = await self._select_renditions(manifest)
+
+            if video is None and audio is None:
+                logger.warning(f"No playable renditions in stream manifest {url}")
+                return False, None, 0, file_path
+
+            return await self._download_renditions(url, video, audio, file_path)
+        except ManifestError as e:
+            logger.warning(f"Unsupported stream manifest {url}: {e}")
+        except StreamTooLargeError as e:
+            logger.warning(f"Stream too large: {url} ({e})")
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout downloading stream {url}")
+        except Exception as e:
+            logger.warning(f"Error downloading stream {url}: {e}")
+
+        return False, None, 0, file_path
+
+    async def _fetch_text(self, url: str) -> Tuple[str, str]:
+
+        async with self.session.get(url, timeout=REQUEST_TIMEOUT) as response:
+            if response.status != 200:
+                raise ManifestError(f"HTTP {response.status} fetching {url}")
+
+            body = await response.read()
+            return body.decode('utf-8', errors='replace'), response.headers.get('Content-Type', '')
+
+    async def _fetch_manifest(self, url: str) -> Manifest:
+
+        text, content_type = await self._fetch_text(url)
+
+        if detect_manifest_kind(url, content_type, text) is None:
+            raise ManifestError(f"{url} is not an HLS or DASH manifest")
+
+        return parse_manifest(url, text, content_type)
+
+    async def _load_rendition(self, rendition: Rendition) -> None:
+
+        if not rendition.is_loaded and rendition.url:
+            text, _ = await self._fetch_text(rendition.url)
+            load_hls_media_playlist(rendition, text)
+
+    async def _select_renditions(self, manifest: Manifest) -> Tuple[Optional[Rendition], Optional[Rendition]]:
+
+        videos = sorted(manifest.video, key=lambda r: r.bandwidth, reverse=True)
+
+        if not videos:
+            audio = await self._pick_rendition(manifest, sorted(manifest.audio, key=lambda r: r.bandwidth, reverse=True), MAX_AUDIO_SIZE)
+            return None, audio
+
+        if manifest.kind == HLS and not manifest.duration:
+            await self._load_rendition(videos[0])
+            manifest.duration = videos[0].duration
+
+        if not self.ffmpeg:
+            if manifest.audio:
+                logger.info(f"ffmpeg not available, fetching the video track only for {manifest.url}")
+            return await self._pick_rendition(manifest, videos, MAX_VIDEO_SIZE), None
+
+        audio = None
+        audio_candidates = sorted(manifest.audio, key=lambda r: r.bandwidth, reverse=True)
+
+        if audio_candidates:
+            audio = await self._pick_rendition(manifest, audio_candidates, int(MAX_VIDEO_SIZE * AUDIO_SHARE_OF_BUDGET))
+
+        budget = MAX_VIDEO_SIZE - (audio.estimate_size(manifest.duration) if audio else 0)
+        video = await self._pick_rendition(manifest, videos, budget)
+
+        if audio is None and video.audio_group in manifest.audio_groups:
+            audio = manifest.audio_groups[video.audio_group]
+            await self._load_rendition(audio)
+
+        return video, audio
+
+    async def _pick_rendition(self, manifest: Manifest, candidates: List[Rendition], budget: int) -> Optional[Rendition]:
+
+        if not candidates:
+            return None
+
+        chosen = candidates[-1]
+        for rendition in candidates:
+            if rendition.estimate_size(manifest.duration) <= budget:
+                chosen = rendition
+                break
+
+        await self._load_rendition(chosen)
+        logger.debug(f"Selected {chosen.kind} rendition at {chosen.bandwidth} bps ({len(chosen.segments)} segments)")
+        return chosen
+
+    async def _download_renditions(self,
+                                   url: str,
+                                   video: Optional[Rendition],
+                                   audio: Optional[Rendition],
+                                   file_path: str) -> Tuple[bool, Optional[str], int, str]:
+
+        base_path = Path(file_path).with_suffix('')
+        parts_dir = Path(f"{base_path}.parts")
+        parts_dir.mkdir(parents=True, exist_ok=True)
+
+        size_limit = MAX_VIDEO_SIZE if video is not None else MAX_AUDIO_SIZE
+        budget = [size_limit]
+
+        try:
+            tracks = []
+            for rendition in (video, audio):
+                if rendition is None:
+                    continue
+
+                track_path = await self._download_rendition(rendition, parts_dir, budget)
+                tracks.append(track_path)
+
+            output_path = await self._assemble_output(tracks, base_path)
+
+            mime_type = self.mime_utils.get_mime_type(str(output_path))
+            file_size = output_path.stat().st_size
+
+            logger.info(f"Downloaded stream {url} to {output_path} ({file_size} bytes)")
+            return True, mime_type, file_size, str(output_path)
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    async def _download_rendition(self, rendition: Rendition, parts_dir: Path, budget: List[int]) -> Path:
+
+        segments = list(rendition.segments)
+        if rendition.init_segment is not None:
+            segments.insert(0, rendition.init_segment)
+
+        prefix = f"{rendition.kind}-"
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(index: int, segment: Segment) -> Path:
+            async with semaphore:
+                return await self._fetch_segment(segment, parts_dir / f"{prefix}{index:06d}", budget)
+
+        tasks = [asyncio.ensure_future(fetch(index, segment)) for index, segment in enumerate(segments)]
+
+        try:
+            part_paths = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        track_path = parts_dir / f"{rendition.kind}.track"
+        await self._concatenate(part_paths, track_path)
+        return track_path
+
+    async def _fetch_segment(self, segment: Segment, part_path: Path, budget: List[int]) -> Path:
+
+        for attempt in range(SEGMENT_RETRIES + 1):
+            written = 0
+
+            try:
+                async with self.session.get(segment.url, headers=segment.get_headers(), timeout=REQUEST_TIMEOUT) as response:
+                    if response.status not in (200, 206):
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, (), status=response.status, message=f"HTTP {response.status}"
+                        )
+
+                    async with aiofiles.open(part_path, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(SEGMENT_CHUNK_SIZE):
+                            budget[0] -= len(chunk)
+                            written += len(chunk)
+
+                            if budget[0] < 0:
+                                raise StreamTooLargeError("segments exceed the media size limit")
+
+                            await f.write(chunk)
+
+                return part_path
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                budget[0] += written
+
+                if attempt == SEGMENT_RETRIES:
+                    raise
+
+                logger.debug(f"Retrying segment {segment.url} after error: {e}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        return part_path
+
+    async def _concatenate(self, part_paths: List[Path], output_path: Path) -> None:
+
+        async with aiofiles.open(output_path, 'wb') as output:
+            for part_path in part_paths:
+                async with aiofiles.open(part_path, 'rb') as part:
+                    while True:
+                        chunk = await part.read(SEGMENT_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        await output.write(chunk)
+
+                os.remove(part_path)
+
+    async def _assemble_output(self, tracks: List[Path], base_path: Path) -> Path:
+
+        is_transport_stream = self._is_transport_stream(tracks[0])
+
+        if self.ffmpeg:
+            output_path = base_path.with_suffix('.m4a' if tracks[0].name.startswith('audio') else '.mp4')
+            if await self._remux(tracks, output_path):
+                return output_path
+
+        output_path = base_path.with_suffix('.ts' if is_transport_stream else '.mp4')
+        shutil.move(str(tracks[0]), str(output_path))
+        return output_path
+
+    @staticmethod
+    def _is_transport_stream(path: Path) -> bool:
+
+        with open(path, 'rb') as f:
+            return f.read(1) == TS_SYNC_BYTE
+
+    async def _remux(self, tracks: List[Path], output_path: Path) -> bool:
+
+        cmd = [self.ffmpeg, '-v', 'error', '-y']
+        for track in tracks:
+            cmd.extend(['-i', str(track)])
+
+        if len(tracks) > 1:
+            cmd.extend(['-map', '0:v:0', '-map', '1:a:0'])
+
+        cmd.extend(['-c', 'copy', str(output_path)])
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+
+        if process.returncode == 0 and output_path.exists() and output_path.stat().st_size > 0:
+            return True
+
+        logger.warning(f"ffmpeg remux failed: {stderr.decode(errors='replace').strip()[:200]}")
+        if output_path.exists():
+            output_path.unlink()
+        return False
@@ -105,6 +105,27 @@ def copy_file(source: str, destination: str, overwrite: bool = False) -> bool:
         logger.warning(f"Error copying {source} to {destination}: {e}")
         return False
 
+def link_file(source: str, destination: str, overwrite: bool = False) -> bool:
+
+    if not os.path.exists(source):
+        return False
+
+    dest_dir = os.path.dirname(destination)
+    ensure_directory_exists(dest_dir)
+
+    if os.path.exists(destination):
+        if not overwrite:
+            return False
+        os.remove(destination)
+
+    try:
+        os.link(source, destination)
+        return True
+    except OSError as e:
+        logger.debug(f"Hardlink from {source} to {destination} failed ({e}), copying instead")
+
+    return copy_file(source, destination, overwrite)
+
 def delete_file(filepath: str) -> bool:
 
     if not os.path.exists(filepath):
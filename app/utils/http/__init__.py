@@ -1,3 +1,6 @@
 from app.utils.http.session import *
 from app.utils.http.request import *
-from app.utils.http.response import *
\ No newline at end of file
+from app.utils.http.response import *
+from app.utils.http.warc import *
+from app.utils.http.recording import *
+from app.utils.http.latency import *
\ No newline at end of file
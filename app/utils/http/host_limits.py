@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+from app.config import HOST_INITIAL_CONCURRENCY, MAX_CONCURRENT_DOWNLOADS
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+class _HostSlots:
+
+    __slots__ = ('limit', 'active', 'successes', 'condition')
+
+    def __init__(self, limit: int):
+
+        self.limit = limit
+        self.active = 0
+        self.successes = 0
+        self.condition = asyncio.Condition()
+
+class HostConcurrencyLimiter:
+
+    def __init__(self,
+                 profiles: Any = None,
+                 initial_limit: int = HOST_INITIAL_CONCURRENCY,
+                 max_limit: int = MAX_CONCURRENT_DOWNLOADS):
+
+        self.profiles = profiles
+        self.max_limit = max(1, max_limit)
+        self.initial_limit = max(1, min(initial_limit, self.max_limit))
+        self.hosts: Dict[str, _HostSlots] = {}
+
+        self.warm_starts = 0
+        self.throttles = 0
+
+    @staticmethod
+    def get_host(url: str) -> str:
+
+        return urlsplit(url).netloc.lower()
+
+    def _get_slots(self, host: str) -> _HostSlots:
+
+        slots = self.hosts.get(host)
+        if slots is not None:
+            return slots
+
+        limit = self.initial_limit
+        known = self.profiles.get(host).concurrency if self.profiles is not None else 0
+
+        if known:
+            limit = max(1, min(known, self.max_limit))
+            self.warm_starts += 1
+            logger.debug(f"Starting {host} at its learned concurrency of {limit}")
+
+        slots = self.hosts[host] = _HostSlots(limit)
+        return slots
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+
+        slots = self._get_slots(self.get_host(url))
+
+        async with slots.condition:
+            await slots.condition.wait_for(lambda: slots.active < slots.limit)
+            slots.active += 1
+
+        try:
+            yield
+        finally:
+            async with slots.condition:
+                slots.active -= 1
+                slots.condition.notify_all()
+
+    def record(self, url: str, status: Optional[int]) -> None:
+
+        host = self.get_host(url)
+        slots = self._get_slots(host)
+
+        if status is None or status in THROTTLE_STATUSES:
+            limit = max(1, slots.limit // 2) if status is not None else max(1, slots.limit - 1)
+            slots.successes = 0
+
+            if status is not None:
+                self.throttles += 1
+                logger.info(f"{host} answered HTTP {status}, lowering concurrency to {limit}")
+
+            self._set_limit(host, slots, limit)
+            return
+
+        slots.successes += 1
+
+        if slots.successes >= slots.limit and slots.limit < self.max_limit:
+            slots.successes = 0
+            self._set_limit(host, slots, slots.limit + 1)
+
+    def _set_limit(self, host: str, slots: _HostSlots, limit: int) -> None:
+
+        if limit == slots.limit:
+            return
+
+        slots.limit = limit
+
+        if self.profiles is not None:
+            self.profiles.record_concurrency(host, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'hosts': {host: slots.limit for host, slots in self.hosts.items()},
+            'warm_starts': self.warm_starts,
+            'throttles': self.throttles,
+        }
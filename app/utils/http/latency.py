@@ -0,0 +1,248 @@
+import math
+import time
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.config import (
+    REQUEST_TIMEOUT, ADAPTIVE_TIMEOUTS, ADAPTIVE_TIMEOUT_MIN, ADAPTIVE_TIMEOUT_MULTIPLIER,
+    HEDGE_MAX_RATIO, HEDGE_MIN_DELAY
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+MIN_TIMEOUT_SAMPLES = 5
+MIN_HEDGE_SAMPLES = 20
+MAX_TIMEOUT_BACKOFF = 5
+
+def _percentile(sorted_samples: list, fraction: float) -> float:
+
+    index = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+class HostLatencyTracker:
+
+    def __init__(self,
+                 enabled: bool = ADAPTIVE_TIMEOUTS,
+                 max_timeout: float = REQUEST_TIMEOUT,
+                 min_timeout: float = ADAPTIVE_TIMEOUT_MIN,
+                 multiplier: float = ADAPTIVE_TIMEOUT_MULTIPLIER,
+                 profiles: Any = None):
+
+        self.enabled = enabled
+        self.profiles = profiles
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.multiplier = multiplier
+
+        self.lock = threading.Lock()
+        self.samples: Dict[str, Deque[float]] = {}
+        self.timeouts: Dict[str, int] = {}
+        self.consecutive_timeouts: Dict[str, int] = {}
+        self.default_timeout = aiohttp.ClientTimeout(total=max_timeout)
+
+    @staticmethod
+    def get_host(url: str) -> str:
+
+        return urlsplit(url).netloc.lower()
+
+    def _get_samples(self, host: str) -> Deque[float]:
+
+        samples = self.samples.get(host)
+
+        if samples is None:
+            samples = self.samples[host] = deque(maxlen=LATENCY_WINDOW)
+            if self.profiles is not None:
+                samples.extend(self.profiles.get(host).latencies)
+
+        return samples
+
+    def record(self, url: str, latency: float) -> None:
+
+        host = self.get_host(url)
+
+        with self.lock:
+            self._get_samples(host).append(latency)
+            self.consecutive_timeouts.pop(host, None)
+
+        if self.profiles is not None:
+            self.profiles.record_latency(host, latency)
+
+    def record_timeout(self, url: str) -> None:
+
+        host = self.get_host(url)
+
+        with self.lock:
+            self.timeouts[host] = self.timeouts.get(host, 0) + 1
+            self.consecutive_timeouts[host] = self.consecutive_timeouts.get(host, 0) + 1
+
+        if self.profiles is not None:
+            self.profiles.record_timeout(host)
+
+    def get_percentiles(self, url: str, min_samples: int = MIN_TIMEOUT_SAMPLES) -> Optional[Tuple[float, float, float]]:
+
+        host = self.get_host(url)
+
+        with self.lock:
+            samples = self._get_samples(host)
+            if not samples or len(samples) < min_samples:
+                return None
+            ordered = sorted(samples)
+
+        return _percentile(ordered, 0.5), _percentile(ordered, 0.95), _percentile(ordered, 0.99)
+
+    def get_timeout(self, url: str) -> aiohttp.ClientTimeout:
+
+        if not self.enabled:
+            return self.default_timeout
+
+        percentiles = self.get_percentiles(url)
+        if percentiles is None:
+            return self.default_timeout
+
+        _, p95, p99 = percentiles
+
+        # Timeouts are not latency samples, so widen the budget while a host keeps timing out
+        backoff = 2 ** min(MAX_TIMEOUT_BACKOFF, self.consecutive_timeouts.get(self.get_host(url), 0))
+
+        return aiohttp.ClientTimeout(
+            total=self.max_timeout,
+            sock_connect=self._clamp(p95 * self.multiplier * backoff),
+            sock_read=self._clamp(p99 * self.multiplier * backoff)
+        )
+
+    def get_hedge_delay(self, url: str) -> Optional[float]:
+
+        percentiles = self.get_percentiles(url, MIN_HEDGE_SAMPLES)
+        if percentiles is None:
+            return None
+
+        return max(HEDGE_MIN_DELAY, percentiles[1])
+
+    def _clamp(self, value: float) -> float:
+
+        return max(self.min_timeout, min(self.max_timeout, value))
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        hosts = {}
+
+        with self.lock:
+            snapshot = {host: sorted(samples) for host, samples in self.samples.items() if samples}
+            timeouts = dict(self.timeouts)
+
+        for host, ordered in snapshot.items():
+            hosts[host] = {
+                'samples': len(ordered),
+                'p50': round(_percentile(ordered, 0.5), 3),
+                'p95': round(_percentile(ordered, 0.95), 3),
+                'p99': round(_percentile(ordered, 0.99), 3),
+                'timeouts': timeouts.get(host, 0),
+            }
+
+        for host, count in timeouts.items():
+            hosts.setdefault(host, {'samples': 0, 'p50': 0, 'p95': 0, 'p99': 0, 'timeouts': count})
+
+        return hosts
+
+class HedgedRequester:
+
+    def __init__(self, tracker: HostLatencyTracker, enabled: bool, max_ratio: float = HEDGE_MAX_RATIO):
+
+        self.tracker = tracker
+        self.enabled = enabled
+        self.max_ratio = max_ratio
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _can_hedge(self) -> bool:
+
+        return self.enabled and self.hedges < max(1, self.requests * self.max_ratio)
+
+    async def open(self,
+                   url: str,
+                   make_request: Callable[[], Any]) -> Tuple[Any, Any]:
+
+        self.requests += 1
+        started = time.monotonic()
+
+        primary = make_request()
+        primary_task = asyncio.ensure_future(primary.__aenter__())
+        contexts = {primary_task: primary}
+        pending = {primary_task}
+
+        try:
+            hedge_delay = self.tracker.get_hedge_delay(url) if self._can_hedge() else None
+            if hedge_delay is None:
+                return primary, await self._await_timed(url, primary_task, started)
+
+            done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+            if done:
+                return primary, await self._await_timed(url, primary_task, started)
+
+            self.hedges += 1
+            logger.debug(f"Hedging request for {url} after {hedge_delay:.2f}s")
+
+            hedge = make_request()
+            hedge_task = asyncio.ensure_future(hedge.__aenter__())
+            contexts[hedge_task] = hedge
+            pending = set(contexts)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                winners = [task for task in done if task.exception() is None]
+
+                if not winners:
+                    if not pending:
+                        raise next(iter(done)).exception()
+                    continue
+
+                winner = winners[0]
+                if winner is hedge_task:
+                    self.hedge_wins += 1
+
+                for loser in pending | (done - {winner}):
+                    self._discard(loser, contexts[loser])
+
+                self.tracker.record(url, time.monotonic() - started)
+                return contexts[winner], winner.result()
+        except asyncio.CancelledError:
+            # Covers the unhedged wait too, a response that arrives as the caller goes away is still released
+            for task in pending:
+                self._discard(task, contexts[task])
+            raise
+
+    async def _await_timed(self, url: str, task: Awaitable, started: float) -> Any:
+
+        response = await task
+        self.tracker.record(url, time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _discard(task: asyncio.Future, context: Any) -> None:
+
+        def release(finished: asyncio.Future) -> None:
+            if finished.cancelled() or finished.exception() is not None:
+                return
+            asyncio.ensure_future(context.__aexit__(None, None, None))
+
+        task.add_done_callback(release)
+        task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+        }
@@ -0,0 +1,284 @@
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+import threading
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import aiohttp
+
+from aiohttp.abc import AbstractResolver
+from yarl import URL
+
+from app.config import PREWARM_MAX_HOSTS, PREWARM_CONNECTIONS_PER_HOST, PREWARM_DNS_TTL
+
+logger = logging.getLogger(__name__)
+
+PREWARM_CONCURRENCY = 4
+PREWARM_CONNECT_TIMEOUT = 5
+
+class _DnsEntry:
+
+    __slots__ = ('addresses', 'expires', 'resolve_time', 'prefetched')
+
+    def __init__(self, addresses: List[Dict[str, Any]], expires: float, resolve_time: float, prefetched: bool):
+
+        self.addresses = addresses
+        self.expires = expires
+        self.resolve_time = resolve_time
+        self.prefetched = prefetched
+
+class SharedDnsCache:
+
+    def __init__(self, ttl: float = PREWARM_DNS_TTL):
+
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: Dict[Tuple[str, int, int], _DnsEntry] = {}
+
+    def get(self, key: Tuple[str, int, int], consume: bool = False) -> Optional[_DnsEntry]:
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            if entry.expires < time.monotonic():
+                del self.entries[key]
+                return None
+
+            if consume and entry.prefetched:
+                entry.prefetched = False
+                return _DnsEntry(entry.addresses, entry.expires, entry.resolve_time, True)
+
+            return entry
+
+    def put(self, key: Tuple[str, int, int], addresses: List[Dict[str, Any]], resolve_time: float, prefetched: bool) -> None:
+
+        with self.lock:
+            self.entries[key] = _DnsEntry(addresses, time.monotonic() + self.ttl, resolve_time, prefetched)
+
+shared_dns_cache = SharedDnsCache()
+
+class PrewarmResolver(AbstractResolver):
+
+    def __init__(self, cache: SharedDnsCache = shared_dns_cache):
+
+        self.resolver = aiohttp.DefaultResolver()
+        self.cache = cache
+
+        self.prefetch_hits = 0
+        self.time_saved = 0.0
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+
+        key = (host, port, family)
+
+        entry = self.cache.get(key, consume=True)
+        if entry is not None:
+            if entry.prefetched:
+                self.prefetch_hits += 1
+                self.time_saved += entry.resolve_time
+            return entry.addresses
+
+        start = time.monotonic()
+        addresses = await self.resolver.resolve(host, port, family)
+        self.cache.put(key, addresses, time.monotonic() - start, prefetched=False)
+
+        return addresses
+
+    async def prefetch(self, host: str, port: int, family: int = socket.AF_UNSPEC) -> bool:
+
+        key = (host, port, family)
+        if self.cache.get(key) is not None:
+            return False
+
+        start = time.monotonic()
+        addresses = await self.resolver.resolve(host, port, family)
+        self.cache.put(key, addresses, time.monotonic() - start, prefetched=True)
+
+        return True
+
+    async def close(self) -> None:
+
+        await self.resolver.close()
+
+def _is_ip_address(host: str) -> bool:
+
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+class ConnectionPrewarmer:
+
+    def __init__(self,
+                 max_hosts: int = PREWARM_MAX_HOSTS,
+                 connections_per_host: int = PREWARM_CONNECTIONS_PER_HOST):
+
+        self.max_hosts = max_hosts
+        self.connections_per_host = connections_per_host
+
+        self.resolver = PrewarmResolver()
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.connect_supported = True
+        self.semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+        self.tasks: Set[asyncio.Task] = set()
+
+        self.warmed: Set[str] = set()
+        self.requested: Set[str] = set()
+        self.idle_connections: Dict[str, int] = {}
+        self.setup_times: Dict[str, float] = {}
+
+        self.dns_prefetched = 0
+        self.connections_opened = 0
+        self.connections_used = 0
+        self.connection_time_saved = 0.0
+        self.errors = 0
+
+    def create_session(self, headers: Dict[str, str], **connector_kwargs: Any) -> aiohttp.ClientSession:
+
+        self.session = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(resolver=self.resolver, **connector_kwargs),
+            trace_configs=[self.trace_config]
+        )
+        return self.session
+
+    @staticmethod
+    def get_origin(url: URL) -> Optional[str]:
+
+        if url.scheme not in ('http', 'https') or not url.host:
+            return None
+        return str(url.origin())
+
+    def observe(self, urls: Iterable[str], connect: bool = True) -> None:
+
+        if self.session is None or len(self.warmed) >= self.max_hosts:
+            return
+
+        origins: Counter = Counter()
+
+        for url in urls:
+            try:
+                parsed = URL(url)
+            except ValueError:
+                continue
+
+            origin = self.get_origin(parsed)
+            if origin is None:
+                continue
+
+            if origin not in self.warmed and origin not in self.requested:
+                origins[origin] += 1
+
+        for origin, count in origins.most_common():
+            if len(self.warmed) >= self.max_hosts:
+                logger.debug(f"Connection pre-warm budget of {self.max_hosts} hosts reached")
+                break
+
+            self.warmed.add(origin)
+            connections = min(self.connections_per_host, count) if connect else 0
+
+            task = asyncio.create_task(self._warm(origin, connections))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _warm(self, origin: str, connections: int) -> None:
+
+        url = URL(origin)
+
+        async with self.semaphore:
+            try:
+                if connections <= 0 or not self.connect_supported:
+                    if not _is_ip_address(url.host) and await self.resolver.prefetch(url.host, url.port):
+                        self.dns_prefetched += 1
+                    return
+
+                if origin in self.requested:
+                    return
+
+                await self._open_connections(url, origin, connections)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                self.errors += 1
+                logger.debug(f"Failed to pre-warm {origin}: {e}")
+
+    async def _open_connections(self, url: URL, origin: str, connections: int) -> None:
+
+        opened = []
+        setup_time = 0.0
+
+        try:
+            for _ in range(connections):
+                start = time.monotonic()
+                opened.append(await self._connect(url))
+                setup_time += time.monotonic() - start
+        except (TypeError, AttributeError) as e:
+            # ClientRequest and connector.connect() are aiohttp internals (requirements.txt pins the tested
+            # range); if they change shape, keep pre-warming DNS instead of failing every host
+            self.connect_supported = False
+            logger.warning(f"Connection pre-warming is not supported with aiohttp {aiohttp.__version__}, "
+                           f"only resolving DNS from now on: {e}")
+            if not _is_ip_address(url.host) and await self.resolver.prefetch(url.host, url.port):
+                self.dns_prefetched += 1
+        finally:
+            for connection in opened:
+                connection.release()
+
+        if opened:
+            self.connections_opened += len(opened)
+            self.idle_connections[origin] = self.idle_connections.get(origin, 0) + len(opened)
+            self.setup_times[origin] = setup_time / len(opened)
+            logger.debug(f"Pre-warmed {len(opened)} connections to {origin} ({setup_time / len(opened):.3f}s each)")
+
+    async def _connect(self, url: URL) -> Any:
+
+        request = aiohttp.ClientRequest('GET', url, loop=asyncio.get_running_loop())
+        return await self.session.connector.connect(request, [], aiohttp.ClientTimeout(total=PREWARM_CONNECT_TIMEOUT))
+
+    async def _on_request_start(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+
+        context.origin = self.get_origin(params.url)
+        self.requested.add(context.origin)
+
+    async def _on_connection_reuse(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+
+        origin = getattr(context, 'origin', None)
+
+        if self.idle_connections.get(origin, 0) > 0:
+            self.idle_connections[origin] -= 1
+            self.connections_used += 1
+            self.connection_time_saved += self.setup_times.get(origin, 0.0)
+
+    async def stop(self) -> None:
+
+        for task in list(self.tasks):
+            task.cancel()
+
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+
+        await self.stop()
+        await self.resolver.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'hosts': len(self.warmed),
+            'dns_prefetched': self.dns_prefetched,
+            'dns_hits': self.resolver.prefetch_hits,
+            'connections_opened': self.connections_opened,
+            'connections_used': self.connections_used,
+            'errors': self.errors,
+            'setup_time_saved': round(self.connection_time_saved + self.resolver.time_saved, 3),
+        }
@@ -0,0 +1,329 @@
+import json
+import asyncio
+import logging
+import tempfile
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from app.utils.http.response import get_charset
+from app.utils.http.warc import WarcWriter, list_warc_files, iter_warc_records, read_warc_record
+
+logger = logging.getLogger(__name__)
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+class RecordingStreamReader:
+
+    def __init__(self, recording_response: 'RecordingResponse'):
+
+        self.recording_response = recording_response
+        self.stream = recording_response.response.content
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+
+        async for chunk in self.stream.iter_chunked(n):
+            self.recording_response._capture(chunk)
+            yield chunk
+
+        self.recording_response.complete = True
+
+    async def read(self, n: int = -1) -> bytes:
+
+        chunk = await self.stream.read(n)
+        self.recording_response._capture(chunk)
+
+        if n < 0 or self.stream.at_eof():
+            self.recording_response.complete = True
+
+        return chunk
+
+    def at_eof(self) -> bool:
+
+        return self.stream.at_eof()
+
+class RecordingResponse:
+
+    def __init__(self, response: aiohttp.ClientResponse):
+
+        self.response = response
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self.body_length = 0
+        self.complete = False
+        self.content = RecordingStreamReader(self)
+
+    def __getattr__(self, name: str) -> Any:
+
+        return getattr(self.response, name)
+
+    def _capture(self, chunk: bytes) -> None:
+
+        if chunk:
+            self.spool.write(chunk)
+            self.body_length += len(chunk)
+
+    async def read(self) -> bytes:
+
+        if not self.complete:
+            # aiohttp only returns what has not been consumed through .content yet
+            self._capture(await self.response.read())
+            self.complete = True
+
+        self.spool.seek(0)
+        body = self.spool.read()
+        self.spool.seek(0, 2)
+        return body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = 'strict') -> str:
+
+        body = await self.read()
+        return body.decode(encoding or self.response.get_encoding(), errors=errors)
+
+    async def json(self, encoding: Optional[str] = None, loads: Any = json.loads, **kwargs) -> Any:
+
+        text = await self.text(encoding)
+        return loads(text) if text.strip() else None
+
+class _RecordingRequestContext:
+
+    def __init__(self, recording_session: 'RecordingSession', method: str, url: str, kwargs: Dict[str, Any]):
+
+        self.recording_session = recording_session
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.context = None
+        self.recording_response: Optional[RecordingResponse] = None
+
+    async def __aenter__(self) -> RecordingResponse:
+
+        self.context = self.recording_session.session.request(self.method, self.url, **self.kwargs)
+        response = await self.context.__aenter__()
+
+        self.recording_response = RecordingResponse(response)
+        return self.recording_response
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+
+        try:
+            if self.recording_response is not None:
+                await self.recording_session.record(self.method, self.url, self.recording_response)
+        except Exception as e:
+            logger.warning(f"Error recording WARC record for {self.url}: {e}")
+        finally:
+            await self.context.__aexit__(exc_type, exc, tb)
+
+class RecordingSession:
+
+    def __init__(self, session: aiohttp.ClientSession, writer: WarcWriter):
+
+        self.session = session
+        self.writer = writer
+
+    def __getattr__(self, name: str) -> Any:
+
+        return getattr(self.session, name)
+
+    def get(self, url: str, **kwargs) -> _RecordingRequestContext:
+
+        return _RecordingRequestContext(self, 'GET', url, kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> _RecordingRequestContext:
+
+        return _RecordingRequestContext(self, method, url, kwargs)
+
+    async def record(self, method: str, url: str, recording_response: RecordingResponse) -> None:
+
+        response = recording_response.response
+        request_headers = list(response.request_info.headers.items())
+        response_headers = list(response.headers.items())
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write, method, url, request_headers, recording_response, response_headers)
+
+    def _write(self,
+               method: str,
+               url: str,
+               request_headers: List[Tuple[str, str]],
+               recording_response: RecordingResponse,
+               response_headers: List[Tuple[str, str]]) -> None:
+
+        response = recording_response.response
+
+        try:
+            request_id = self.writer.write_request(url, method, request_headers)
+            self.writer.write_response(
+                url,
+                response.status,
+                response.reason or '',
+                response_headers,
+                recording_response.spool,
+                recording_response.body_length,
+                truncated=not recording_response.complete,
+                concurrent_to=request_id
+            )
+        finally:
+            recording_response.spool.close()
+
+    async def close(self) -> None:
+
+        await self.session.close()
+        self.writer.close()
+
+class ReplayStreamReader:
+
+    def __init__(self, body: bytes):
+
+        self.body = body
+        self.position = 0
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+
+        while self.position < len(self.body):
+            chunk = self.body[self.position:self.position + n]
+            self.position += len(chunk)
+            yield chunk
+
+    async def read(self, n: int = -1) -> bytes:
+
+        end = len(self.body) if n < 0 else self.position + n
+        chunk = self.body[self.position:end]
+        self.position += len(chunk)
+        return chunk
+
+    def at_eof(self) -> bool:
+
+        return self.position >= len(self.body)
+
+class ReplayResponse:
+
+    def __init__(self, url: str, method: str, status: int, reason: str, headers: List[Tuple[str, str]], body: bytes):
+
+        self.url = URL(url)
+        self.method = method
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.history = ()
+        self.content = ReplayStreamReader(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+
+        return self._body
+
+    @property
+    def charset(self) -> Optional[str]:
+
+        return get_charset(self.headers.get('Content-Type', ''))
+
+    def get_encoding(self) -> str:
+
+        return self.charset or 'utf-8'
+
+    async def text(self, encoding: Optional[str] = None, errors: str = 'replace') -> str:
+
+        return self._body.decode(encoding or self.get_encoding(), errors=errors)
+
+    async def json(self, **kwargs) -> Any:
+
+        return json.loads(await self.text())
+
+    def raise_for_status(self) -> None:
+
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message=self.reason)
+
+    def close(self) -> None:
+
+        pass
+
+    def release(self) -> None:
+
+        pass
+
+class _ReplayRequestContext:
+
+    def __init__(self, replay_session: 'ReplaySession', method: str, url: str):
+
+        self.replay_session = replay_session
+        self.method = method
+        self.url = url
+
+    async def __aenter__(self) -> ReplayResponse:
+
+        return self.replay_session.lookup(self.method, self.url)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+
+        return None
+
+class ReplaySession:
+
+    def __init__(self, warc_paths: List[str]):
+
+        self.index: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+        self.cursors: Dict[Tuple[str, str], int] = {}
+        self.closed = False
+        self.misses = 0
+
+        self._build_index(warc_paths)
+
+    @classmethod
+    def from_path(cls, path: str) -> 'ReplaySession':
+
+        warc_paths = list_warc_files(path)
+        if not warc_paths:
+            logger.warning(f"No WARC files found at {path}, every replayed request will miss")
+
+        return cls(warc_paths)
+
+    def _build_index(self, warc_paths: List[str]) -> None:
+
+        pending_methods: Dict[str, str] = {}
+
+        for warc_path in warc_paths:
+            for offset, record in iter_warc_records(warc_path):
+                if record.record_type == 'request':
+                    method = record.content.split(b' ', 1)[0].decode('ascii', errors='replace') or 'GET'
+                    pending_methods[record.headers.get('WARC-Record-ID', '')] = method
+                elif record.record_type == 'response':
+                    method = pending_methods.pop(record.headers.get('WARC-Concurrent-To', ''), 'GET')
+                    key = (method, record.target_uri)
+                    self.index.setdefault(key, []).append((warc_path, offset))
+
+        logger.info(f"Loaded {sum(len(v) for v in self.index.values())} recorded responses from {len(warc_paths)} WARC files")
+
+    def get(self, url: str, **kwargs) -> _ReplayRequestContext:
+
+        return _ReplayRequestContext(self, 'GET', str(url))
+
+    def request(self, method: str, url: str, **kwargs) -> _ReplayRequestContext:
+
+        return _ReplayRequestContext(self, method.upper(), str(url))
+
+    def lookup(self, method: str, url: str) -> ReplayResponse:
+
+        key = (method, url)
+        locations = self.index.get(key)
+
+        if not locations:
+            self.misses += 1
+            raise aiohttp.ClientConnectionError(f"No recorded response for {method} {url}")
+
+        cursor = self.cursors.get(key, 0)
+        self.cursors[key] = cursor + 1
+
+        warc_path, offset = locations[min(cursor, len(locations) - 1)]
+        record = read_warc_record(warc_path, offset)
+
+        status, reason, headers, body = record.parse_http_response()
+        return ReplayResponse(url, method, status, reason, headers, body)
+
+    async def close(self) -> None:
+
+        self.closed = True
\ No newline at end of file
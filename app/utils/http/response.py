@@ -1,19 +1,40 @@
+import re
 import json
+import codecs
 import logging
 
-from bs4 import BeautifulSoup
-from typing import Dict, Any, Optional, List
+from bs4 import BeautifulSoup, FeatureNotFound
+from typing import Dict, Any, Optional, List, Union
+
+from app.config import HTML_PARSER, CHARSET_SNIFF_BYTES
 
 logger = logging.getLogger(__name__)
 
-def parse_html(content: str) -> Optional[BeautifulSoup]:
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+_meta_charset_regex = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.\-]+)', re.IGNORECASE)
+
+_html_parser = HTML_PARSER
+
+def parse_html(content: Union[str, bytes], content_type: str = '') -> Optional[BeautifulSoup]:
+
+    global _html_parser
 
     if not content:
         return None
 
+    from_encoding = sniff_html_encoding(content, content_type) if isinstance(content, bytes) else None
+
     try:
-        soup = BeautifulSoup(content, 'html.parser')
-        return soup
+        return BeautifulSoup(content, _html_parser, from_encoding=from_encoding)
+    except FeatureNotFound:
+        logger.warning(f"HTML parser '{_html_parser}' is not installed, falling back to html.parser")
+        _html_parser = 'html.parser'
+        return parse_html(content, content_type)
     except Exception as e:
         logger.warning(f"Error parsing HTML: {e}")
         return None
@@ -57,6 +78,43 @@ def extract_meta_tags(soup: BeautifulSoup) -> Dict[str, str]:
         logger.warning(f"Error extracting meta tags: {e}")
         return meta_data
 
+def get_charset(content_type: str) -> Optional[str]:
+
+    if not content_type:
+        return None
+
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.strip().partition('=')
+        if name.lower() == 'charset' and value:
+            return value.strip('"\'').lower()
+
+    return None
+
+def sniff_html_encoding(body: bytes, content_type: str = '', default: str = 'utf-8') -> str:
+
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if body.startswith(bom):
+            return encoding
+
+    for candidate in (get_charset(content_type), _find_meta_charset(body)):
+        if candidate and _is_known_encoding(candidate):
+            return candidate
+
+    return default
+
+def _find_meta_charset(body: bytes) -> Optional[str]:
+
+    match = _meta_charset_regex.search(body, 0, CHARSET_SNIFF_BYTES)
+    return match.group(1).decode('ascii').lower() if match else None
+
+def _is_known_encoding(encoding: str) -> bool:
+
+    try:
+        codecs.lookup(encoding)
+        return True
+    except LookupError:
+        return False
+
 def get_content_type_category(content_type: str) -> str:
 
     if not content_type:
@@ -64,7 +122,7 @@ def get_content_type_category(content_type: str) -> str:
 
     content_type_lower = content_type.lower()
 
-    if 'text/html' in content_type_lower:
+    if 'text/html' in content_type_lower or 'application/xhtml+xml' in content_type_lower:
         return 'html'
     elif 'application/json' in content_type_lower or 'application/ld+json' in content_type_lower:
         return 'json'
@@ -0,0 +1,322 @@
+import os
+import io
+import gzip
+import uuid
+import zlib
+import logging
+import threading
+
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from typing import Dict, Iterator, List, Optional, Tuple, BinaryIO
+
+from app.config import WARC_MAX_FILE_SIZE
+
+logger = logging.getLogger(__name__)
+
+WARC_VERSION = 'WARC/1.1'
+WARC_READ_CHUNK_SIZE = 64 * 1024
+
+HOP_BY_HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'}
+
+class WarcRecord:
+
+    def __init__(self, headers: Dict[str, str], content: bytes):
+
+        self.headers = headers
+        self.content = content
+
+    @property
+    def record_type(self) -> str:
+
+        return self.headers.get('WARC-Type', '')
+
+    @property
+    def target_uri(self) -> str:
+
+        return self.headers.get('WARC-Target-URI', '')
+
+    @property
+    def is_truncated(self) -> bool:
+
+        return 'WARC-Truncated' in self.headers
+
+    def parse_http_response(self) -> Tuple[int, str, List[Tuple[str, str]], bytes]:
+
+        return parse_http_response(self.content)
+
+def parse_http_response(block: bytes) -> Tuple[int, str, List[Tuple[str, str]], bytes]:
+
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('iso-8859-1').split('\r\n')
+
+    status_parts = lines[0].split(' ', 2)
+    status = int(status_parts[1]) if len(status_parts) > 1 and status_parts[1].isdigit() else 0
+    reason = status_parts[2] if len(status_parts) > 2 else ''
+
+    headers = []
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers.append((name.strip(), value.strip()))
+
+    return status, reason, headers, body
+
+def build_http_response_head(status: int, reason: str, headers: List[Tuple[str, str]], body_length: int) -> bytes:
+
+    lines = [f"HTTP/1.1 {status} {reason or ''}".rstrip()]
+
+    for name, value in headers:
+        if name.lower() in HOP_BY_HOP_HEADERS:
+            continue
+        lines.append(f"{name}: {value}")
+
+    lines.append(f"Content-Length: {body_length}")
+
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('iso-8859-1', errors='replace')
+
+def build_http_request_block(method: str, url: str, headers: List[Tuple[str, str]]) -> bytes:
+
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}"]
+    lines.extend(f"{name}: {value}" for name, value in headers if name.lower() != 'host')
+
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('iso-8859-1', errors='replace')
+
+class WarcWriter:
+
+    def __init__(self, directory: str, prefix: str = 'crawl', max_file_size: int = WARC_MAX_FILE_SIZE):
+
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+
+        self.lock = threading.Lock()
+        self.file: Optional[BinaryIO] = None
+        self.file_path: Optional[str] = None
+        self.file_index = 0
+        self.records_written = 0
+
+    def write_request(self, url: str, method: str, headers: List[Tuple[str, str]]) -> str:
+
+        block = build_http_request_block(method, url, headers)
+        return self.write_record('request', url, 'application/http;msgtype=request', [block])
+
+    def write_response(self,
+                       url: str,
+                       status: int,
+                       reason: str,
+                       headers: List[Tuple[str, str]],
+                       body: BinaryIO,
+                       body_length: int,
+                       truncated: bool = False,
+                       concurrent_to: Optional[str] = None) -> str:
+
+        head = build_http_response_head(status, reason, headers, body_length)
+
+        extra_headers = {}
+        if truncated:
+            extra_headers['WARC-Truncated'] = 'unspecified'
+        if concurrent_to:
+            extra_headers['WARC-Concurrent-To'] = concurrent_to
+
+        return self.write_record(
+            'response', url, 'application/http;msgtype=response',
+            [head], body, body_length, extra_headers
+        )
+
+    def write_record(self,
+                     record_type: str,
+                     url: str,
+                     content_type: str,
+                     blocks: List[bytes],
+                     stream: Optional[BinaryIO] = None,
+                     stream_length: int = 0,
+                     extra_headers: Optional[Dict[str, str]] = None) -> str:
+
+        record_id = f"<urn:uuid:{uuid.uuid4()}>"
+        content_length = sum(len(block) for block in blocks) + stream_length
+
+        headers = {
+            'WARC-Type': record_type,
+            'WARC-Record-ID': record_id,
+            'WARC-Date': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'WARC-Target-URI': url,
+            'Content-Type': content_type,
+        }
+        headers.update(extra_headers or {})
+        headers['Content-Length'] = str(content_length)
+
+        header_bytes = WARC_VERSION + '\r\n' + ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + '\r\n'
+
+        with self.lock:
+            target = self._get_file()
+
+            with gzip.GzipFile(fileobj=target, mode='wb') as member:
+                member.write(header_bytes.encode('utf-8'))
+                for block in blocks:
+                    member.write(block)
+
+                if stream is not None:
+                    stream.seek(0)
+                    while True:
+                        chunk = stream.read(WARC_READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        member.write(chunk)
+
+                member.write(b'\r\n\r\n')
+
+            target.flush()
+            self.records_written += 1
+
+        return record_id
+
+    def close(self) -> None:
+
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def _get_file(self) -> BinaryIO:
+
+        if self.file and self.file.tell() >= self.max_file_size:
+            self.file.close()
+            self.file = None
+
+        if self.file is None:
+            os.makedirs(self.directory, exist_ok=True)
+
+            timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+            self.file_path = os.path.join(
+                self.directory,
+                f"{self.prefix}-{timestamp}-{os.getpid()}-{self.file_index:05d}.warc.gz"
+            )
+            self.file_index += 1
+            self.file = open(self.file_path, 'ab')
+
+            logger.info(f"Recording WARC records to {self.file_path}")
+
+        return self.file
+
+def list_warc_files(path: str) -> List[str]:
+
+    if os.path.isfile(path):
+        return [path]
+
+    if not os.path.isdir(path):
+        return []
+
+    files = []
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            if filename.endswith(('.warc', '.warc.gz')):
+                files.append(os.path.join(dirpath, filename))
+
+    return sorted(files)
+
+def iter_warc_records(path: str) -> Iterator[Tuple[int, WarcRecord]]:
+
+    if path.endswith('.gz'):
+        yield from _iter_gzip_members(path)
+        return
+
+    with open(path, 'rb') as f:
+        while True:
+            offset = f.tell()
+            record = _read_record(f)
+            if record is None:
+                break
+            yield offset, record
+
+def read_warc_record(path: str, offset: int) -> Optional[WarcRecord]:
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+
+        if not path.endswith('.gz'):
+            return _read_record(f)
+
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        data = bytearray()
+
+        while not decompressor.eof:
+            chunk = f.read(WARC_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data.extend(decompressor.decompress(chunk))
+
+        return _read_record(io.BytesIO(bytes(data)))
+
+def _iter_gzip_members(path: str) -> Iterator[Tuple[int, WarcRecord]]:
+
+    with open(path, 'rb') as f:
+        offset = 0
+        pending = b''
+
+        while True:
+            if not pending:
+                pending = f.read(WARC_READ_CHUNK_SIZE)
+                if not pending:
+                    break
+
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            member_start = offset
+            data = bytearray()
+
+            while True:
+                data.extend(decompressor.decompress(pending))
+
+                if decompressor.eof:
+                    consumed = len(pending) - len(decompressor.unused_data)
+                    offset += consumed
+                    pending = decompressor.unused_data
+                    break
+
+                offset += len(pending)
+                pending = f.read(WARC_READ_CHUNK_SIZE)
+                if not pending:
+                    break
+
+            if not decompressor.eof:
+                logger.warning(f"Truncated gzip member at offset {member_start} in {path}")
+                break
+
+            stream = io.BytesIO(bytes(data))
+            while True:
+                record = _read_record(stream)
+                if record is None:
+                    break
+                yield member_start, record
+
+def _read_record(stream: BinaryIO) -> Optional[WarcRecord]:
+
+    line = stream.readline()
+    while line in (b'\r\n', b'\n'):
+        line = stream.readline()
+
+    if not line:
+        return None
+
+    if not line.startswith(b'WARC/'):
+        logger.warning(f"Invalid WARC record header: {line[:40]!r}")
+        return None
+
+    headers = {}
+    while True:
+        line = stream.readline()
+        if not line or line in (b'\r\n', b'\n'):
+            break
+
+        name, _, value = line.decode('utf-8', errors='replace').partition(':')
+        headers[name.strip()] = value.strip()
+
+    content_length = int(headers.get('Content-Length', 0) or 0)
+    content = stream.read(content_length)
+
+    return WarcRecord(headers, content)
\ No newline at end of file
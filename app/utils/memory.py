@@ -0,0 +1,337 @@
+import gc
+import os
+import time
+import ctypes
+import asyncio
+import logging
+import resource
+import threading
+import ctypes.util
+
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import (
+    MEMORY_GOVERNOR, MEMORY_SOFT_LIMIT, MEMORY_HARD_LIMIT, MEMORY_LOW_WATER, MEMORY_SAMPLE_INTERVAL,
+    MEMORY_PAUSE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+CGROUP_LIMIT_PATHS = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+UNLIMITED_THRESHOLD = 1 << 60
+
+SOFT_LIMIT_RATIO = 0.7
+HARD_LIMIT_RATIO = 0.9
+LOW_WATER_RATIO = 0.85
+REARM_RATIO = 0.05
+
+_libc: Any = None
+_governor: Optional['MemoryGovernor'] = None
+_governor_lock = threading.Lock()
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+def read_rss() -> int:
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+def read_container_limit() -> int:
+
+    for path in CGROUP_LIMIT_PATHS:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+
+        if value.isdigit() and int(value) < UNLIMITED_THRESHOLD:
+            return int(value)
+
+    return 0
+
+def release_memory() -> None:
+
+    global _libc
+
+    gc.collect()
+
+    if _libc is None:
+        try:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c'))
+            _libc.malloc_trim
+        except (OSError, AttributeError, TypeError):
+            _libc = False
+
+    if _libc:
+        _libc.malloc_trim(0)
+
+class MemoryJob:
+
+    def __init__(self,
+                 governor: 'MemoryGovernor',
+                 name: str,
+                 size: Optional[Callable[[], int]] = None,
+                 shrink: Optional[Callable[[], Any]] = None):
+
+        self.governor = governor
+        self.name = name
+        self.size = size
+        self.shrink = shrink
+        self.failed: Optional[str] = None
+        self.shrink_requested = False
+
+        self.pauses = 0
+        self.paused_seconds = 0.0
+        self.shrinks = 0
+
+    def get_tracked_bytes(self) -> int:
+
+        if self.size is None:
+            return 0
+
+        try:
+            return self.size()
+        except Exception as e:
+            logger.debug(f"Error sizing memory job {self.name}: {e}")
+            return 0
+
+    def check(self) -> None:
+
+        if self.failed:
+            raise MemoryBudgetExceeded(self.failed)
+
+        if self.shrink_requested:
+            self.shrink_requested = False
+            self._shrink()
+
+    def _shrink(self) -> None:
+
+        if self.shrink is None:
+            return
+
+        try:
+            self.shrink()
+            self.shrinks += 1
+        except Exception as e:
+            logger.warning(f"Error shrinking memory job {self.name}: {e}")
+
+        release_memory()
+
+    async def wait(self) -> None:
+
+        await self.governor.wait(self)
+
+    def close(self) -> None:
+
+        self.governor.unregister(self)
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {'pauses': self.pauses, 'paused_seconds': round(self.paused_seconds, 3), 'shrinks': self.shrinks}
+
+class MemoryGovernor:
+
+    def __init__(self,
+                 soft_limit: int = 0,
+                 hard_limit: int = 0,
+                 low_water: int = 0,
+                 interval: float = MEMORY_SAMPLE_INTERVAL,
+                 pause_timeout: float = MEMORY_PAUSE_TIMEOUT):
+
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.low_water = low_water or int(soft_limit * LOW_WATER_RATIO)
+        self.interval = interval
+        self.pause_timeout = pause_timeout
+        self.enabled = soft_limit > 0 or hard_limit > 0
+
+        self.jobs: List[MemoryJob] = []
+        self.lock = threading.Lock()
+
+        self.rss = 0
+        self.peak_rss = 0
+        self.last_sample = 0.0
+        self.paused = False
+        self.paused_at = 0.0
+        self.soft_trigger = soft_limit
+
+        self.pauses = 0
+        self.pause_timeouts = 0
+        self.failed_jobs = 0
+
+    @classmethod
+    def from_settings(cls, shares: int = 1) -> 'MemoryGovernor':
+
+        if not MEMORY_GOVERNOR:
+            return cls()
+
+        # Each process only sees its own RSS, so processes sharing the container split its budget
+        shares = max(1, shares)
+        container_limit = read_container_limit()
+        soft_limit = (MEMORY_SOFT_LIMIT * MB or int(container_limit * SOFT_LIMIT_RATIO)) // shares
+        hard_limit = (MEMORY_HARD_LIMIT * MB or int(container_limit * HARD_LIMIT_RATIO)) // shares
+
+        governor = cls(soft_limit, hard_limit, MEMORY_LOW_WATER * MB // shares)
+
+        if governor.enabled:
+            share = f" (1/{shares} of the budget)" if shares > 1 else ''
+            logger.info(f"Memory governor: soft limit {soft_limit // MB} MB, hard limit {hard_limit // MB} MB, "
+                        f"low-water mark {governor.low_water // MB} MB{share}")
+
+        return governor
+
+    def register(self,
+                 name: str,
+                 size: Optional[Callable[[], int]] = None,
+                 shrink: Optional[Callable[[], Any]] = None) -> MemoryJob:
+
+        job = MemoryJob(self, name, size, shrink)
+
+        with self.lock:
+            self.jobs.append(job)
+
+        return job
+
+    def unregister(self, job: MemoryJob) -> None:
+
+        with self.lock:
+            if job in self.jobs:
+                self.jobs.remove(job)
+
+    def sample(self, force: bool = False) -> bool:
+
+        if not self.enabled:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_sample < self.interval:
+                return self.paused
+
+            self.last_sample = now
+            self._update_rss()
+
+            if self.hard_limit and self.rss >= self.hard_limit:
+                self._fail_largest_job()
+
+            if self.paused:
+                self._maybe_resume(now)
+            elif self.soft_limit and self.rss >= self.soft_trigger:
+                self._pause(now)
+
+            if not self.paused and self.rss <= self.low_water:
+                self.soft_trigger = self.soft_limit
+
+            return self.paused
+
+    async def wait(self, job: MemoryJob) -> None:
+
+        job.check()
+
+        if not self.sample():
+            return
+
+        started = time.monotonic()
+        job.pauses += 1
+
+        try:
+            while self.sample():
+                job.check()
+                await asyncio.sleep(self.interval)
+        finally:
+            job.paused_seconds += time.monotonic() - started
+
+        job.check()
+
+    def _update_rss(self) -> None:
+
+        self.rss = read_rss()
+        self.peak_rss = max(self.peak_rss, self.rss)
+
+    def _pause(self, now: float) -> None:
+
+        self.paused = True
+        self.paused_at = now
+        self.pauses += 1
+
+        logger.warning(f"Memory at {self.rss // MB} MB is over the soft limit of {self.soft_limit // MB} MB, "
+                       f"pausing crawl expansion and new downloads")
+
+        for job in self.jobs:
+            job.shrink_requested = job.shrink is not None
+
+        release_memory()
+
+    def _maybe_resume(self, now: float) -> None:
+
+        if self.rss <= self.low_water:
+            self.paused = False
+            logger.info(f"Memory back down to {self.rss // MB} MB, resuming")
+            return
+
+        if self.pause_timeout > 0 and now - self.paused_at >= self.pause_timeout:
+            self.paused = False
+            self.pause_timeouts += 1
+            self.soft_trigger = self.rss + int(self.soft_limit * REARM_RATIO)
+            logger.warning(f"Memory still at {self.rss // MB} MB after {self.pause_timeout:.0f}s, resuming; "
+                           f"pausing again above {self.soft_trigger // MB} MB")
+
+    def _fail_largest_job(self) -> None:
+
+        if any(job.failed for job in self.jobs):
+            return
+
+        candidates = [(job.get_tracked_bytes(), job) for job in self.jobs]
+        if not candidates:
+            return
+
+        size, victim = max(candidates, key=lambda candidate: candidate[0])
+        victim.failed = (f"Memory limit exceeded: {self.rss // MB} MB in use against a hard limit of "
+                         f"{self.hard_limit // MB} MB, stopped the largest job ({size // MB} MB tracked)")
+        self.failed_jobs += 1
+
+        logger.error(f"{victim.failed}: {victim.name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'enabled': self.enabled,
+            'rss_mb': self.rss // MB,
+            'peak_rss_mb': self.peak_rss // MB,
+            'soft_limit_mb': self.soft_limit // MB,
+            'hard_limit_mb': self.hard_limit // MB,
+            'paused': self.paused,
+            'pauses': self.pauses,
+            'pause_timeouts': self.pause_timeouts,
+            'failed_jobs': self.failed_jobs,
+            'jobs': len(self.jobs),
+        }
+
+def get_memory_governor() -> MemoryGovernor:
+
+    global _governor
+
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor.from_settings()
+
+    return _governor
+
+def configure_memory_governor(shares: int = 1) -> MemoryGovernor:
+
+    global _governor
+
+    with _governor_lock:
+        _governor = MemoryGovernor.from_settings(shares)
+
+    return _governor
@@ -0,0 +1,63 @@
+import os
+import time
+import fcntl
+
+from types import SimpleNamespace
+
+from app.services.cache.crawl_result_cache import CrawlResultCache
+
+def make_cache(tmp_path, **kwargs):
+
+    cache_manager = SimpleNamespace(get_shared_dir=lambda name: str(tmp_path))
+    return CrawlResultCache(cache_manager, **kwargs)
+
+def test_coalesce_removes_its_lock_file(tmp_path):
+
+    cache = make_cache(tmp_path)
+
+    with cache.coalesce('key') as waited:
+        assert not waited
+        assert os.path.exists(tmp_path / 'key.lock')
+
+    assert not os.path.exists(tmp_path / 'key.lock')
+
+    with cache.coalesce('key') as waited:
+        assert not waited
+    assert os.listdir(tmp_path) == []
+
+def test_coalesce_skips_lock_files_removed_by_the_previous_holder(tmp_path):
+
+    cache = make_cache(tmp_path, wait_timeout=5)
+    lock_path = tmp_path / 'key.lock'
+
+    # Locked and then unlinked, as a waiter sees it after the holder finished
+    orphan = open(lock_path, 'w')
+    fcntl.flock(orphan, fcntl.LOCK_EX)
+    os.remove(lock_path)
+
+    with cache.coalesce('key') as waited:
+        assert not waited
+        assert os.path.exists(lock_path)
+
+    orphan.close()
+
+def test_purge_expired_sweeps_stale_lock_files(tmp_path):
+
+    cache = make_cache(tmp_path, ttl=0, wait_timeout=60)
+    stale, fresh, held = (tmp_path / f"{name}.lock" for name in ('stale', 'fresh', 'held'))
+
+    for path in (stale, fresh, held):
+        path.touch()
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+    os.utime(held, (old, old))
+
+    with open(held, 'a') as holder:
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        os.utime(held, (old, old))
+        cache.purge_expired()
+
+    assert not stale.exists()
+    assert fresh.exists()
+    assert held.exists()
+    cache.close()
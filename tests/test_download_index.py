@@ -0,0 +1,114 @@
+import os
+import json
+import asyncio
+import hashlib
+
+import aiohttp
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.services.cache.download_index import DownloadIndex
+from app.services.cache.media_store import MediaStore
+from app.services.media.download_handler import DownloadHandler
+
+def write_file(path, data):
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+def test_complete_downloads_are_reused_after_reload(tmp_path):
+
+    index = DownloadIndex(str(tmp_path / 'downloads.jsonl'))
+    file_path = write_file(tmp_path / 'images' / 'a.jpg', b'image')
+
+    index.record('https://example.com/a.jpg', file_path, 'image/jpeg', {'etag': '"a"'})
+    assert not os.path.exists(index.index_path)
+
+    index.close()
+    reloaded = DownloadIndex(index.index_path)
+
+    assert reloaded.entries['https://example.com/a.jpg']['file'] == os.path.join('images', 'a.jpg')
+    assert reloaded.find_complete('https://example.com/a.jpg') == file_path
+    assert reloaded.get_stats() == {'indexed': 1, 'reused': 1, 'stale': 0}
+
+def test_changed_files_are_dropped_from_the_index(tmp_path):
+
+    index = DownloadIndex(str(tmp_path / 'downloads.jsonl'))
+    file_path = write_file(tmp_path / 'a.jpg', b'image')
+    index.record('https://example.com/a.jpg', file_path, 'image/jpeg')
+
+    write_file(tmp_path / 'a.jpg', b'img')
+
+    assert index.find_complete('https://example.com/a.jpg') is None
+    assert index.get_stats() == {'indexed': 0, 'reused': 0, 'stale': 1}
+
+    index.close()
+    assert DownloadIndex(index.index_path).entries == {}
+
+def test_writes_are_batched(tmp_path):
+
+    index = DownloadIndex(str(tmp_path / 'downloads.jsonl'))
+    file_path = write_file(tmp_path / 'a.jpg', b'image')
+
+    for number in range(index.FLUSH_INTERVAL - 1):
+        index.record(f"https://example.com/{number}.jpg", file_path, 'image/jpeg')
+    assert not index.needs_flush()
+
+    index.record('https://example.com/last.jpg', file_path, 'image/jpeg')
+    assert index.needs_flush()
+
+    index.flush()
+    with open(index.index_path) as f:
+        assert sum(1 for _ in f) == index.FLUSH_INTERVAL
+
+def test_index_is_compacted_on_load(tmp_path):
+
+    index_path = tmp_path / 'downloads.jsonl'
+    file_path = write_file(tmp_path / 'a.jpg', b'image')
+    index = DownloadIndex(str(index_path))
+
+    for _ in range(DownloadIndex.COMPACT_MIN_LINES):
+        index.record('https://example.com/a.jpg', file_path, 'image/jpeg')
+    index.record('https://example.com/b.jpg', file_path, 'image/jpeg')
+    index.remove('https://example.com/b.jpg')
+    index.close()
+
+    reloaded = DownloadIndex(str(index_path))
+
+    with open(index_path) as f:
+        lines = [json.loads(line) for line in f]
+
+    assert [entry['url'] for entry in lines] == ['https://example.com/a.jpg']
+    assert list(reloaded.entries) == ['https://example.com/a.jpg']
+
+def test_stale_entries_are_revalidated_with_their_validators(tmp_path):
+
+    body = b'\x89PNG\r\n\x1a\n' + b'0' * 64
+    digest = hashlib.sha256(body).hexdigest()
+    store = MediaStore(str(tmp_path / 'store'))
+    store.add(digest, len(body), str(tmp_path / 'old.png'), 'session', data=body)
+    requests = []
+
+    async def image(request):
+
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304, headers={'ETag': '"v1"'})
+        return web.Response(body=body, content_type='image/png', headers={'ETag': '"v1"'})
+
+    async def run():
+
+        app = web.Application()
+        app.router.add_get('/a.png', image)
+
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            handler = DownloadHandler(session, media_store=store, session_id='session')
+            indexed = {'digest': digest, 'size': len(body), 'etag': '"v1"', 'mime_type': 'image/png'}
+            return await handler.download_file(str(server.make_url('/a.png')), str(tmp_path / 'new.png'), indexed)
+
+    assert asyncio.run(run()) == (True, 'image/png', len(body))
+    assert requests == ['"v1"']
+    assert (tmp_path / 'new.png').read_bytes() == body
+    store.close()
@@ -0,0 +1,96 @@
+import random
+
+from app.services.crawler.frontier import FifoFrontier, SpillingFifoFrontier, SpillingPriorityFrontier
+
+def drain(frontier):
+
+    popped = []
+    while len(frontier):
+        popped.append(frontier.pop())
+    return popped
+
+def test_spilling_priority_frontier_pops_in_score_order(tmp_path):
+
+    frontier = SpillingPriorityFrontier(memory_limit=8, spill_dir=str(tmp_path), batch_size=4)
+    rng = random.Random(7)
+    scores = [rng.randint(0, 20) for _ in range(200)]
+
+    for index, score in enumerate(scores):
+        frontier.push(f"https://example.com/{index}", 1, float(score))
+
+    assert len(frontier.store) > 0
+    assert len(frontier) == len(scores)
+
+    expected = sorted(range(len(scores)), key=lambda index: (-scores[index], index))
+    assert drain(frontier) == [(f"https://example.com/{index}", 1) for index in expected]
+    assert frontier.pop() is None
+
+def test_spilling_priority_frontier_interleaves_pushes_and_pops(tmp_path):
+
+    frontier = SpillingPriorityFrontier(memory_limit=8, spill_dir=str(tmp_path), batch_size=4)
+    reference = []
+    rng = random.Random(11)
+    sequence = 0
+
+    for _ in range(300):
+        if reference and rng.random() < 0.4:
+            reference.sort()
+            _, _, url = reference.pop(0)
+            assert frontier.pop() == (url, 0)
+        else:
+            score = float(rng.randint(0, 10))
+            url = f"https://example.com/{sequence}"
+            frontier.push(url, 0, score)
+            reference.append((-score, sequence, url))
+            sequence += 1
+
+    reference.sort()
+    assert drain(frontier) == [(url, 0) for _, _, url in reference]
+
+def test_shrink_keeps_priority_order(tmp_path):
+
+    frontier = SpillingPriorityFrontier(memory_limit=1000, spill_dir=str(tmp_path), batch_size=4)
+
+    for index in range(50):
+        frontier.push(index, 0, float(index % 7))
+
+    assert frontier.shrink() == 46
+    assert frontier.in_memory() == 4
+
+    expected = sorted(range(50), key=lambda index: (-(index % 7), index))
+    assert [url for url, _ in drain(frontier)] == expected
+
+def test_spilling_fifo_frontier_keeps_insertion_order(tmp_path):
+
+    frontier = SpillingFifoFrontier(memory_limit=4, spill_dir=str(tmp_path), batch_size=4)
+    reference = FifoFrontier()
+
+    for index in range(40):
+        frontier.push(index, index % 3)
+        reference.push(index, index % 3)
+
+    assert len(frontier.store) > 0
+
+    for _ in range(10):
+        assert frontier.pop() == reference.pop()
+
+    for index in range(40, 60):
+        frontier.push(index, 0)
+        reference.push(index, 0)
+
+    assert drain(frontier) == drain(reference)
+
+def test_clear_discards_spilled_entries(tmp_path):
+
+    frontier = SpillingPriorityFrontier(memory_limit=8, spill_dir=str(tmp_path), batch_size=4)
+
+    for index in range(50):
+        frontier.push(index, 0, float(index))
+
+    frontier.clear()
+
+    assert len(frontier) == 0
+    assert frontier.pop() is None
+
+    frontier.push('https://example.com/', 0, 1.0)
+    assert frontier.pop() == ('https://example.com/', 0)
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.utils.http.latency import HedgedRequester, HostLatencyTracker
+
+class FakeRequest:
+
+    def __init__(self, delay, events, on_enter=None):
+
+        self.delay = delay
+        self.events = events
+        self.on_enter = on_enter
+
+    async def __aenter__(self):
+
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.events.append('cancelled')
+            raise
+        if self.on_enter is not None:
+            self.on_enter()
+        return self
+
+    async def __aexit__(self, *args):
+
+        self.events.append('released')
+
+def make_requester(hedge_delay):
+
+    tracker = HostLatencyTracker()
+    tracker.get_hedge_delay = lambda url: hedge_delay
+    return HedgedRequester(tracker, enabled=True)
+
+async def cancel_open(requester, delays, events):
+
+    delays = iter(delays)
+    task = asyncio.ensure_future(requester.open('https://example.com/', lambda: FakeRequest(next(delays), events)))
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+
+def test_cancelling_an_unhedged_request_cancels_the_primary():
+
+    events = []
+    asyncio.run(cancel_open(make_requester(None), [10], events))
+
+    assert events == ['cancelled']
+
+def test_cancelling_before_the_hedge_delay_cancels_the_primary():
+
+    events = []
+    asyncio.run(cancel_open(make_requester(5), [10], events))
+
+    assert events == ['cancelled']
+
+def test_response_arriving_as_the_caller_is_cancelled_is_released():
+
+    events = []
+    requester = make_requester(5)
+
+    async def run():
+
+        # The primary finishes in the same step that the caller is cancelled
+        task = asyncio.ensure_future(requester.open('https://example.com/', lambda: FakeRequest(0.01, events, lambda: task.cancel())))
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+
+    assert events == ['released']
+
+def test_cancelling_a_hedged_request_cancels_both_requests():
+
+    events = []
+    requester = make_requester(0.01)
+    asyncio.run(cancel_open(requester, [10, 10], events))
+
+    assert requester.hedges == 1
+    assert events == ['cancelled', 'cancelled']
+
+def test_hedge_win_releases_the_slower_response():
+
+    events = []
+    requester = make_requester(0.01)
+
+    async def run():
+
+        delays = iter([0.2, 0.02])
+        context, response = await requester.open('https://example.com/', lambda: FakeRequest(next(delays), events))
+        await asyncio.sleep(0.01)
+        return context, response
+
+    context, response = asyncio.run(run())
+
+    assert response is context
+    assert context.delay == 0.02
+    assert requester.get_stats() == {'requests': 1, 'hedges': 1, 'hedge_wins': 1}
+    assert events == ['cancelled']
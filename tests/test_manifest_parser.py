@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from app.services.media import stream_handler
+from app.services.media.manifest_parser import (
+    DASH, HLS, ManifestError, Rendition, Segment, load_hls_media_playlist, parse_iso_duration, parse_manifest
+)
+from app.services.media.stream_handler import StreamHandler
+
+MASTER_PLAYLIST = """#EXTM3U
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="en",URI="audio/en.m3u8"
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="fr",DEFAULT=YES,URI="audio/fr.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2",AUDIO="aac"
+low/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=4000000,RESOLUTION=1920x1080,AUDIO="aac"
+https://cdn.example.com/high/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=64000,CODECS="mp4a.40.2"
+audio-only.m3u8
+"""
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-TARGETDURATION:6
+#EXT-X-MAP:URI="init.mp4",BYTERANGE="720@0"
+#EXTINF:6.0,
+#EXT-X-BYTERANGE:1000@720
+media.mp4
+#EXTINF:4.5,
+#EXT-X-BYTERANGE:500
+media.mp4
+#EXT-X-ENDLIST
+"""
+
+DASH_MANIFEST = """<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT10S">
+  <BaseURL>https://cdn.example.com/video/</BaseURL>
+  <Period>
+    <AdaptationSet contentType="video">
+      <SegmentTemplate timescale="1000" initialization="$RepresentationID$/init.mp4" media="$RepresentationID$/$Number%03d$.m4s" startNumber="1">
+        <SegmentTimeline>
+          <S t="0" d="4000" r="1"/>
+          <S d="2000"/>
+        </SegmentTimeline>
+      </SegmentTemplate>
+      <Representation id="720p" bandwidth="3000000" width="1280" height="720"/>
+    </AdaptationSet>
+    <AdaptationSet mimeType="audio/mp4">
+      <Representation id="aac" bandwidth="128000">
+        <SegmentTemplate media="aac-$Number$.m4s" duration="4" startNumber="0"/>
+      </Representation>
+      <Representation id="empty" bandwidth="64000"/>
+    </AdaptationSet>
+    <AdaptationSet contentType="text">
+      <Representation id="subs" bandwidth="100"><BaseURL>subs.vtt</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+def test_hls_master_playlist_lists_renditions_and_audio_groups():
+
+    manifest = parse_manifest('https://example.com/stream/master.m3u8', MASTER_PLAYLIST)
+
+    assert manifest.kind == HLS
+    assert [(r.bandwidth, r.width, r.height, r.url) for r in manifest.video] == [
+        (800000, 640, 360, 'https://example.com/stream/low/index.m3u8'),
+        (4000000, 1920, 1080, 'https://cdn.example.com/high/index.m3u8'),
+    ]
+    assert [r.url for r in manifest.audio] == ['https://example.com/stream/audio-only.m3u8']
+    assert manifest.audio_groups['aac'].url == 'https://example.com/stream/audio/fr.m3u8'
+
+def test_hls_media_playlist_reads_byte_ranges_and_init_segment():
+
+    rendition = Rendition('video', url='https://example.com/v/index.m3u8')
+    load_hls_media_playlist(rendition, MEDIA_PLAYLIST)
+
+    assert rendition.duration == 10.5
+    assert rendition.init_segment.get_headers() == {'Range': 'bytes=0-719'}
+    assert [segment.get_headers() for segment in rendition.segments] == [
+        {'Range': 'bytes=720-1719'},
+        {'Range': 'bytes=1720-2219'},
+    ]
+    assert {segment.url for segment in rendition.segments} == {'https://example.com/v/media.mp4'}
+
+def test_encrypted_hls_is_rejected():
+
+    with pytest.raises(ManifestError):
+        load_hls_media_playlist(Rendition('video', url='https://example.com/v.m3u8'),
+                                '#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="key"\n#EXTINF:4,\na.ts\n')
+
+def test_dash_templates_timelines_and_segmentless_representations():
+
+    manifest = parse_manifest('https://example.com/manifest.mpd', DASH_MANIFEST)
+
+    assert manifest.kind == DASH
+    assert manifest.duration == 10
+
+    video, = manifest.video
+    assert video.init_segment.url == 'https://cdn.example.com/video/720p/init.mp4'
+    assert [segment.url.rsplit('/', 1)[1] for segment in video.segments] == ['001.m4s', '002.m4s', '003.m4s']
+
+    audio, = manifest.audio
+    assert audio.bandwidth == 128000
+    assert [segment.url.rsplit('/', 1)[1] for segment in audio.segments] == ['aac-0.m4s', 'aac-1.m4s', 'aac-2.m4s']
+
+def test_parse_iso_duration():
+
+    assert parse_iso_duration('PT1H2M3.5S') == 3723.5
+    assert parse_iso_duration('P1DT1S') == 86401
+    assert parse_iso_duration('garbage') == 0.0
+    assert parse_iso_duration(None) == 0.0
+
+def loaded_rendition(kind, bandwidth, audio_group=None):
+
+    rendition = Rendition(kind, bandwidth=bandwidth, url=f"https://example.com/{kind}-{bandwidth}.m3u8", audio_group=audio_group)
+    rendition.segments = [Segment(f"https://example.com/{kind}-{bandwidth}.ts")]
+    rendition.duration = 100
+    return rendition
+
+def make_manifest(videos, audios=()):
+
+    manifest = parse_manifest('https://example.com/master.m3u8', '#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nx.m3u8\n')
+    manifest.video = list(videos)
+    manifest.audio = list(audios)
+    manifest.duration = 100
+    return manifest
+
+def test_selection_picks_the_best_rendition_within_the_size_limit(monkeypatch):
+
+    monkeypatch.setattr(stream_handler, 'MAX_VIDEO_SIZE', 50_000_000)
+    handler = StreamHandler(None)
+    handler.ffmpeg = None
+
+    # 100 seconds at 8 Mbps is 100 MB, at 2 Mbps 25 MB
+    manifest = make_manifest([loaded_rendition('video', 2_000_000), loaded_rendition('video', 8_000_000)],
+                             [loaded_rendition('audio', 128_000)])
+    video, audio = asyncio.run(handler._select_renditions(manifest))
+
+    assert video.bandwidth == 2_000_000
+    assert audio is None
+
+    manifest = make_manifest([loaded_rendition('video', 20_000_000), loaded_rendition('video', 8_000_000)])
+    video, _ = asyncio.run(handler._select_renditions(manifest))
+
+    assert video.bandwidth == 8_000_000
+
+def test_selection_pairs_video_with_its_audio_group_when_remuxing(monkeypatch):
+
+    monkeypatch.setattr(stream_handler, 'MAX_VIDEO_SIZE', 50_000_000)
+    handler = StreamHandler(None)
+    handler.ffmpeg = '/usr/bin/ffmpeg'
+
+    manifest = make_manifest([loaded_rendition('video', 2_000_000, audio_group='aac')])
+    manifest.audio_groups['aac'] = loaded_rendition('audio', 96_000)
+
+    video, audio = asyncio.run(handler._select_renditions(manifest))
+
+    assert video.bandwidth == 2_000_000
+    assert audio is manifest.audio_groups['aac']
@@ -0,0 +1,115 @@
+from email.utils import formatdate
+
+import pytest
+
+from app.services.cache.media_cache import (
+    HEURISTIC_MAX_AGE, MediaHttpCache, get_current_age, get_freshness_lifetime, parse_cache_control
+)
+
+NOW = 1_700_000_000.0
+
+def http_date(timestamp: float) -> str:
+
+    return formatdate(timestamp, usegmt=True)
+
+def test_parse_cache_control():
+
+    assert parse_cache_control('public, max-age="60", No-Cache') == {'public': None, 'max-age': '60', 'no-cache': None}
+    assert parse_cache_control(None) == {}
+
+@pytest.mark.parametrize('headers, lifetime', [
+    ({'Cache-Control': 'max-age=300'}, 300),
+    ({'Cache-Control': 'max-age=300', 'Expires': http_date(NOW + 10)}, 300),
+    ({'Cache-Control': 'max-age=oops'}, 0),
+    ({'Cache-Control': 'no-cache, max-age=300'}, 0),
+    ({'Cache-Control': 'no-store'}, None),
+    ({'Date': http_date(NOW), 'Expires': http_date(NOW + 120)}, 120),
+    ({'Date': http_date(NOW), 'Expires': http_date(NOW - 120)}, 0),
+    ({'Date': http_date(NOW), 'Expires': '0'}, 0),
+    ({'Date': http_date(NOW), 'Last-Modified': http_date(NOW - 1000)}, 100),
+    ({'Date': http_date(NOW), 'Last-Modified': http_date(NOW - 365 * 86400)}, HEURISTIC_MAX_AGE),
+    ({'Date': http_date(NOW), 'Last-Modified': http_date(NOW + 1000)}, 0),
+    ({}, 0),
+])
+def test_freshness_lifetime(headers, lifetime):
+
+    assert get_freshness_lifetime(headers, NOW) == lifetime
+
+def test_expires_without_date_is_relative_to_now():
+
+    assert get_freshness_lifetime({'Expires': http_date(NOW + 60)}, NOW) == 60
+
+@pytest.mark.parametrize('headers, age', [
+    ({}, 0),
+    ({'Age': '30'}, 30),
+    ({'Age': 'bogus'}, 0),
+    ({'Age': '-5'}, 0),
+    ({'Date': http_date(NOW - 50)}, 50),
+    ({'Date': http_date(NOW - 50), 'Age': '20'}, 50),
+    ({'Date': http_date(NOW - 10), 'Age': '40'}, 40),
+    ({'Date': http_date(NOW + 60)}, 0),
+])
+def test_current_age(headers, age):
+
+    assert get_current_age(headers, NOW) == age
+
+def test_stored_freshness_accounts_for_age(tmp_path):
+
+    cache = MediaHttpCache(str(tmp_path), max_age=0)
+
+    cache.store('https://example.com/a.png', {'Cache-Control': 'max-age=100', 'Age': '40'}, 'a' * 64, 10, 'image/png')
+    entry = cache.lookup('https://example.com/a.png')
+
+    assert entry['fresh_until'] - entry['fetched_at'] == pytest.approx(60)
+    assert cache.is_fresh(entry)
+
+    cache.store('https://example.com/b.png', {'Cache-Control': 'max-age=100', 'Age': '500', 'ETag': '"b"'},
+                'b' * 64, 10, 'image/png')
+    entry = cache.lookup('https://example.com/b.png')
+
+    assert entry['fresh_until'] == entry['fetched_at']
+    assert not cache.is_fresh(entry)
+    assert cache.get_conditional_headers(entry) == {'If-None-Match': '"b"'}
+
+    cache.close()
+
+def test_max_age_caps_the_lifetime(tmp_path):
+
+    cache = MediaHttpCache(str(tmp_path), max_age=10)
+
+    cache.store('https://example.com/a.png', {'Cache-Control': 'max-age=3600'}, 'a' * 64, 10, 'image/png')
+    entry = cache.lookup('https://example.com/a.png')
+
+    assert entry['fresh_until'] - entry['fetched_at'] == pytest.approx(10)
+
+    cache.close()
+
+def test_uncacheable_responses_are_not_stored(tmp_path):
+
+    cache = MediaHttpCache(str(tmp_path))
+
+    cache.store('https://example.com/a.png', {'Cache-Control': 'no-store', 'ETag': '"a"'}, 'a' * 64, 10, 'image/png')
+    cache.store('https://example.com/b.png', {}, 'b' * 64, 10, 'image/png')
+
+    assert cache.lookup('https://example.com/a.png') is None
+    assert cache.lookup('https://example.com/b.png') is None
+
+    cache.close()
+
+def test_refresh_keeps_validators_and_applies_new_freshness(tmp_path):
+
+    cache = MediaHttpCache(str(tmp_path), max_age=0)
+
+    cache.store('https://example.com/a.png', {'Cache-Control': 'no-cache', 'ETag': '"v1"'}, 'a' * 64, 10, 'image/png')
+    entry = cache.lookup('https://example.com/a.png')
+    assert not cache.is_fresh(entry)
+
+    cache.refresh('https://example.com/a.png', entry, {'Cache-Control': 'max-age=120', 'Age': '20'})
+    refreshed = cache.lookup('https://example.com/a.png')
+
+    assert refreshed['etag'] == '"v1"'
+    assert refreshed['digest'] == 'a' * 64
+    assert refreshed['fresh_until'] - refreshed['fetched_at'] == pytest.approx(100)
+    assert cache.get_stats()['revalidated'] == 1
+
+    cache.close()
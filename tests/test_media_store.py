@@ -0,0 +1,78 @@
+import os
+import hashlib
+
+from app.services.cache import media_store
+from app.services.cache.media_store import MediaStore
+
+def store_bytes(store, data, destination, session_id):
+
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, store.add(digest, len(data), str(destination), session_id, data=data)
+
+def test_identical_media_is_stored_once_and_hardlinked(tmp_path):
+
+    store = MediaStore(str(tmp_path / 'store'))
+    first, second = tmp_path / 'a' / 'one.jpg', tmp_path / 'b' / 'two.jpg'
+    first.parent.mkdir()
+    second.parent.mkdir()
+
+    digest, deduplicated = store_bytes(store, b'image', first, 'a')
+    assert not deduplicated
+
+    _, deduplicated = store_bytes(store, b'image', second, 'b')
+    assert deduplicated
+
+    blob_path = store.get_blob_path(digest)
+    assert os.stat(blob_path).st_ino == first.stat().st_ino == second.stat().st_ino
+    assert os.stat(blob_path).st_nlink == 3
+    assert store.get_stats() == {'stored': 1, 'deduplicated': 1, 'bytes_saved': 5}
+    store.close()
+
+def test_release_session_keeps_blobs_that_other_sessions_use(tmp_path):
+
+    store = MediaStore(str(tmp_path / 'store'))
+    first, second = tmp_path / 'one.jpg', tmp_path / 'two.jpg'
+
+    digest, _ = store_bytes(store, b'shared', first, 'a')
+    store_bytes(store, b'shared', second, 'b')
+    blob_path = store.get_blob_path(digest)
+
+    first.unlink()
+    assert store.release_session('a') == 0
+    assert os.path.exists(blob_path)
+
+    second.unlink()
+    assert store.release_session('b') == 1
+    assert not os.path.exists(blob_path)
+    store.close()
+
+def test_release_session_skips_blobs_still_linked_on_disk(tmp_path):
+
+    store = MediaStore(str(tmp_path / 'store'))
+    digest, _ = store_bytes(store, b'kept', tmp_path / 'kept.jpg', 'a')
+
+    assert store.release_session('a') == 0
+    assert os.path.exists(store.get_blob_path(digest))
+    store.close()
+
+def test_garbage_collection_removes_unlinked_blobs_and_stale_temp_files(tmp_path, monkeypatch):
+
+    store = MediaStore(str(tmp_path / 'store'))
+    orphan, _ = store_bytes(store, b'orphan', tmp_path / 'orphan.jpg', 'a')
+    kept, _ = store_bytes(store, b'kept', tmp_path / 'kept.jpg', 'b')
+    (tmp_path / 'orphan.jpg').unlink()
+    temp_path = store.create_temp_file()
+
+    assert store.collect_garbage() == 0
+
+    monkeypatch.setattr(media_store, 'ORPHAN_GRACE_PERIOD', -60)
+
+    assert store.collect_garbage() == 1
+    assert not os.path.exists(store.get_blob_path(orphan))
+    assert os.path.exists(store.get_blob_path(kept))
+    assert not os.path.exists(temp_path)
+
+    # A session that still references a collected digest stores it again
+    _, deduplicated = store_bytes(store, b'orphan', tmp_path / 'again.jpg', 'a')
+    assert not deduplicated
+    store.close()
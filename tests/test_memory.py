@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.utils import memory
+from app.utils.memory import MB, MemoryBudgetExceeded, MemoryGovernor
+
+@pytest.fixture
+def rss(monkeypatch):
+
+    current = {'value': 0}
+    monkeypatch.setattr(memory, 'read_rss', lambda: current['value'])
+    monkeypatch.setattr(memory, 'release_memory', lambda: None)
+    return current
+
+def test_disabled_without_limits(rss):
+
+    governor = MemoryGovernor()
+    rss['value'] = 10 * 1024 * MB
+
+    assert not governor.enabled
+    assert not governor.sample(force=True)
+
+def test_pauses_above_soft_limit_and_resumes_below_low_water(rss):
+
+    governor = MemoryGovernor(soft_limit=100 * MB, hard_limit=200 * MB, low_water=80 * MB, pause_timeout=0)
+    shrinks = []
+    governor.register('crawl', shrink=lambda: shrinks.append(True))
+
+    rss['value'] = 90 * MB
+    assert not governor.sample(force=True)
+
+    rss['value'] = 120 * MB
+    assert governor.sample(force=True)
+    assert governor.jobs[0].shrink_requested
+
+    rss['value'] = 90 * MB
+    assert governor.sample(force=True)
+
+    rss['value'] = 70 * MB
+    assert not governor.sample(force=True)
+    assert governor.get_stats()['pauses'] == 1
+
+def test_pause_timeout_resumes_and_rearms_above_current_rss(rss, monkeypatch):
+
+    governor = MemoryGovernor(soft_limit=100 * MB, hard_limit=0, low_water=80 * MB, pause_timeout=5)
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(memory.time, 'monotonic', lambda: clock['now'])
+
+    rss['value'] = 110 * MB
+    assert governor.sample(force=True)
+
+    clock['now'] += 6
+    assert not governor.sample(force=True)
+    assert governor.pause_timeouts == 1
+    assert governor.soft_trigger == 110 * MB + int(100 * MB * memory.REARM_RATIO)
+
+    assert not governor.sample(force=True)
+
+    rss['value'] = 120 * MB
+    assert governor.sample(force=True)
+
+def test_hard_limit_fails_only_the_largest_job(rss):
+
+    governor = MemoryGovernor(soft_limit=100 * MB, hard_limit=200 * MB, low_water=80 * MB)
+    small = governor.register('small', size=lambda: 10 * MB)
+    large = governor.register('large', size=lambda: 50 * MB)
+
+    rss['value'] = 250 * MB
+    governor.sample(force=True)
+
+    assert large.failed
+    assert not small.failed
+    assert governor.failed_jobs == 1
+
+    with pytest.raises(MemoryBudgetExceeded):
+        large.check()
+
+    small.check()
+
+def test_wait_returns_after_memory_drops(rss):
+
+    governor = MemoryGovernor(soft_limit=100 * MB, hard_limit=0, low_water=80 * MB, interval=0.01, pause_timeout=0)
+    job = governor.register('crawl')
+    rss['value'] = 150 * MB
+
+    async def release_later():
+
+        await asyncio.sleep(0.05)
+        rss['value'] = 50 * MB
+
+    async def run():
+
+        await asyncio.gather(job.wait(), release_later())
+
+    asyncio.run(run())
+
+    assert job.pauses == 1
+    assert job.paused_seconds > 0
+
+def test_shards_split_the_container_budget(monkeypatch):
+
+    monkeypatch.setattr(memory, 'MEMORY_GOVERNOR', True)
+    monkeypatch.setattr(memory, 'MEMORY_SOFT_LIMIT', 0)
+    monkeypatch.setattr(memory, 'MEMORY_HARD_LIMIT', 0)
+    monkeypatch.setattr(memory, 'MEMORY_LOW_WATER', 0)
+    monkeypatch.setattr(memory, 'read_container_limit', lambda: 1000 * MB)
+
+    whole = MemoryGovernor.from_settings()
+    shard = MemoryGovernor.from_settings(4)
+
+    assert whole.soft_limit == int(1000 * MB * memory.SOFT_LIMIT_RATIO)
+    assert shard.soft_limit == whole.soft_limit // 4
+    assert shard.hard_limit == whole.hard_limit // 4
+    assert shard.low_water == int(shard.soft_limit * memory.LOW_WATER_RATIO)
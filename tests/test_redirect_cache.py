@@ -0,0 +1,66 @@
+import time
+
+from types import SimpleNamespace
+
+from app.services.cache.redirect_cache import RedirectCache
+
+def make_response(final_url, *hops):
+
+    history = tuple(SimpleNamespace(url=url, status=status) for url, status in hops)
+    return SimpleNamespace(url=final_url, history=history)
+
+def test_permanent_hops_are_recorded_and_chains_resolve(tmp_path):
+
+    cache = RedirectCache(str(tmp_path))
+    response = make_response(
+        'https://www.example.com/new',
+        ('http://example.com/old', 301),
+        ('https://example.com/old', 302),
+        ('https://example.com/moved', 308),
+    )
+
+    assert cache.record('http://example.com/old', response) == 3
+
+    # The temporary 302 hop is not cached, so the chain stops at its source
+    assert cache.resolve('http://example.com/old') == 'https://example.com/old'
+    assert cache.resolve('https://example.com/moved') == 'https://www.example.com/new'
+    assert cache.resolve('https://example.com/unknown') == 'https://example.com/unknown'
+    assert cache.get_stats() == {'hops': 3, 'rewritten': 2, 'recorded': 2}
+    cache.close()
+
+def test_resolve_stops_at_loops(tmp_path):
+
+    cache = RedirectCache(str(tmp_path))
+    cache.targets = {'https://a.example/': 'https://b.example/', 'https://b.example/': 'https://a.example/'}
+
+    assert cache.resolve('https://a.example/') == 'https://b.example/'
+    cache.close()
+
+def test_chains_across_hosts_load_from_disk(tmp_path):
+
+    writer = RedirectCache(str(tmp_path))
+    writer.record('https://a.example/start', make_response('https://b.example/middle', ('https://a.example/start', 301)))
+    writer.record('https://b.example/middle', make_response('https://c.example/end', ('https://b.example/middle', 301)))
+    writer.close()
+
+    reader = RedirectCache(str(tmp_path))
+    assert reader.get_unloaded_hosts(['https://a.example/start']) == {'a.example'}
+
+    reader.load_hosts({'a.example'})
+
+    assert reader.loaded_hosts == {'a.example', 'b.example', 'c.example'}
+    assert reader.resolve('https://a.example/start') == 'https://c.example/end'
+    reader.close()
+
+def test_expired_redirects_are_ignored(tmp_path):
+
+    writer = RedirectCache(str(tmp_path))
+    writer.record('https://a.example/old', make_response('https://a.example/new', ('https://a.example/old', 301)))
+    writer.pending = [row[:4] + (time.time() - 7200,) for row in writer.pending]
+    writer.close()
+
+    reader = RedirectCache(str(tmp_path), ttl=3600)
+    reader.load_hosts({'a.example'})
+
+    assert reader.resolve('https://a.example/old') == 'https://a.example/old'
+    reader.close()
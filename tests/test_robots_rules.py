@@ -0,0 +1,220 @@
+import pytest
+
+from app.services.crawler.robots_rules import RobotsRules, get_product_token, normalize_robots_path
+
+USER_AGENT = 'ExampleBot/1.0 (+https://example.com/bot)'
+
+def compile_rules(robots_txt: str, user_agent: str = USER_AGENT) -> RobotsRules:
+
+    return RobotsRules.parse(robots_txt.strip().splitlines(), user_agent)
+
+def test_product_token():
+
+    assert get_product_token(USER_AGENT) == 'examplebot'
+    assert get_product_token('') == '*'
+
+def test_normalize_path_percent_encodes_utf8_and_uppercases_escapes():
+
+    assert normalize_robots_path('/path/ツ') == '/path/%E3%83%84'
+    assert normalize_robots_path('/path/%e3%83%84') == '/path/%E3%83%84'
+    assert normalize_robots_path('page') == '/page'
+
+@pytest.mark.parametrize('path, allowed', [
+    ('/page', True),
+    ('/p', True),
+    ('/other', False),
+])
+def test_longest_match_wins(path, allowed):
+
+    rules = compile_rules("""
+        User-agent: *
+        Allow: /p
+        Disallow: /
+    """)
+
+    assert rules.is_allowed(path) is allowed
+
+def test_allow_wins_equal_length_tie():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /folder
+        Allow: /folder
+    """)
+
+    assert rules.is_allowed('/folder/page')
+
+def test_longer_wildcard_rule_beats_shorter_literal_rule():
+
+    rules = compile_rules("""
+        User-agent: *
+        Allow: /page
+        Disallow: /*.html
+    """)
+
+    assert not rules.is_allowed('/page.html')
+    assert rules.is_allowed('/page.php')
+
+@pytest.mark.parametrize('path, allowed', [
+    ('/fish.php', False),
+    ('/fishheads/catfish.php?parameters', False),
+    ('/fish', True),
+    ('/Fish.PHP', True),
+])
+def test_wildcard_matches_any_sequence(path, allowed):
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /fish*.php
+    """)
+
+    assert rules.is_allowed(path) is allowed
+
+@pytest.mark.parametrize('path, allowed', [
+    ('/filename.php', False),
+    ('/folder/filename.php', False),
+    ('/filename.php?parameters', True),
+    ('/filename.php5', True),
+])
+def test_dollar_anchors_end_of_path(path, allowed):
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /*.php$
+    """)
+
+    assert rules.is_allowed(path) is allowed
+
+def test_root_only_allow():
+
+    rules = compile_rules("""
+        User-agent: *
+        Allow: /$
+        Disallow: /
+    """)
+
+    assert rules.is_allowed('/')
+    assert not rules.is_allowed('/page.htm')
+
+def test_utf8_rule_matches_encoded_and_unencoded_paths():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /path/ツ
+    """)
+
+    assert not rules.is_allowed('/path/ツ')
+    assert not rules.is_allowed('/path/%E3%83%84')
+    assert rules.is_allowed('/path/other')
+
+def test_matching_group_replaces_the_wildcard_group():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /
+
+        User-agent: ExampleBot
+        Disallow: /private
+    """)
+
+    assert rules.is_allowed('/public')
+    assert not rules.is_allowed('/private/page')
+
+def test_groups_for_the_same_agent_are_merged():
+
+    rules = compile_rules("""
+        User-agent: examplebot
+        Disallow: /a
+
+        User-agent: otherbot
+        Disallow: /
+
+        User-agent: ExampleBot
+        Disallow: /b
+    """)
+
+    assert not rules.is_allowed('/a')
+    assert not rules.is_allowed('/b')
+    assert rules.is_allowed('/c')
+
+def test_agents_before_rules_share_a_group():
+
+    rules = compile_rules("""
+        User-agent: otherbot
+        User-agent: examplebot
+        Disallow: /shared
+    """)
+
+    assert not rules.is_allowed('/shared')
+
+def test_empty_disallow_and_comments_are_ignored():
+
+    rules = compile_rules("""
+        # no restrictions for anyone
+        User-agent: *
+        Disallow:
+    """)
+
+    assert rules.rule_count == 0
+    assert rules.is_allowed('/anything')
+
+def test_robots_txt_is_always_allowed():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /
+    """)
+
+    assert rules.is_allowed('/robots.txt')
+    assert not rules.is_allowed('/index.html')
+
+def test_allow_all_without_rules():
+
+    assert RobotsRules.allow_all().is_allowed('/anything')
+
+def test_decisions_are_memoized():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /private
+    """)
+
+    assert not rules.is_allowed('/private/page')
+    assert not rules.is_allowed('/private/page')
+
+    stats = rules.get_stats()
+    assert stats['memo_misses'] == 1
+    assert stats['memo_hits'] == 1
+
+def test_paths_ending_at_the_same_trie_node_share_a_decision():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /private
+        Allow: /private/open
+    """)
+
+    assert not rules.is_allowed('/private/a?session=1')
+    assert not rules.is_allowed('/private/b?session=2')
+    assert rules.is_allowed('/private/open/c')
+    assert rules.is_allowed('/public/d')
+
+    stats = rules.get_stats()
+    assert stats['memo_misses'] == 3
+    assert stats['memo_hits'] == 1
+    assert len(rules.memo) == 0
+
+def test_wildcard_decisions_are_evicted_least_recently_used_first():
+
+    rules = compile_rules("""
+        User-agent: *
+        Disallow: /*.pdf$
+    """)
+    rules.MEMO_SIZE = 2
+
+    assert not rules.is_allowed('/a.pdf')
+    assert rules.is_allowed('/b.html')
+    assert not rules.is_allowed('/a.pdf')
+    assert not rules.is_allowed('/c.pdf')
+
+    assert list(rules.memo) == ['/a.pdf', '/c.pdf']
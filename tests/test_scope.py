@@ -0,0 +1,109 @@
+import pytest
+
+from app.services.crawler.scope import OUT_OF_SCOPE, ScopeError, ScopeRules
+
+BASE_URL = 'https://example.com/start'
+
+def compile_scope(include=(), exclude=()):
+
+    return ScopeRules(include, exclude).compile(BASE_URL)
+
+def test_default_scope_is_the_start_host():
+
+    scope = compile_scope()
+
+    assert scope.allows('https://example.com/page')
+    assert scope.allows('http://EXAMPLE.com:8080/page')
+    assert not scope.allows('https://www.example.com/page')
+    assert not scope.allows('https://example.com.evil.test/page')
+    assert not scope.allows('https://other.test/?next=https://example.com/')
+
+def test_domain_rule_includes_subdomains_only():
+
+    scope = compile_scope(['domain:example.com'])
+
+    assert scope.allows('https://example.com/')
+    assert scope.allows('https://cdn.img.example.com/a.png')
+    assert not scope.allows('https://badexample.com/')
+    assert not scope.allows('https://example.com.evil.test/')
+
+def test_path_include_stays_on_the_start_host():
+
+    scope = compile_scope(['path:/blog'])
+
+    assert scope.allows('https://example.com/blog/post')
+    assert not scope.allows('https://example.com/shop')
+    assert not scope.allows('https://other.test/blog/post')
+
+def test_excludes_win_and_report_the_rule():
+
+    scope = compile_scope(['domain:example.com'], ['path:/private', 'query:session'])
+
+    assert scope.check('https://example.com/public') is None
+    assert scope.check('https://www.example.com/private/a') == 'exclude path:/private'
+    assert scope.check('https://example.com/a?x=1&session=2') == 'exclude query:session'
+    assert scope.check('https://example.com/a?sessions=2') is None
+    assert scope.check('https://other.test/') == OUT_OF_SCOPE
+
+def test_regex_groups_do_not_shift_rule_reporting():
+
+    scope = compile_scope(['regex:https://example\\.com/(a|b)/'], ['regex:/(c)(d)/', 'host:example.com:8443'])
+
+    assert scope.check('https://example.com/a/page') is None
+    assert scope.check('https://example.com/cd/') == 'exclude regex:/(c)(d)/'
+    assert scope.check('https://example.com:8443/a/') == 'exclude host:example.com:8443'
+    assert scope.check('https://example.com/e/') == OUT_OF_SCOPE
+
+def test_newlines_never_match():
+
+    scope = compile_scope()
+
+    assert scope.check('https://other.test/\nhttps://example.com/') == OUT_OF_SCOPE
+    assert scope.filter({'https://example.com/a', 'https://example.com/\nb'}) == {'https://example.com/a'}
+
+@pytest.mark.parametrize('rule', [
+    'regex:(?i)blog',
+    'regex:(?P<name>a)',
+    'regex:(?<name>a)',
+    'regex:(a)\\1',
+    'regex:(?P=name)',
+    'regex:[unclosed',
+    'nonsense',
+    'color:blue',
+    'path:relative',
+    'host:',
+])
+def test_invalid_rules_are_rejected(rule):
+
+    with pytest.raises(ScopeError):
+        ScopeRules([rule])
+
+def test_lookarounds_and_scoped_flags_are_accepted():
+
+    scope = compile_scope(['regex:https://example\\.com/(?i:blog)(?!/drafts)'])
+
+    assert scope.allows('https://example.com/BLOG/post')
+    assert not scope.allows('https://example.com/blog/drafts/post')
+
+def test_filter_counts_drops():
+
+    scope = compile_scope(exclude=['path:/private'])
+
+    kept = scope.filter(['https://example.com/a', 'https://example.com/private', 'https://other.test/'])
+
+    assert kept == {'https://example.com/a'}
+    assert scope.get_stats() == {
+        'checked': 3,
+        'kept': 1,
+        'dropped': {'exclude path:/private': 1, OUT_OF_SCOPE: 1},
+    }
+
+def test_from_dict_validates_structure():
+
+    assert ScopeRules.from_dict({'include': ['host:example.com']}).to_dict()['include'] == ['host:example.com']
+
+    with pytest.raises(ScopeError):
+        ScopeRules.from_dict({'include': 'host:example.com'})
+
+    with pytest.raises(ScopeError):
+        ScopeRules.from_dict(['host:example.com'])
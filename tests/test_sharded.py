@@ -0,0 +1,45 @@
+from app.services.cache.host_profiles import HostProfiles, HostProfileStore
+from app.services.crawler.scope import ScopeRules
+from app.services.crawler.sharded import shard_for
+
+def test_scope_spans_hosts():
+
+    base_url = 'https://example.com/start'
+
+    assert not ScopeRules().spans_hosts(base_url)
+    assert not ScopeRules(['path:/blog', 'host:Example.com']).spans_hosts(base_url)
+    assert ScopeRules(['host:example.com', 'host:cdn.example.com']).spans_hosts(base_url)
+    assert ScopeRules(['domain:example.com']).spans_hosts(base_url)
+    assert ScopeRules(['regex:https://[a-z]+\\.example\\.com/']).spans_hosts(base_url)
+
+def test_host_sharding_keeps_each_host_on_one_shard():
+
+    urls = [f"https://host{host}.example.com/page/{page}" for host in range(20) for page in range(10)]
+
+    for host in range(20):
+        shards = {shard_for(url, 4, by_host=True) for url in urls if url.startswith(f"https://host{host}.")}
+        assert len(shards) == 1
+
+    assert len({shard_for(url, 4) for url in urls if url.startswith('https://host0.')}) > 1
+    assert {shard_for(url, 1, by_host=True) for url in urls} == {0}
+
+def test_shard_profiles_are_saved_once_by_the_parent(tmp_path):
+
+    shards = []
+    for _ in range(2):
+        profiles = HostProfiles(HostProfileStore(str(tmp_path)), persist=False)
+        profiles.record_response('https://example.com/page', 200)
+        profiles.record_latency('example.com', 0.25)
+
+        assert profiles.save() == 0
+        shards.append(profiles.get_dirty())
+        profiles.close()
+
+    store = HostProfileStore(str(tmp_path))
+    assert store.save([profile for dirty in shards for profile in dirty]) == 2
+
+    profile = store.load('example.com')
+    store.close()
+
+    assert profile.requests == 2
+    assert profile.latencies == [0.25, 0.25]
@@ -0,0 +1,58 @@
+from app.services.crawler.crawl_engine import CrawlEngine
+from app.services.crawler.frontier import create_frontier
+from app.services.crawler.url_table import UrlTable, UrlIdSet, VISITED, MEDIA
+
+def test_intern_round_trips_urls_and_reuses_ids():
+
+    table = UrlTable(capacity=4)
+    urls = [f"https://example.com/page/{index}" for index in range(100)] + ['https://example.org', 'mailto:someone']
+
+    ids = [table.intern(url) for url in urls]
+
+    assert ids == list(range(len(urls)))
+    assert [table.get_url(url_id) for url_id in ids] == urls
+    assert [table.intern(url) for url in urls] == ids
+    assert table.get_id('https://example.com/missing') is None
+    assert len(table) == len(urls)
+    assert table.get_stats()['hosts'] == 3
+
+def test_url_id_sets_share_one_table():
+
+    table = UrlTable()
+    visited = UrlIdSet(table, VISITED)
+    media = UrlIdSet(table, MEDIA)
+
+    visited.add('https://example.com/')
+    media.update(['https://example.com/a.jpg', 'https://example.com/'])
+
+    assert 'https://example.com/' in visited
+    assert 'https://example.com/a.jpg' not in visited
+    assert sorted(media) == ['https://example.com/', 'https://example.com/a.jpg']
+    assert table.count(MEDIA) == 2
+
+    media.clear()
+
+    assert table.count(MEDIA) == 0
+    assert 'https://example.com/' in visited
+    assert len(table) == 2
+
+def test_queued_urls_stay_out_of_the_table_after_a_spill(tmp_path):
+
+    engine = CrawlEngine(None)
+    engine.frontier = create_frontier('priority', engine.url_scorer, memory_limit=2000, spill_dir=str(tmp_path))
+
+    try:
+        for index in range(20000):
+            engine._enqueue(f"https://example.com/item/{index}", 1, (0, None), 'https://example.com/')
+
+        assert len(engine.frontier) == 20000
+        assert engine.frontier.in_memory() <= 2000
+        assert len(engine.url_table) == 0
+
+        url, depth, source_url = engine.frontier.pop_entry()
+        engine._record_graph_link(source_url, url)
+
+        assert len(engine.url_table) == 2
+        assert engine._get_parent_url(url) == 'https://example.com/'
+    finally:
+        engine.frontier.close()
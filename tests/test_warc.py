@@ -0,0 +1,98 @@
+import io
+import asyncio
+
+import aiohttp
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.utils.http.recording import RecordingSession, ReplaySession
+from app.utils.http.warc import WarcWriter, iter_warc_records, list_warc_files, read_warc_record
+
+def write_exchange(writer, url, status, body, headers=()):
+
+    request_id = writer.write_request(url, 'GET', [('Accept', '*/*')])
+    return writer.write_response(url, status, 'OK', list(headers), io.BytesIO(body), len(body), concurrent_to=request_id)
+
+def test_writer_round_trips_records_across_rotated_files(tmp_path):
+
+    writer = WarcWriter(str(tmp_path), 'crawl', max_file_size=1)
+
+    for index in range(3):
+        write_exchange(writer, f"https://example.com/{index}", 200, f"body {index}".encode(), [('Content-Type', 'text/plain')])
+    writer.close()
+
+    paths = list_warc_files(str(tmp_path))
+    records = [(path, offset, record) for path in paths for offset, record in iter_warc_records(path)]
+
+    assert len(paths) == 6
+    assert [record.record_type for _, _, record in records] == ['request', 'response'] * 3
+
+    path, offset, record = records[3]
+    reread = read_warc_record(path, offset)
+    status, reason, headers, body = reread.parse_http_response()
+
+    assert reread.target_uri == 'https://example.com/1'
+    assert reread.headers['WARC-Concurrent-To'] == records[2][2].headers['WARC-Record-ID']
+    assert (status, reason, body) == (200, 'OK', b'body 1')
+    assert ('Content-Type', 'text/plain') in headers
+    assert ('Content-Length', '6') in headers
+
+def test_replay_returns_recorded_responses_in_order(tmp_path):
+
+    writer = WarcWriter(str(tmp_path))
+    write_exchange(writer, 'https://example.com/feed', 200, b'first')
+    write_exchange(writer, 'https://example.com/feed', 200, b'second')
+    writer.close()
+
+    async def run():
+
+        session = ReplaySession.from_path(str(tmp_path))
+
+        bodies = []
+        for _ in range(3):
+            async with session.get('https://example.com/feed') as response:
+                bodies.append(await response.read())
+
+        with pytest.raises(aiohttp.ClientConnectionError):
+            async with session.get('https://example.com/missing'):
+                pass
+
+        return bodies, session.misses
+
+    assert asyncio.run(run()) == ([b'first', b'second', b'second'], 1)
+
+def test_recorded_session_replays_partial_and_full_reads(tmp_path):
+
+    async def page(request):
+
+        return web.Response(body=b'x' * 100000, content_type='text/html')
+
+    async def run():
+
+        app = web.Application()
+        app.router.add_get('/page', page)
+
+        async with TestServer(app) as server:
+            url = str(server.make_url('/page'))
+            session = RecordingSession(aiohttp.ClientSession(), WarcWriter(str(tmp_path)))
+
+            async with session.get(url) as response:
+                head = await response.content.read(10)
+                recorded = await response.read()
+
+            await session.close()
+
+        replay = ReplaySession.from_path(str(tmp_path))
+        async with replay.get(url) as response:
+            replayed = await response.read()
+
+        return head, recorded, replayed, response.status
+
+    head, recorded, replayed, status = asyncio.run(run())
+
+    assert head == b'x' * 10
+    assert recorded == b'x' * 100000
+    assert replayed == recorded
+    assert status == 200